@@ -0,0 +1 @@
+"""네트워크 없이 돌리는 벤치마크/부하 테스트 (python -m bench.load --help)"""
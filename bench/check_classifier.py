@@ -0,0 +1,31 @@
+import os
+import json
+import time
+
+from dinnerbot.classifier import MENU_SCORE_THRESHOLD, classify
+
+corpus_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "dinnerbot", "data", "menu_corpus.json")
+with open(corpus_path, encoding="utf-8") as f:
+    corpus = json.load(f)
+
+print(f"--- Menu Classifier Check (threshold {MENU_SCORE_THRESHOLD}, {len(corpus)} samples) ---")
+
+confusion = {("menu", True): 0, ("menu", False): 0, ("other", True): 0, ("other", False): 0}
+for sample in corpus:
+    is_menu, score, _ = classify(sample["text"])
+    confusion[(sample["label"], is_menu)] += 1
+    ok = is_menu == (sample["label"] == "menu")
+    print(f"{'OK  ' if ok else 'MISS'} {sample['label']:5} score={score:+.3f}  {sample['note']}")
+
+correct = confusion[("menu", True)] + confusion[("other", False)]
+print(f"\nAccuracy: {correct}/{len(corpus)}")
+print(f"False reject (menu → 거절): {confusion[('menu', False)]}")
+print(f"False accept (other → 통과): {confusion[('other', True)]}")
+
+rounds = 200
+start = time.perf_counter()
+for _ in range(rounds):
+    for sample in corpus:
+        classify(sample["text"])
+elapsed = time.perf_counter() - start
+print(f"Latency: {elapsed / (rounds * len(corpus)) * 1e6:.1f}us / text")
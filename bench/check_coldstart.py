@@ -0,0 +1,50 @@
+import os
+import sys
+import json
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 새 프로세스에서 서버를 import 하고 첫 요청까지의 시간을 잰다 (Vercel 콜드 스타트와 같은 조건)
+PROBE = r"""
+import sys, time, json, warnings
+warnings.filterwarnings("ignore")
+started = time.perf_counter()
+from dinnerbot.server import app
+imported = time.perf_counter()
+client = app.test_client()
+client.get("/")
+first = time.perf_counter()
+client.get("/api/config")
+config = time.perf_counter()
+sdks = [m for m in ("openai", "google.generativeai", "google.cloud.vision") if m in sys.modules]
+from dinnerbot.clients import warm_up
+print(json.dumps({
+    "import_ms": round((imported - started) * 1000, 1),
+    "first_request_ms": round((first - imported) * 1000, 1),
+    "config_ms": round((config - first) * 1000, 1),
+    "sdks_loaded": sdks,
+    "warm_up_ms": warm_up(),
+}))
+"""
+
+runs = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+print(f"--- Cold Start Check ({runs} fresh processes) ---")
+
+results = []
+for i in range(runs):
+    out = subprocess.run([sys.executable, "-c", PROBE], cwd=ROOT, capture_output=True, text=True)
+    line = out.stdout.strip().splitlines()[-1] if out.stdout.strip() else ""
+    try:
+        result = json.loads(line)
+    except ValueError:
+        print(f"Run {i + 1}: FAILED - {out.stderr.strip()[-300:]}")
+        continue
+    results.append(result)
+    print(f"Run {i + 1}: import {result['import_ms']}ms, first '/' {result['first_request_ms']}ms, "
+          f"'/api/config' {result['config_ms']}ms, SDKs loaded before AI call: {result['sdks_loaded'] or 'none'}")
+
+if results:
+    best = min(results, key=lambda r: r["import_ms"])
+    print(f"\nBest import: {best['import_ms']}ms")
+    print(f"Lazy SDK load on first AI call / warm-up (ms): {best['warm_up_ms']}")
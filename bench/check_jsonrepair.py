@@ -0,0 +1,63 @@
+import re
+import json
+
+from dinnerbot.menu import parse_menu_response, is_menu_result
+from dinnerbot.recommend import parse_recommendation
+
+# 실제로 받아 본 AI 응답 형태들 (코드 펜스, 설명문, 작은따옴표, 끝 쉼표, 다른 구조, 잘린 응답)
+MENU_SAMPLES = [
+    ("plain", '{"3월 4일": "현미밥, 미역국", "3월 5일": "카레라이스"}'),
+    ("fenced", '```json\n{"3월 4일": "현미밥, 미역국"}\n```'),
+    ("prose around", '급식표를 정리했어요!\n{"3월 4일": "현미밥, 미역국"}\n맛있게 드세요.'),
+    ("single quotes", "{'3월 4일': '현미밥, 미역국', '3월 5일': '카레라이스'}"),
+    ("trailing comma", '{"3월 4일": "현미밥, 미역국", "3월 5일": "카레라이스",}'),
+    ("school_lunch_menu", '{"school_lunch_menu": [{"date": "3/4", "menu": "현미밥, 미역국"}]}'),
+    ("nested dict", '{"menu": {"3/4": ["현미밥", "미역국"], "3/5": ["카레라이스"]}}'),
+    ("list of rows", '[{"날짜": "4일", "메뉴": "현미밥, 미역국"}]'),
+    ("python literals", "{'3/4': {'menu': ['현미밥'], 'special': False}}"),
+    ("newline in string", '{"3월 4일": "현미밥\n미역국"}'),
+    ("bracketed prose", '[참고] 알레르기 번호는 뺐어요.\n{"3월 4일": "현미밥, 미역국"}'),
+    ("fence after prose", '[안내] 정리 결과입니다.\n```json\n{"3월 4일": "현미밥, 미역국"}\n```'),
+    ("truncated", '{"3월 4일": "현미밥, 미역국", "3월 5일": "카레라이스", "3월 6일": "짜장'),
+]
+RECOMMEND_SAMPLES = [
+    ("plain", '{"analysis": "a", "recipes": [{"name": "두부조림", "time": 15, "steps": ["썬다"]}], "message": "m"}'),
+    ("single recipe", '{"recipe": {"title": "두부조림", "cooking_time": "약 15분", "instructions": "1. 썬다 2. 조린다"}, "message": "m"}'),
+    ("fenced", '```json\n{"analysis": "a", "recipes": [{"name": "계란말이"}], "message": "m"}\n```'),
+    ("no recipes", '{"analysis": "a", "recipes": [], "message": "더 추천할 메뉴가 없어요"}'),
+]
+
+
+def legacy_menu(raw):
+    """이전 방식: ```json 펜스만 지우고 json.loads"""
+    if "```json" in raw:
+        raw = re.sub(r'```json\s*|\s*```', '', raw, flags=re.DOTALL)
+    result = json.loads(raw.strip())
+    if isinstance(result, dict) and "school_lunch_menu" in result:
+        result = {item["date"]: item["menu"] for item in result["school_lunch_menu"]}
+    return result
+
+
+def check(name, samples, legacy, parse, ok):
+    print(f"--- {name} ({len(samples)} samples) ---")
+    legacy_ok = new_ok = 0
+    for label, raw in samples:
+        try:
+            old = ok(legacy(raw))
+        except Exception:
+            old = False
+        try:
+            result = parse(raw)
+            new = ok(result)
+        except Exception as e:
+            result, new = e, False
+        legacy_ok += old
+        new_ok += new
+        print(f"{'OK  ' if new else 'FAIL'} (before: {'OK  ' if old else 'FAIL'}) {label:18} {str(result)[:70]}")
+    print(f"Parsed without a retry: {legacy_ok}/{len(samples)} before → {new_ok}/{len(samples)} now\n")
+
+
+check("Menu responses", MENU_SAMPLES, legacy_menu, parse_menu_response, is_menu_result)
+check("Recommend responses", RECOMMEND_SAMPLES, json.loads, lambda raw: parse_recommendation(raw)[0],
+      lambda r: isinstance(r, dict) and isinstance(r.get("recipes"), list)
+      and all(isinstance(x, dict) and x.get("name") for x in r["recipes"]))
@@ -0,0 +1,85 @@
+"""표 파서(dinnerbot.layout) 회귀 확인
+
+    python -m bench.check_layout
+
+OCR 이 메뉴명과 알레르기 번호('돼지불고기 10.13.')를 따로 읽은 표에서 번호를 날짜 머리글로
+착각하지 않는지, 날짜가 뒤섞인 표는 신뢰도를 낮춰 AI 정리로 넘기는지 확인한다.
+월간 달력은 줄 맨 앞으로 넘어간 알레르기 번호('5', '13')를 날짜 숫자로 보지 않는지 본다.
+"""
+import re
+import sys
+
+from bench.stubs import weekly_menu_words
+from dinnerbot.layout import LAYOUT_MIN_CONFIDENCE, parse_menu_grid
+
+ALLERGEN_TAIL = re.compile(r"^(.*?[가-힣])(\d[\d.]*\.)$")
+WEEK_DATES = ["3/4(월)", "3/5(화)", "3/6(수)", "3/7(목)", "3/8(금)"]
+# 2025년 6월 평일 (2일이 월요일, 30일 월요일만 있는 마지막 주)
+MONTH_WEEKS = [[2, 3, 4, 5, 6], [9, 10, 11, 12, 13], [16, 17, 18, 19, 20], [23, 24, 25, 26, 27], [30]]
+MONTH_DATES = [f"6월 {day}일({'월화수목금'[col]})" for week in MONTH_WEEKS for col, day in enumerate(week)]
+MONTH_ITEMS = ["현미밥", "쇠고기미역국", "돼지불고기", "콩나물무침", "배추김치", "떡볶이", "요플레"]
+# (날짜, 메뉴 아래 줄 맨 앞으로 넘어간 알레르기 번호) — 9, 11 은 다른 날짜와 같은 숫자
+WRAPPED = {2: ["5", "13"], 4: ["9"], 12: ["11", "16"], 24: ["5"], 30: ["2"]}
+
+
+def split_allergens(words):
+    """'돼지불고기10.13.' → '돼지불고기', '10.13.' 두 단어 (OCR 이 띄어 읽은 경우)"""
+    out = []
+    for text, x0, y0, x1, y1 in words:
+        m = ALLERGEN_TAIL.match(text)
+        if not m:
+            out.append([text, x0, y0, x1, y1])
+            continue
+        name, codes = m.groups()
+        mid = x0 + 15 * len(name)
+        out += [[name, x0, y0, mid, y1], [codes, mid + 8, y0, mid + 8 + 12 * len(codes), y1]]
+    return out
+
+
+def shuffled_dates(words):
+    """머리글 날짜 순서가 뒤섞인 표 (머리글을 잘못 찾은 경우와 같은 모양)"""
+    order = dict(zip(WEEK_DATES, ["3/6(수)", "3/4(월)", "3/8(금)", "3/5(화)", "3/7(목)"]))
+    return [[order.get(w[0], w[0])] + w[1:] for w in words]
+
+
+def monthly_menu_words(wrapped=None):
+    """요일 머리글 + 칸마다 맨 위에 날짜 숫자만 적힌 월간 달력
+
+    wrapped: {날짜: [번호, ...]} — 그 칸의 메뉴 아래 줄 맨 앞에 알레르기 번호만 따로 읽힌 경우
+    """
+    words = [["6월", 40, 10, 90, 40], ["급식", 100, 10, 160, 40], ["식단표", 170, 10, 260, 40]]
+    for col, weekday in enumerate("월화수목금"):
+        x = 40 + col * 220
+        words.append([weekday, x + 80, 70, x + 100, 100])
+    for row, week in enumerate(MONTH_WEEKS):
+        top = 130 + row * 200
+        for col, day in enumerate(week):
+            x = 40 + col * 220
+            words.append([str(day), x, top, x + 12 * len(str(day)), top + 30])
+            items = [MONTH_ITEMS[(day + k) % len(MONTH_ITEMS)] for k in range(3)]
+            for k, item in enumerate(items):
+                y = top + 40 + k * 40
+                words.append([item, x, y, x + 15 * len(item), y + 30])
+            codes = (wrapped or {}).get(day, [])
+            for k, code in enumerate(codes):
+                y = top + 40 + len(items) * 40
+                words.append([code, x + k * 40, y, x + k * 40 + 12 * len(code), y + 30])
+    return words
+
+
+def check(name, words, expect_dates, confident):
+    menu, confidence = parse_menu_grid(words)
+    ok = sorted(menu) == sorted(expect_dates) and (confidence >= LAYOUT_MIN_CONFIDENCE) == confident
+    print(f"{'OK  ' if ok else 'FAIL'} {name:28} confidence={confidence:.3f} dates={list(menu)}")
+    return ok
+
+
+results = [
+    check("weekly", weekly_menu_words(), WEEK_DATES, True),
+    check("weekly, split allergens", split_allergens(weekly_menu_words()), WEEK_DATES, True),
+    check("weekly, dates out of order", shuffled_dates(weekly_menu_words()), WEEK_DATES, False),
+    check("monthly", monthly_menu_words(), MONTH_DATES, True),
+    check("monthly, wrapped allergens", monthly_menu_words(WRAPPED), MONTH_DATES, True),
+]
+print(f"\n{sum(results)}/{len(results)} passed")
+sys.exit(0 if all(results) else 1)
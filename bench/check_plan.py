@@ -0,0 +1,62 @@
+import io
+import time
+import contextlib
+
+from bench.stubs import StubProfile, CallLog, StubOpenAI
+from dinnerbot import server, metrics
+from dinnerbot.cache import RecommendCache
+
+# 한 달 급식 (평일 20일)
+LUNCHES = ["현미밥, 쇠고기미역국, 돼지불고기, 배추김치", "잡곡밥, 된장찌개, 닭볶음탕, 깍두기",
+           "카레라이스, 계란국, 돈까스, 단무지", "보리밥, 순두부찌개, 감자조림, 시금치나물", "비빔밥, 콩나물국, 떡볶이, 요플레"]
+SIDES = ["우유", "요구르트", "과일", "식혜"]
+DAYS = [d for d in range(3, 31) if d % 7 not in (1, 2)]
+MENU_DATA = {f"3월 {d}일": f"{LUNCHES[i % len(LUNCHES)]}, {SIDES[i // len(LUNCHES) % len(SIDES)]}" for i, d in enumerate(DAYS)}
+INGREDIENTS = "계란, 두부, 양파, 대파, 감자, 당근, 김치, 참치"
+
+log = CallLog()
+stub = {"type": "openai", "client": StubOpenAI(StubProfile(latency_ms=800, jitter_ms=0), log), "key_id": "check"}
+server.get_client = lambda api_key=None: stub
+client = server.app.test_client()
+
+
+def measure(label, run):
+    server.recommend_cache = RecommendCache.from_env()
+    calls_before = sum(n for _, n in log.summary())
+    tokens_before = metrics.AI_TOKENS.total(kind="prompt"), metrics.AI_TOKENS.total(kind="completion")
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        dinners = run()
+    wall = time.perf_counter() - started
+    calls = sum(n for _, n in log.summary()) - calls_before
+    prompt = metrics.AI_TOKENS.total(kind="prompt") - tokens_before[0]
+    completion = metrics.AI_TOKENS.total(kind="completion") - tokens_before[1]
+    print(f"{label:28} dinners={dinners:>2}  calls={calls:>2}  prompt tok/dinner={prompt / dinners:>6.0f}  "
+          f"completion tok/dinner={completion / dinners:>5.0f}  wall={wall:5.1f}s")
+    return wall, prompt + completion, dinners
+
+
+def per_date():
+    for lunch in MENU_DATA.values():
+        client.post("/api/recommend", json={"lunch": lunch, "ingredients": INGREDIENTS})
+    return len(MENU_DATA)
+
+
+shopping = []
+
+
+def whole_plan():
+    result = client.post("/api/plan", json={"menuData": MENU_DATA, "ingredients": INGREDIENTS}).get_json()
+    planned = [e for e in result["plan"] if e["recipe"]]
+    names = [e["recipe"]["name"] for e in planned]
+    assert len(names) == len(set(names)), "같은 메뉴가 반복됨"
+    shopping.extend(item["item"] for item in result["shopping_list"])
+    return len(planned)
+
+
+print(f"--- {len(MENU_DATA)} school days, stub latency 800ms ---")
+wall_a, tokens_a, n_a = measure("/api/recommend per date", per_date)
+wall_b, tokens_b, n_b = measure("/api/plan (chunked)", whole_plan)
+print(f"Per planned dinner: {wall_a / n_a * 1000:.0f}ms → {wall_b / n_b * 1000:.0f}ms, "
+      f"{tokens_a / n_a:.0f} → {tokens_b / n_b:.0f} tokens")
+print(f"Shopping list ({len(shopping)} items): {', '.join(shopping[:10])}{' ...' if len(shopping) > 10 else ''}")
@@ -0,0 +1,134 @@
+"""잘린 추천 응답 처리 확인 (캐시 / 세션 / 선생성)
+
+    python -m bench.check_recommend
+
+max_tokens 등으로 AI 추천 JSON 이 잘려 오면 보정한 결과로 응답은 하되, 추천 캐시와
+'다른 메뉴' 세션 이력, 선생성 대기열에는 남기지 않는지 Flask / ASGI 두 모드에서 확인한다.
+미리 만든 추천은 응답할 때에만 이력에 남는지, Flask 워커가 진행 중인 선생성을 오래 기다리지
+않는지도 본다.
+"""
+import sys
+import time
+import asyncio
+from types import SimpleNamespace
+
+from dinnerbot import server
+from dinnerbot.cache import RecommendCache
+from dinnerbot.recommend import parse_recommendation
+from dinnerbot.sessions import Prefetcher, RecommendSession
+
+COMPLETE = '{"analysis": "a", "recipes": [{"name": "두부조림", "steps": ["썬다"]}], "message": "m"}'
+TRUNCATED = '{"analysis": "a", "recipes": [{"name": "계란말이", "steps": ["푼다"]}], "message": "오늘도 수고'
+
+
+class FixedCompletions:
+    """정해 둔 응답 텍스트만 돌려주는 chat.completions (호출 수 기록)"""
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.calls = 0
+
+    def _response(self):
+        self.calls += 1
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=self.reply))], usage=None)
+
+    def create(self, model, messages, **kwargs):
+        return self._response()
+
+
+class AsyncFixedCompletions(FixedCompletions):
+    async def create(self, model, messages, **kwargs):
+        return self._response()
+
+
+def stub_client(completions):
+    return {"type": "openai", "client": SimpleNamespace(chat=SimpleNamespace(completions=completions)), "key_id": "check"}
+
+
+def check(name, ok, detail):
+    print(f"{'OK  ' if ok else 'FAIL'} {name:40} {detail}")
+    return ok
+
+
+def check_parse():
+    _, complete = parse_recommendation(COMPLETE)
+    result, truncated = parse_recommendation(TRUNCATED)
+    return [check("parse flags truncated JSON", complete and not truncated and bool(result["recipes"]),
+                  f"complete={complete} truncated={not truncated} recipes={len(result['recipes'])}")]
+
+
+def check_flask():
+    completions = FixedCompletions(TRUNCATED)
+    server.get_client = lambda api_key=None: stub_client(completions)
+    server.recommend_cache = RecommendCache.from_env()
+    client = server.app.test_client()
+    results = []
+    body = {"lunch": "불고기", "ingredients": "계란, 두부", "clickCount": 0}
+    for _ in range(2):
+        response = client.post("/api/recommend", json=body)
+    results.append(check("flask truncated reply not cached", completions.calls == 2 and bool(response.json["recipes"]),
+                         f"calls={completions.calls} cache={response.headers.get('X-Recommend-Cache')}"))
+    response = client.post("/api/recommend", json=dict(body, sessionId="check", clickCount=1))
+    session = server.recommend_session({"sessionId": "check"}, stub_client(completions), body["lunch"], body["ingredients"])
+    results.append(check("flask truncated reply not in session", not session.seen and not session.filling and not session.ready,
+                         f"seen={session.seen} ready={len(session.ready)}"))
+
+    # 선생성도 잘린 응답이면 대기열에 넣지 않고 끝냄
+    prefetcher, session = Prefetcher(), RecommendSession()
+    prefetcher.schedule(session, lambda exclude: None)
+    ready = prefetcher.next_ready(session, timeout=2)
+    results.append(check("flask prefetch drops truncated reply", ready is None and not session.seen,
+                         f"ready={ready} seen={session.seen}"))
+    return results
+
+
+def check_prefetch():
+    results = []
+    prefetcher, session = Prefetcher(), RecommendSession()
+    prefetcher.schedule(session, lambda exclude: parse_recommendation(COMPLETE)[0])
+    while session.filling:
+        time.sleep(0.01)
+    results.append(check("prefetched names excluded, not seen", "두부조림" in session.exclude() and not session.seen,
+                         f"exclude={session.exclude()} seen={session.seen}"))
+    session.remember(prefetcher.next_ready(session))
+    results.append(check("prefetched names seen once served", session.seen == ["두부조림"], f"seen={session.seen}"))
+
+    # 선생성이 오래 걸리면 Flask 워커는 잠깐만 기다리고 바로 생성으로 넘어감
+    prefetcher, session = Prefetcher(), RecommendSession()
+    prefetcher.schedule(session, lambda exclude: time.sleep(5) or parse_recommendation(COMPLETE)[0])
+    started = time.monotonic()
+    ready = prefetcher.next_ready(session)
+    waited = time.monotonic() - started
+    results.append(check("flask does not block on slow prefetch", ready is None and waited < 2, f"waited={waited:.1f}s"))
+    return results
+
+
+async def check_asgi():
+    from dinnerbot import aio
+
+    completions = AsyncFixedCompletions(TRUNCATED)
+    ai_client, cache = stub_client(completions), RecommendCache.from_env()
+    results = []
+    for _ in range(2):
+        meta = {}
+        result = await aio.recommend(ai_client, "불고기", "계란, 두부", 0, cache, meta)
+    results.append(check("asgi truncated reply not cached", completions.calls == 2 and bool(result["recipes"]),
+                         f"calls={completions.calls} cache={meta.get('cache')}"))
+    session = RecommendSession()
+    await aio.recommend(ai_client, "불고기", "계란, 두부", 1, cache, {}, session)
+    await asyncio.sleep(0)
+    results.append(check("asgi truncated reply not in session", not session.seen and not session.filling and not session.ready,
+                         f"seen={session.seen} ready={len(session.ready)}"))
+    return results
+
+
+print("--- Truncated recommendation replies ---")
+results = check_parse() + check_flask() + check_prefetch()
+try:
+    import quart  # noqa: F401
+except ImportError:
+    print("SKIP asgi (pip install -r requirements-async.txt)")
+else:
+    results += asyncio.run(check_asgi())
+print(f"\n{sum(results)}/{len(results)} passed")
+sys.exit(0 if all(results) else 1)
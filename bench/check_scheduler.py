@@ -0,0 +1,90 @@
+"""스케줄러 재시도/대체 판단 확인 (dinnerbot.scheduler)
+
+    python -m bench.check_scheduler
+
+연결·시간 초과, 429, 5xx 만 재시도하거나 다음 모델로 넘기고, 요청 오류(4xx)와 응답 처리 중
+난 예외는 첫 호출에서 바로 올리는지, 여러 스레드가 같은 클라이언트의 모델 객체를 하나만 만드는지 확인한다.
+"""
+import sys
+import threading
+
+from bench.stubs import StubError
+from dinnerbot import scheduler as sched
+from dinnerbot.scheduler import Scheduler
+
+sched.RETRY_BASE_DELAY = 0.001
+
+
+class APIConnectionError(Exception):
+    """openai.APIConnectionError 대역 (상태 코드 없음)"""
+
+
+def failing(error):
+    """첫 모델은 error 로 실패하고 다음 모델은 성공하는 호출 (호출한 모델 기록)"""
+    calls = []
+
+    def fn(client, model):
+        calls.append(model)
+        if model == "gemini-a":
+            raise error
+        return "ok"
+    return fn, calls
+
+
+class Model:
+    def __init__(self, name="gemini-a"):
+        self.model_name = f"models/{name}"
+
+    def with_model(self, name):
+        return Model(name)
+
+
+def run(error):
+    fn, calls = failing(error)
+    try:
+        result = Scheduler(chain=["gemini-a", "gemini-b"], attempts=1).call({"type": "gemini", "client": Model()}, fn)
+    except Exception as e:
+        result = type(e).__name__
+    return result, calls
+
+
+def check(name, ok, detail):
+    print(f"{'OK  ' if ok else 'FAIL'} {name:36} {detail}")
+    return ok
+
+
+CASES = [
+    # (이름, 예외, 결과, 호출한 모델)
+    ("500 retried then next model", StubError(500, "boom"), "ok", ["gemini-a", "gemini-a", "gemini-b"]),
+    ("connection error retried", APIConnectionError("reset"), "ok", ["gemini-a", "gemini-a", "gemini-b"]),
+    ("timeout retried", TimeoutError(), "ok", ["gemini-a", "gemini-a", "gemini-b"]),
+    ("400 raised at once", StubError(400, "bad request"), "StubError", ["gemini-a"]),
+    ("parse error raised at once", ValueError("no text"), "ValueError", ["gemini-a"]),
+    ("KeyError raised at once", KeyError("choices"), "KeyError", ["gemini-a"]),
+]
+
+
+def check_client_for():
+    scheduler, ai_client = Scheduler(), {"type": "gemini", "client": Model()}
+    start, seen = threading.Barrier(16), []
+
+    def worker():
+        start.wait()
+        seen.append(scheduler.client_for(ai_client, "gemini-b"))
+
+    threads = [threading.Thread(target=worker) for _ in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return check("client_for builds one model object", len({id(m) for m in seen}) == 1, f"objects={len({id(m) for m in seen})}")
+
+
+print("--- Scheduler retry / failover ---")
+results = []
+for name, error, expected, expected_calls in CASES:
+    result, calls = run(error)
+    results.append(check(name, result == expected and calls == expected_calls, f"result={result} calls={calls}"))
+results.append(check_client_for())
+print(f"\n{sum(results)}/{len(results)} passed")
+sys.exit(0 if all(results) else 1)
@@ -0,0 +1,66 @@
+"""비동기 분석의 OCR 지연 시 이미지 판독 선실행 확인 (dinnerbot.aio)
+
+    python -m bench.check_speculation
+
+OCR 이 OCR_SPECULATE_AFTER 보다 오래 걸려도 API 키가 없으면 이미지 판독을 시작하지 않고
+OCR → 표 파서 결과로 응답하는지, 키가 있으면 이미지 판독이 먼저 끝난 결과를 쓰는지 확인한다.
+"""
+import io
+import sys
+import asyncio
+
+from PIL import Image
+
+from bench.stubs import StubProfile, CallLog, AsyncStubOpenAI, weekly_menu_words
+from dinnerbot import aio
+from dinnerbot.cache import AnalysisCache
+
+OCR_DELAY = 0.3
+aio.OCR_SPECULATE_AFTER = 0.05
+
+
+def menu_image(seed):
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 48), (seed, 255 - seed, 128)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def slow_ocr(text=True):
+    async def ocr(content):
+        await asyncio.sleep(OCR_DELAY)
+        if not text:
+            return None
+        words = weekly_menu_words()
+        return {"text": " ".join(w[0] for w in words), "words": words}
+    return ocr
+
+
+async def analyze(ai_client, ocr, seed):
+    aio.extract_menu_google_vision = ocr
+    meta = {}
+    result = await aio.extract_menu_from_image(ai_client, menu_image(seed), AnalysisCache.from_env(), meta)
+    return result, meta.get("path")
+
+
+def check(name, ok, detail):
+    print(f"{'OK  ' if ok else 'FAIL'} {name:36} {detail}")
+    return ok
+
+
+async def main():
+    log = CallLog()
+    client = {"type": "openai", "client": AsyncStubOpenAI(StubProfile(latency_ms=50, jitter_ms=0), log), "key_id": "check"}
+    results = []
+    result, path = await analyze(None, slow_ocr(), 10)
+    results.append(check("slow OCR, no key", path == "layout" and "error" not in result, f"path={path} {str(result)[:50]}"))
+    result, path = await analyze(None, slow_ocr(text=False), 20)
+    results.append(check("no OCR text, no key", "error" in result, f"path={path} {str(result)[:50]}"))
+    result, path = await analyze(client, slow_ocr(text=False), 30)
+    results.append(check("slow OCR, key", path == "vision-llm" and "error" not in result, f"path={path} {str(result)[:50]}"))
+    return results
+
+
+print(f"--- OCR speculation (OCR {OCR_DELAY}s, speculate after {aio.OCR_SPECULATE_AFTER}s) ---")
+results = asyncio.run(main())
+print(f"\n{sum(results)}/{len(results)} passed")
+sys.exit(0 if all(results) else 1)
@@ -0,0 +1,88 @@
+"""업로드 본문 한도 확인 (라우트별 MAX_CONTENT_LENGTH)
+
+    python -m bench.check_uploads
+
+/api/analyze 는 이미지 한 장 크기를 넘는 본문을 읽기 전에 413 으로 거절하고,
+/api/analyze/batch 만 여러 장 크기까지 받는지 Flask / ASGI(Quart) 두 모드에서 확인한다.
+"""
+import os
+import io
+import sys
+import json
+import asyncio
+
+# 작은 한도로 빠르게 확인
+os.environ["MAX_UPLOAD_MB"] = "1"
+
+from dinnerbot import server
+from dinnerbot.uploads import MAX_IMAGE_BYTES, MAX_CONTENT_LENGTH, MAX_BATCH_CONTENT_LENGTH
+
+
+class UnreadStream(io.RawIOBase):
+    """읽으면 기록만 하는 본문 (413 이 본문을 읽기 전에 났는지 확인)"""
+
+    def __init__(self):
+        self.reads = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        self.reads += 1
+        return 0
+
+
+def batch_body(count):
+    """한 장 한도 안의 이미지 count 장 + 개수가 맞지 않는 해시 (분석 전에 업로드 오류로 끝남)"""
+    image = "A" * (MAX_IMAGE_BYTES // 3 * 4 - 4)
+    return json.dumps({"images": [image] * count, "hashes": ["0" * 64]})
+
+
+def check(name, ok, detail):
+    print(f"{'OK  ' if ok else 'FAIL'} {name:44} {detail}")
+    return ok
+
+
+def check_flask():
+    client = server.app.test_client()
+    results = []
+    for route, content_type, length in [
+        ("/api/analyze", "application/json", MAX_CONTENT_LENGTH + 1),
+        ("/api/analyze", "multipart/form-data; boundary=x", MAX_CONTENT_LENGTH + 1),
+        ("/api/analyze/batch", "application/json", MAX_BATCH_CONTENT_LENGTH + 1),
+    ]:
+        stream = UnreadStream()
+        response = client.post(route, content_type=content_type,
+                               environ_overrides={"wsgi.input": stream, "CONTENT_LENGTH": str(length)})
+        results.append(check(f"flask {route} {content_type.split(';')[0]}", response.status_code == 413 and not stream.reads,
+                             f"status={response.status_code} reads={stream.reads}"))
+    body = batch_body(2)
+    response = client.post("/api/analyze/batch", data=body, content_type="application/json")
+    results.append(check("flask /api/analyze/batch over one image", response.status_code == 200 and len(body) > MAX_CONTENT_LENGTH,
+                         f"status={response.status_code} bytes={len(body)}"))
+    return results
+
+
+async def check_asgi():
+    from dinnerbot import asgi
+
+    client = asgi.app.test_client()
+    results = []
+    body = batch_body(2)
+    response = await client.post("/api/analyze", data=body, headers={"Content-Type": "application/json"})
+    results.append(check("asgi /api/analyze over one image", response.status_code == 413, f"status={response.status_code}"))
+    response = await client.post("/api/analyze/batch", data=body, headers={"Content-Type": "application/json"})
+    results.append(check("asgi /api/analyze/batch over one image", response.status_code == 200, f"status={response.status_code}"))
+    return results
+
+
+print(f"--- Upload limits (image {MAX_IMAGE_BYTES} B, body {MAX_CONTENT_LENGTH} B, batch body {MAX_BATCH_CONTENT_LENGTH} B) ---")
+results = check_flask()
+try:
+    import quart  # noqa: F401
+except ImportError:
+    print("SKIP asgi (pip install -r requirements-async.txt)")
+else:
+    results += asyncio.run(check_asgi())
+print(f"\n{sum(results)}/{len(results)} passed")
+sys.exit(0 if all(results) else 1)
@@ -0,0 +1,229 @@
+"""/api/analyze, /api/recommend 부하 테스트 (네트워크 없이 로컬 대역 사용)
+
+    python -m bench.load --endpoint analyze --concurrency 1,8,32 --requests 200
+    python -m bench.load --endpoint recommend --provider gemini --rate-limit-rate 0.05
+    python -m bench.load --mode asgi --endpoint analyze
+
+Flask 앱(WSGI test client, 스레드 풀) 또는 ASGI 앱(Quart test client, 이벤트 루프 하나)을
+프로세스 안에서 직접 호출하고, OpenAI / Gemini / Vision 호출은 bench.stubs 의 대역으로
+바꿔 끼운다. 동시성 단계별로 p50/p95/p99 지연, 초당 처리량, 요청당 AI·OCR 호출 수,
+메모리 최고치, provider 호출 수를 출력한다.
+"""
+import io
+import sys
+import time
+import random
+import asyncio
+import argparse
+import resource
+import threading
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageDraw
+
+from bench.stubs import StubProfile, CallLog, StubOpenAI, AsyncStubOpenAI, StubGemini, StubVision
+from dinnerbot import server
+from dinnerbot.cache import AnalysisCache, RecommendCache
+from dinnerbot.scheduler import scheduler
+
+FRIDGE = ["계란", "두부", "양파", "대파", "감자", "당근", "돼지고기", "소고기", "닭고기", "김치", "애호박",
+          "버섯", "참치", "햄", "우유", "치즈", "밥", "콩나물", "시금치", "어묵", "새우", "양배추"]
+LUNCHES = ["현미밥, 쇠고기미역국, 돼지불고기, 배추김치, 우유", "잡곡밥, 된장찌개, 닭볶음탕, 깍두기",
+           "카레라이스, 계란국, 돈까스, 단무지", "비빔밥, 콩나물국, 떡볶이, 요플레"]
+
+
+def menu_image(seed, size=(1600, 1200)):
+    """실제 사진 크기의 급식표 이미지 (격자 + 잡음, 시드마다 달라 서로 캐시에 걸리지 않음)"""
+    rng = random.Random(seed)
+    img = Image.new("RGB", size, (250, 250, 245))
+    draw = ImageDraw.Draw(img)
+    w, h = size
+    for col in range(6):
+        draw.line([(col * w // 5, 0), (col * w // 5, h)], fill=(60, 60, 60), width=3)
+    for row in range(8):
+        draw.line([(0, row * h // 7), (w, row * h // 7)], fill=(60, 60, 60), width=3)
+    for _ in range(3000):
+        x, y = rng.randrange(w), rng.randrange(h)
+        draw.rectangle([x, y, x + rng.randint(2, 30), y + rng.randint(2, 12)], fill=(rng.randint(0, 120),) * 3)
+    out = io.BytesIO()
+    img.save(out, "JPEG", quality=92)
+    return out.getvalue()
+
+
+def install_stubs(args, log, app):
+    """server(Flask) 또는 asgi/aio 모듈의 클라이언트/Vision 을 대역으로 교체"""
+    profile = StubProfile(args.latency, args.jitter, args.error_rate, args.rate_limit_rate, args.retry_after)
+    vision_profile = StubProfile(args.vision_latency, args.jitter / 2, 0.0, 0.0)
+    vision = StubVision(vision_profile, log, layout_rate=args.layout_rate)
+    if args.mode == "asgi":
+        from dinnerbot import aio
+
+        aio.get_async_vision_client = lambda: vision
+    else:
+        server.get_vision_client = lambda: vision
+    openai_stub = AsyncStubOpenAI if args.mode == "asgi" else StubOpenAI
+
+    clients = {}
+    lock = threading.Lock()
+
+    def get_client(api_key=None):
+        key = api_key or "bench"
+        with lock:
+            if key not in clients:
+                if args.provider == "openai":
+                    clients[key] = {"type": "openai", "client": openai_stub(profile, log), "key_id": key}
+                else:
+                    # 체인의 다른 모델은 스케줄러가 with_model() 로 만든 대역을 씀
+                    model = scheduler.models_for({"type": "gemini"})[0]
+                    clients[key] = {"type": "gemini", "client": StubGemini(profile, log, model), "key_id": key}
+            return clients[key]
+
+    app.get_client = get_client
+
+
+def load_app(mode):
+    """부하를 걸 서버 모듈 (dinnerbot.server 또는 dinnerbot.asgi)"""
+    if mode == "asgi":
+        from dinnerbot import asgi
+
+        return asgi
+    return server
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = min(len(values) - 1, max(0, int(round(p / 100 * (len(values) - 1)))))
+    return values[k]
+
+
+def request_for(args, i, images):
+    """i 번째 요청 → (경로, post 인자) (Flask / Quart test client 공통)"""
+    if args.endpoint == "analyze":
+        return "/api/analyze", {"data": images[i % len(images)],
+                                "headers": {"Content-Type": "image/jpeg", "X-Api-Key": f"key-{i % args.keys}"}}
+    rng = random.Random(i if args.unique else i % args.distinct)
+    payload = {"lunch": rng.choice(LUNCHES), "ingredients": ", ".join(rng.sample(FRIDGE, rng.randint(2, 6))),
+               "apiKey": f"key-{i % args.keys}", "clickCount": rng.randint(0, 2)}
+    return "/api/recommend", {"json": payload}
+
+
+def outcome_of(status_code, data, headers):
+    """(ok/error, 분석 경로 또는 추천 캐시/출처)"""
+    outcome = "error" if status_code != 200 or "error" in (data or {}) else "ok"
+    path = headers.get("X-Analysis-Path") or headers.get("X-Recommend-Cache") or headers.get("X-Recommend-Source") or ""
+    return outcome, path
+
+
+def run_level(args, concurrency, images):
+    latencies, statuses = [], {}
+    lock = threading.Lock()
+    local = threading.local()
+
+    def one(i):
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = server.app.test_client()
+        path, kwargs = request_for(args, i, images)
+        started = time.perf_counter()
+        response = client.post(path, **kwargs)
+        elapsed = time.perf_counter() - started
+        key = outcome_of(response.status_code, response.get_json(silent=True), response.headers)
+        with lock:
+            latencies.append(elapsed)
+            statuses[key] = statuses.get(key, 0) + 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(args.requests)))
+    wall = time.perf_counter() - started
+    return latencies, statuses, wall
+
+
+async def run_level_async(app, args, concurrency, images):
+    """ASGI: 이벤트 루프 하나에서 concurrency 개씩 동시에 요청"""
+    latencies, statuses = [], {}
+    client = app.app.test_client()
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        path, kwargs = request_for(args, i, images)
+        async with slots:
+            started = time.perf_counter()
+            response = await client.post(path, **kwargs)
+            data = await response.get_json(silent=True)
+            latencies.append(time.perf_counter() - started)
+        key = outcome_of(response.status_code, data, response.headers)
+        statuses[key] = statuses.get(key, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(args.requests)))
+    return latencies, statuses, time.perf_counter() - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="급식 해결사 오프라인 부하 테스트")
+    parser.add_argument("--mode", choices=["flask", "asgi"], default="flask", help="부하를 걸 서빙 모드")
+    parser.add_argument("--endpoint", choices=["analyze", "recommend"], default="analyze")
+    parser.add_argument("--provider", choices=["openai", "gemini"], default="openai")
+    parser.add_argument("--concurrency", default="1,8,32", help="쉼표로 구분한 동시 요청 수 단계")
+    parser.add_argument("--requests", type=int, default=100, help="단계별 요청 수")
+    parser.add_argument("--latency", type=float, default=300, help="AI 대역 평균 지연(ms)")
+    parser.add_argument("--jitter", type=float, default=100, help="지연 표준편차(ms)")
+    parser.add_argument("--vision-latency", type=float, default=150, help="Vision 대역 평균 지연(ms)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="500 오류 비율")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="429 비율")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="429 응답의 retry-after(초)")
+    parser.add_argument("--layout-rate", type=float, default=0.5, help="표 파서가 읽을 수 있는 OCR 결과 비율")
+    parser.add_argument("--images", type=int, default=20, help="미리 만들어 둘 급식표 이미지 수 (반복되면 캐시 적중)")
+    parser.add_argument("--keys", type=int, default=4, help="요청에 섞어 쓸 API 키 수")
+    parser.add_argument("--distinct", type=int, default=50, help="추천 요청의 서로 다른 (점심, 재료) 조합 수")
+    parser.add_argument("--unique", action="store_true", help="추천 요청을 모두 다른 조합으로 (캐시 미적중)")
+    parser.add_argument("--warm", action="store_true", help="단계 사이에 캐시를 비우지 않음")
+    parser.add_argument("--verbose", action="store_true", help="서버 로그(print) 출력")
+    args = parser.parse_args(argv)
+
+    log = CallLog()
+    app = load_app(args.mode)
+    install_stubs(args, log, app)
+    images = [menu_image(seed) for seed in range(args.images)] if args.endpoint == "analyze" else []
+    # ASGI 는 단계마다 같은 이벤트 루프를 씀 (작업 큐 세마포어, 선생성 태스크가 루프에 묶임)
+    loop = asyncio.new_event_loop() if args.mode == "asgi" else None
+
+    print(f"--- Load Test: /api/{args.endpoint} ({args.mode}, {args.provider} stub, {args.latency:g}±{args.jitter:g}ms, "
+          f"429 {args.rate_limit_rate:.0%}, 500 {args.error_rate:.0%}) ---")
+    print(f"{'conc':>5} {'reqs':>5} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'rps':>7} {'llm/req':>8} {'ocr/req':>8}  outcomes")
+    for level in [int(c) for c in args.concurrency.split(",") if c.strip()]:
+        if not args.warm:
+            app.analysis_cache = AnalysisCache.from_env()
+            app.recommend_cache = RecommendCache.from_env()
+        before = log.totals()
+        with contextlib.redirect_stdout(sys.stdout if args.verbose else io.StringIO()):
+            if loop is not None:
+                latencies, statuses, wall = loop.run_until_complete(run_level_async(app, args, level, images))
+            else:
+                latencies, statuses, wall = run_level(args, level, images)
+        calls = log.totals() - before
+        ms = [v * 1000 for v in latencies]
+        # 선생성 같은 응답 뒤 호출도 포함 (단계가 끝날 때까지 난 호출)
+        llm = (calls["openai"] + calls["gemini"]) / max(1, len(ms))
+        ocr = calls["vision"] / max(1, len(ms))
+        outcomes = ", ".join(f"{o}{'/' + p if p else ''}={n}" for (o, p), n in sorted(statuses.items()))
+        print(f"{level:>5} {len(ms):>5} {percentile(ms, 50):>8.1f} {percentile(ms, 95):>8.1f} "
+              f"{percentile(ms, 99):>8.1f} {len(ms) / wall:>7.1f} {llm:>8.2f} {ocr:>8.2f}  {outcomes}")
+    if loop is not None:
+        loop.close()
+
+    # Linux 는 KB, macOS 는 바이트 단위
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mb = peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    print(f"\nPeak RSS: {peak_mb:.1f} MB")
+    print("Provider calls:")
+    for (provider, model, outcome), count in log.summary():
+        print(f"  {provider:7} {model:24} {outcome:4} {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""OpenAI / Gemini / Vision 의 로컬 대역 (지연 시간, 오류, 429 비율 설정 가능, 동기·비동기 SDK 모양)"""
+import re
+import json
+import time
+import random
+import asyncio
+import threading
+from collections import Counter
+from types import SimpleNamespace
+
+from dinnerbot.recipes import get_catalog
+
+
+class StubProfile:
+    """대역 응답 특성: 평균/편차 지연(ms), 일반 오류(500) 비율, 429 비율과 retry-after(초)"""
+
+    def __init__(self, latency_ms=300, jitter_ms=100, error_rate=0.0, rate_limit_rate=0.0, retry_after=1.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+
+
+class StubError(Exception):
+    """SDK 예외와 같은 모양 (status_code, response.headers)"""
+
+    def __init__(self, status, message, retry_after=None):
+        super().__init__(f"Error code: {status} - {message}")
+        self.status_code = status
+        headers = {"retry-after": str(retry_after)} if retry_after is not None else {}
+        self.response = SimpleNamespace(headers=headers)
+
+
+class CallLog:
+    """(provider, model, 결과)별 호출 수"""
+
+    def __init__(self):
+        self.counts = Counter()
+        self._lock = threading.Lock()
+
+    def add(self, provider, model, outcome):
+        with self._lock:
+            self.counts[(provider, model, outcome)] += 1
+
+    def summary(self):
+        with self._lock:
+            return sorted(self.counts.items())
+
+    def totals(self):
+        """provider 별 호출 수 (결과 무관)"""
+        with self._lock:
+            totals = Counter()
+            for (provider, _, _), count in self.counts.items():
+                totals[provider] += count
+            return totals
+
+
+def _delay(profile):
+    return max(0.0, random.gauss(profile.latency_ms, profile.jitter_ms)) / 1000
+
+
+def _simulate(profile, log, provider, model):
+    time.sleep(_delay(profile))
+    _outcome(profile, log, provider, model)
+
+
+async def _simulate_async(profile, log, provider, model):
+    await asyncio.sleep(_delay(profile))
+    _outcome(profile, log, provider, model)
+
+
+def _outcome(profile, log, provider, model):
+    roll = random.random()
+    if roll < profile.rate_limit_rate:
+        log.add(provider, model, "429")
+        raise StubError(429, "Rate limit reached", retry_after=profile.retry_after)
+    if roll < profile.rate_limit_rate + profile.error_rate:
+        log.add(provider, model, "500")
+        raise StubError(500, "Internal server error")
+    log.add(provider, model, "ok")
+
+
+def fake_menu_json(prompt):
+    """OCR 텍스트 정리 요청에 대한 그럴듯한 응답"""
+    return json.dumps({f"3월 {d}일": "현미밥, 미역국, 불고기, 배추김치, 우유" for d in range(4, 9)}, ensure_ascii=False)
+
+
+def fake_recommend_json(prompt):
+    recipes = get_catalog().recipes
+    recipe = random.choice(recipes)
+    return json.dumps({
+        "analysis": "점심에 고기 반찬이 있어 저녁은 가볍게 추천해요.",
+        "recipes": [{
+            "name": recipe["name"], "desc": recipe["desc"], "time": recipe["time"], "diff": recipe["diff"],
+            "ingredients": recipe["ingredients"][:2], "more_ingredients": recipe["ingredients"][2:],
+            "steps": recipe["steps"], "tip": recipe["tip"],
+        }],
+        "message": "오늘도 수고 많으셨어요!",
+    }, ensure_ascii=False)
+
+
+def fake_plan_json(prompt):
+    """식단 짜기 요청(날짜 목록 '- 날짜: 점심')에 날짜마다 다른 레시피로 답함"""
+    dates = re.findall(r"^- ([^:\n]+):", prompt, flags=re.M)
+    recipes = random.sample(get_catalog().recipes, min(len(dates), len(get_catalog().recipes)))
+    return json.dumps({
+        "plans": [{
+            "date": date, "name": r["name"], "desc": r["desc"], "time": r["time"], "diff": r["diff"],
+            "ingredients": r["ingredients"][:2], "more_ingredients": r["ingredients"][2:],
+            "steps": r["steps"], "tip": r["tip"],
+        } for date, r in zip(dates, recipes)],
+        "message": "냉장고 재료를 골고루 나눠 썼어요.",
+    }, ensure_ascii=False)
+
+
+def _reply_for(text):
+    if '"plans"' in text:
+        return fake_plan_json(text)
+    return fake_recommend_json(text) if "저녁 메뉴" in text else fake_menu_json(text)
+
+
+def _chunks(text, size=24):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class _Completions:
+    def __init__(self, profile, log):
+        self.profile = profile
+        self.log = log
+
+    def create(self, model, messages, stream=False, **kwargs):
+        _simulate(self.profile, self.log, "openai", model)
+        response = _openai_response(messages, stream)
+        return iter(response) if stream else response
+
+
+class _AsyncCompletions(_Completions):
+    async def create(self, model, messages, stream=False, **kwargs):
+        await _simulate_async(self.profile, self.log, "openai", model)
+        response = _openai_response(messages, stream)
+        return _aiter(response) if stream else response
+
+
+def _openai_response(messages, stream):
+    """응답 객체 (stream 이면 조각 목록)"""
+    content = messages[-1]["content"]
+    prompt = content if isinstance(content, str) else " ".join(p.get("text", "") for p in content)
+    reply = _reply_for(prompt)
+    usage = SimpleNamespace(prompt_tokens=len(prompt) // 2, completion_tokens=len(reply) // 2,
+                            total_tokens=(len(prompt) + len(reply)) // 2)
+    if stream:
+        return [SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=c))], usage=None)
+                for c in _chunks(reply)]
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=reply))], usage=usage)
+
+
+async def _aiter(items):
+    for item in items:
+        yield item
+
+
+class StubOpenAI:
+    """OpenAI().chat.completions.create 대역"""
+
+    def __init__(self, profile, log):
+        self.chat = SimpleNamespace(completions=_Completions(profile, log))
+
+
+class AsyncStubOpenAI:
+    """AsyncOpenAI().chat.completions.create 대역"""
+
+    def __init__(self, profile, log):
+        self.chat = SimpleNamespace(completions=_AsyncCompletions(profile, log))
+
+    async def close(self):
+        pass
+
+
+class StubGemini:
+    """clients.GeminiModel.generate_content / generate_content_async 대역"""
+
+    def __init__(self, profile, log, model="gemini-2.5-flash"):
+        self.profile = profile
+        self.log = log
+        self.model_name = f"models/{model}"
+
+    def with_model(self, model):
+        return StubGemini(self.profile, self.log, model)
+
+    def generate_content(self, contents, generation_config=None, stream=False, **kwargs):
+        _simulate(self.profile, self.log, "gemini", self.model_name.split("/")[-1])
+        response = self._response(contents, stream)
+        return iter(response) if stream else response
+
+    async def generate_content_async(self, contents, generation_config=None, stream=False, **kwargs):
+        await _simulate_async(self.profile, self.log, "gemini", self.model_name.split("/")[-1])
+        response = self._response(contents, stream)
+        return _aiter(response) if stream else response
+
+    def _response(self, contents, stream):
+        prompt = contents if isinstance(contents, str) else " ".join(c for c in contents if isinstance(c, str))
+        reply = _reply_for(prompt)
+        usage = SimpleNamespace(prompt_token_count=len(prompt) // 2, candidates_token_count=len(reply) // 2,
+                                total_token_count=(len(prompt) + len(reply)) // 2)
+        if stream:
+            return [SimpleNamespace(text=c, parts=[c], usage_metadata=None) for c in _chunks(reply)]
+        return SimpleNamespace(text=reply, parts=[reply], usage_metadata=usage)
+
+
+class StubVision:
+    """vision.ImageAnnotatorClient.text_detection / ImageAnnotatorAsyncClient.batch_annotate_images 대역
+    (주간 급식표 단어와 좌표)"""
+
+    def __init__(self, profile, log, layout_rate=0.5):
+        self.profile = profile
+        self.log = log
+        self.layout_rate = layout_rate
+
+    def text_detection(self, image=None, **kwargs):
+        _simulate(self.profile, self.log, "vision", "text_detection")
+        return self._result()
+
+    async def batch_annotate_images(self, requests=None, **kwargs):
+        await _simulate_async(self.profile, self.log, "vision", "text_detection")
+        return SimpleNamespace(responses=[self._result()])
+
+    def _result(self):
+        words = weekly_menu_words() if random.random() < self.layout_rate else jumbled_menu_words()
+        full = SimpleNamespace(description=" ".join(w[0] for w in words), bounding_poly=SimpleNamespace(vertices=[]))
+        annotations = [full] + [
+            SimpleNamespace(description=text, bounding_poly=SimpleNamespace(vertices=[
+                SimpleNamespace(x=x0, y=y0), SimpleNamespace(x=x1, y=y0),
+                SimpleNamespace(x=x1, y=y1), SimpleNamespace(x=x0, y=y1)]))
+            for text, x0, y0, x1, y1 in words
+        ]
+        return SimpleNamespace(text_annotations=annotations, error=SimpleNamespace(message=""))
+
+
+WEEK = [
+    ("3/4(월)", ["현미밥", "쇠고기미역국5.6.16.", "돼지불고기10.13.", "배추김치9.", "우유2."]),
+    ("3/5(화)", ["잡곡밥", "된장찌개5.6.", "닭볶음탕5.15.", "깍두기9.", "요구르트2."]),
+    ("3/6(수)", ["카레라이스", "계란국1.", "돈까스1.2.5.6.", "단무지", "과일"]),
+    ("3/7(목)", ["보리밥", "순두부찌개5.", "감자조림5.6.", "시금치나물", "배추김치9."]),
+    ("3/8(금)", ["비빔밥", "콩나물국", "떡볶이5.6.", "요플레2.", "딸기"]),
+]
+
+
+def weekly_menu_words():
+    """표 파서가 높은 신뢰도로 읽을 수 있는 주간 급식표"""
+    words = [["3월", 40, 10, 90, 40], ["급식", 100, 10, 160, 40], ["식단표", 170, 10, 260, 40]]
+    for col, (date, items) in enumerate(WEEK):
+        x = 40 + col * 220
+        words.append([date, x, 80, x + 120, 110])
+        for row, item in enumerate(items):
+            y = 140 + row * 45
+            words.append([item, x, y, x + 15 * len(item), y + 30])
+    return words
+
+
+def jumbled_menu_words():
+    """표 구조가 깨진 OCR 결과 (AI 정리 경로로 넘어감)"""
+    words = weekly_menu_words()
+    random.shuffle(words)
+    return [[w[0], 40 + i * 37 % 900, 60 + i * 53 % 700, 40 + i * 37 % 900 + 80, 60 + i * 53 % 700 + 30]
+            for i, w in enumerate(words)]
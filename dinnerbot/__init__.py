@@ -0,0 +1,10 @@
+"""급식 해결사 서버 공용 모듈"""
+import time
+
+# 콜드 스타트 측정 기준 시각 (패키지를 처음 import 한 시점)
+STARTED_AT = time.perf_counter()
+
+from dotenv import load_dotenv
+
+# 모듈 상수들이 import 시점에 환경 변수를 읽으므로 .env 를 가장 먼저 로드
+load_dotenv()
@@ -0,0 +1,384 @@
+import os
+import time
+import asyncio
+import threading
+
+from dinnerbot import metrics
+from dinnerbot.clients import ClientRegistry, GeminiModel, GEMINI_MODEL
+from dinnerbot.batch import BATCH_OCR_WORKERS, batch_image_key, split_pages
+from dinnerbot.layout import ocr_words
+from dinnerbot.menu import NO_KEY_ERROR, MENU_MAX_TOKENS, MENU_CONTINUE_ATTEMPTS, is_menu_result, ai_error
+from dinnerbot.jsonrepair import join_continuation
+from dinnerbot.recommend import SYSTEM_PROMPT
+from dinnerbot.scheduler import scheduler
+from dinnerbot.sessions import AsyncPrefetcher
+from dinnerbot.plan import NO_DAYS_ERROR, PLAN_WORKERS, plan_days, chunk_days, build_plan_prompt
+from dinnerbot.streaming import RecommendEventBuilder, sse
+from dinnerbot.pipeline import (Recommendation, chat_request, reply_text, chunk_text, stream_finished, observe_prompt, fingerprint,
+                                prepare_image as prepare, cached_menu, cached_ocr, local_menu, ai_menu_request, continuation_for,
+                                parsed_menu, menu_failed, save_menu, batch_requests, finish_batch, recommend_prompt,
+                                parsed_recommendation, planning_hints, parsed_plan, offline_plan, plan_result)
+
+# OCR 이 이 시간(초) 안에 끝나지 않으면 이미지 직접 판독(vision-LLM)을 미리 시작
+OCR_SPECULATE_AFTER = float(os.getenv("OCR_SPECULATE_AFTER", "2.5"))
+# 풀에서 빠진 클라이언트는 진행 중인 호출이 끝날 시간을 두고 닫음 (초)
+CLIENT_CLOSE_GRACE = 120
+
+
+# SDK 는 동기 버전(dinnerbot.clients)과 같이 처음 쓸 때 불러온다
+
+def _build_openai(key):
+    from openai import AsyncOpenAI
+
+    return AsyncOpenAI(api_key=key)
+
+
+def _build_gemini(key):
+    from google.ai import generativelanguage as glm
+
+    # 동기 버전과 같이 전역 genai.configure() 대신 키 전용 비동기 서비스 클라이언트
+    return GeminiModel(GEMINI_MODEL, async_service=glm.GenerativeServiceAsyncClient(client_options={"api_key": key}))
+
+
+async def _close_client(ai_client, delay):
+    await asyncio.sleep(delay)
+    try:
+        if ai_client["type"] == "openai":
+            await ai_client["client"].close()
+        else:
+            await ai_client["client"].async_service.transport.close()
+    except Exception as e:
+        print(f"Client Close Error: {e}")
+
+
+# '다른 메뉴' 선생성 (asgi 의 세션 저장소와 함께 사용)
+prefetcher = AsyncPrefetcher()
+
+
+class AsyncClientRegistry(ClientRegistry):
+    """비동기 SDK 클라이언트 풀 (이벤트 루프 하나에서 공유)"""
+
+    builders = {"openai": _build_openai, "gemini": _build_gemini}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._closing = set()
+
+    def _evicted(self, client):
+        # keep-alive 연결(httpx / gRPC 채널)을 닫지 않으면 키가 바뀔 때마다 쌓임
+        try:
+            task = asyncio.get_running_loop().create_task(_close_client(client, CLIENT_CLOSE_GRACE))
+        except RuntimeError:
+            return
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+
+_vision_client = None
+_vision_lock = threading.Lock()
+
+
+def get_async_vision_client():
+    global _vision_client
+    if _vision_client is None:
+        with _vision_lock:
+            if _vision_client is None:
+                from google.cloud import vision
+
+                _vision_client = vision.ImageAnnotatorAsyncClient()
+    return _vision_client
+
+
+async def extract_menu_google_vision(content):
+    """Google Cloud Vision OCR (비동기) → {"text": 전체 텍스트, "words": 단어별 좌표}"""
+    started = time.perf_counter()
+    try:
+        with metrics.stage("ocr"):
+            from google.cloud import vision
+
+            response = await get_async_vision_client().batch_annotate_images(requests=[{
+                "image": {"content": content},
+                "features": [{"type_": vision.Feature.Type.TEXT_DETECTION}],
+            }])
+            result = response.responses[0]
+            if result.error.message:
+                raise RuntimeError(result.error.message)
+            texts = result.text_annotations
+            ocr = {"text": texts[0].description if texts else "", "words": ocr_words(texts[1:])}
+        metrics.observe_call("vision", "text_detection", "ok", time.perf_counter() - started)
+        return ocr
+    except Exception as e:
+        metrics.observe_call("vision", "text_detection", "error", time.perf_counter() - started)
+        print(f"Google Vision Error: {e}")
+        return None
+
+
+# 요청 구성, 응답 해석, 단계 판정은 Flask 모드(dinnerbot.server)와 함께 dinnerbot.pipeline 에 있고
+# 여기서는 비동기 SDK 호출, OCR 과 (스레드로 넘기는) 캐시 조회만 감싼다.
+
+async def complete(ai_client, prompt, background=False, **options):
+    """AI 응답 텍스트 한 번 (비동기, options: pipeline.chat_request 인자)"""
+    observe_prompt(prompt)
+
+    async def call(client, model):
+        request = chat_request(ai_client["type"], model, prompt, **options)
+        if ai_client["type"] == "openai":
+            return reply_text("openai", model, await client.chat.completions.create(**request))
+        return reply_text("gemini", model, await client.generate_content_async(**request))
+
+    return await scheduler.call_async(ai_client, call, background)
+
+
+async def structure_menu(ai_client, prompt, image=None):
+    """AI 로 날짜별 메뉴 정리 (image 가 있으면 이미지 직접 판독, 잘린 JSON 은 나머지만 이어서 요청)"""
+    try:
+        with metrics.stage("llm"):
+            raw = await complete(ai_client, prompt, image=image, max_tokens=MENU_MAX_TOKENS)
+            for _ in range(MENU_CONTINUE_ATTEMPTS):
+                more = continuation_for(prompt, raw)
+                if more is None:
+                    break
+                # 이어 쓰기 요청의 답은 JSON 조각이므로 JSON 모드를 끈다
+                raw = join_continuation(raw, await complete(ai_client, more, image=image, json_mode=False, max_tokens=MENU_MAX_TOKENS))
+        return parsed_menu(raw)
+    except Exception as e:
+        return menu_failed(e)
+
+
+async def prepare_image(content):
+    """이미지 정규화 (CPU 작업이라 스레드에서)"""
+    return await asyncio.to_thread(prepare, content)
+
+
+async def ocr_image(image_key, image, cache):
+    """OCR 결과 (캐시 우선, 캐시 조회/저장은 SQLite 를 쓸 수 있어 스레드에서)"""
+    ocr = await asyncio.to_thread(cached_ocr, cache, image_key)
+    if ocr is None:
+        ocr = await extract_menu_google_vision(image.data)
+        if ocr is not None:
+            await asyncio.to_thread(cache.put_ocr, image_key, ocr)
+    return ocr
+
+
+async def extract_menu_from_image(ai_client, content, cache, meta=None, schools=None):
+    """이미지 분석 (비동기): OCR 이 OCR_SPECULATE_AFTER 초 안에 끝나지 않거나 텍스트를 못 얻으면
+    이미지 직접 판독을 시작해 먼저 성공한 결과 사용
+
+    제한 시간은 OCR 단계에만 건다. OCR 이 제때 끝나면 텍스트 정리(AI 호출)가 오래 걸려도
+    이미지 판독을 함께 부르지 않는다 (취소해도 provider 비용은 나가므로).
+    """
+    meta = {} if meta is None else meta
+    image_key = await asyncio.to_thread(fingerprint, cache, content)
+    cached = await asyncio.to_thread(cached_menu, cache, image_key, meta)
+    if cached is not None:
+        return cached
+
+    image = await prepare_image(content)
+    meta["bytes_saved"] = image.saved
+    ocr_task = asyncio.create_task(ocr_image(image_key, image, cache))
+
+    async def ocr_path():
+        # (결정적 여부, 결과, 경로) — 텍스트를 못 얻으면 결과 None
+        ocr = await ocr_task
+        if not (ocr and ocr["text"]):
+            return False, None, None
+        # 급식표가 아니라는 판정, 텍스트 캐시, 표 파서 결과면 이미지 판독을 기다리지 않는다
+        result, path = await asyncio.to_thread(local_menu, cache, ocr, meta)
+        if result is not None:
+            return True, result, path
+        if not ai_client:
+            return True, dict(NO_KEY_ERROR), None
+        prompt, _, path = ai_menu_request(ocr, None)
+        return False, await structure_menu(ai_client, prompt), path
+
+    async def vision_llm_path(reason):
+        prompt, vision_image, path = ai_menu_request(None, image, reason)
+        return False, await structure_menu(ai_client, prompt, vision_image), path
+
+    pending = set()
+    try:
+        ocr_done, _ = await asyncio.wait({ocr_task}, timeout=OCR_SPECULATE_AFTER)
+        # 키가 없으면 이미지 판독은 NO_KEY_ERROR 뿐이므로 OCR/캐시/표 파서가 끝날 때까지 기다린다
+        vision_started = not ocr_done and bool(ai_client)
+        if vision_started:
+            pending.add(asyncio.create_task(vision_llm_path("ocr_slow")))
+        pending.add(asyncio.create_task(ocr_path()))
+        fallback = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                decisive, result, path = task.result()
+                if decisive or is_menu_result(result):
+                    # OCR 텍스트는 OCR 경로(layout/llm)의 결과를 저장할 때만 쓴다 (이미지 판독이 이기면 OCR 은 진행 중일 수 있음)
+                    ocr = ocr_task.result() if path in ("layout", "llm") else None
+                    return await asyncio.to_thread(save_menu, cache, schools, image_key, result, ocr, path, meta)
+                if result is None and not vision_started:
+                    # OCR 이 텍스트를 못 얻으면 이미지 판독으로
+                    if not ai_client:
+                        return dict(NO_KEY_ERROR)
+                    pending.add(asyncio.create_task(vision_llm_path("ocr_failed")))
+                    vision_started = True
+                fallback = fallback or result
+        return fallback or ai_error("판독 불가")
+    finally:
+        for task in pending | {ocr_task}:
+            task.cancel()
+
+
+async def extract_menus_batch(ai_client, contents, cache, meta=None, schools=None):
+    """여러 장 분석 (비동기): OCR 동시 실행(BATCH_OCR_WORKERS 개까지) → 텍스트는 한 번의 AI 호출 → 날짜별 병합"""
+    slots = asyncio.Semaphore(BATCH_OCR_WORKERS)
+
+    meta = {} if meta is None else meta
+
+    async def bounded_ocr(image_key, image):
+        async with slots:
+            return await ocr_image(image_key, image, cache)
+
+    image_keys = await asyncio.gather(*[asyncio.to_thread(fingerprint, cache, content) for content in contents])
+    batch_key = batch_image_key(image_keys)
+    cached = await asyncio.to_thread(cached_menu, cache, batch_key, meta)
+    if cached is not None:
+        return cached
+
+    images = await asyncio.gather(*[prepare_image(content) for content in contents])
+    meta["bytes_saved"] = sum(image.saved for image in images)
+    ocrs = await asyncio.gather(*[bounded_ocr(k, image) for k, image in zip(image_keys, images)])
+    menus, text_pages, image_pages, rejected, paths = await asyncio.to_thread(split_pages, cache, image_keys, images, ocrs)
+    meta["path"] = "+".join(sorted(set(paths)))
+
+    if (text_pages or image_pages) and not ai_client:
+        return dict(NO_KEY_ERROR)
+    ai_menus = await asyncio.gather(*[structure_menu(ai_client, prompt, image) for prompt, image in batch_requests(text_pages, image_pages)])
+    return await asyncio.to_thread(finish_batch, cache, schools, batch_key, menus, list(ai_menus), rejected, ocrs, meta)
+
+
+async def generate_recommendation(ai_client, lunch, ingredients, clickCount=0, exclude=(), background=False):
+    """AI 저녁 추천 한 번 (비동기) → (추천, 잘리지 않았는지) (실패하면 예외)"""
+    prompt = recommend_prompt(lunch, ingredients, clickCount, exclude)
+    with metrics.stage("llm"):
+        raw = await complete(ai_client, prompt, background, system=SYSTEM_PROMPT)
+    return parsed_recommendation(raw)
+
+
+async def _plan_chunk(ai_client, days, ingredients, hints):
+    with metrics.stage("llm"):
+        raw = await complete(ai_client, build_plan_prompt(days, ingredients, hints), system=SYSTEM_PROMPT)
+    return parsed_plan(raw, days)
+
+
+async def plan(ai_client, menu_data, ingredients, meta=None):
+    """날짜별 저녁 식단 + 장보기 목록 (비동기, 묶음별 AI 호출을 PLAN_WORKERS 개까지 동시에)"""
+    slots = asyncio.Semaphore(PLAN_WORKERS)
+
+    meta = {} if meta is None else meta
+    days, skipped = plan_days(menu_data)
+    if not days:
+        return NO_DAYS_ERROR
+    if not ai_client:
+        return offline_plan(days, ingredients, meta, skipped)
+    hints = planning_hints(days, ingredients)
+    chunks = chunk_days(days)
+    meta["chunks"] = len(chunks)
+
+    async def bounded_chunk(chunk):
+        async with slots:
+            return await _plan_chunk(ai_client, chunk, ingredients, hints)
+
+    results = await asyncio.gather(*(bounded_chunk(chunk) for chunk in chunks), return_exceptions=True)
+    return plan_result(days, results, ingredients, skipped)
+
+
+def _schedule_prefetch(rec):
+    """다음 '다른 메뉴' 추천을 태스크로 미리 생성 (잘린 응답은 대기열에 넣지 않음)"""
+    async def generate(exclude):
+        result, complete = await generate_recommendation(rec.ai_client, rec.lunch, rec.ingredients, rec.clickCount, exclude, True)
+        return result if complete else None
+
+    prefetcher.schedule(rec.session, generate)
+
+
+async def _ready(rec, cache):
+    """AI 호출 없이 응답할 수 있는 추천 (미리 만든 추천 → 캐시, 없으면 None)"""
+    if rec.session is not None:
+        prefetched = await prefetcher.next_ready(rec.session)
+        if prefetched is not None:
+            return rec.served(prefetched, "prefetch")
+    cached = await asyncio.to_thread(cache.get, rec.cache_key) if cache else None
+    if cached is not None:
+        return rec.served(cached, "cache")
+    return None
+
+
+async def recommend(ai_client, lunch, ingredients, clickCount=0, cache=None, meta=None, session=None):
+    """저녁 메뉴 추천 (비동기). session 이 있으면 이미 추천한 메뉴는 빼고 미리 만든 추천부터 씀"""
+    rec = Recommendation(ai_client, lunch, ingredients, clickCount, session, meta, _schedule_prefetch)
+    if not ai_client:
+        return rec.no_key()
+    ready = await _ready(rec, cache)
+    if ready is not None:
+        return ready
+    try:
+        result, complete = await generate_recommendation(ai_client, lunch, ingredients, clickCount, rec.exclude)
+        if cache and complete:
+            await asyncio.to_thread(cache.put, rec.cache_key, result)
+        return rec.generated(result, complete)
+    except Exception as e:
+        return rec.failed(e)
+
+
+async def stream_text(ai_client, prompt):
+    """OpenAI / Gemini 비동기 스트리밍"""
+    provider = ai_client["type"]
+
+    async def open_stream(client, model):
+        request = chat_request(provider, model, prompt, system=SYSTEM_PROMPT, stream=True)
+        if provider == "openai":
+            stream = await client.chat.completions.create(**request)
+        else:
+            stream = await client.generate_content_async(**request)
+
+        async def chunks():
+            last = None
+            async for chunk in stream:
+                last = chunk
+                text = chunk_text(provider, model, chunk)
+                if text:
+                    yield text
+            stream_finished(provider, model, last)
+
+        # 첫 조각에서 나는 429 도 스케줄러가 재시도/대체할 수 있도록 미리 받음
+        iterator = chunks()
+        return await anext(iterator, None), iterator
+
+    first, iterator = await scheduler.call_async(ai_client, open_stream)
+    if first is not None:
+        yield first
+    async for chunk in iterator:
+        yield chunk
+
+
+async def recommend_events(ai_client, lunch, ingredients, clickCount=0, cache=None, session=None):
+    """SSE 추천 이벤트 (비동기)"""
+    rec = Recommendation(ai_client, lunch, ingredients, clickCount, session, None, _schedule_prefetch)
+    if not ai_client:
+        yield sse("done", rec.no_key())
+        return
+    ready = await _ready(rec, cache)
+    if ready is not None:
+        yield sse("done", ready)
+        return
+    try:
+        builder = RecommendEventBuilder()
+        async for chunk in stream_text(ai_client, rec.prompt()):
+            for event in builder.feed(chunk):
+                yield event
+        done = builder.finish()
+        # 잘린 응답은 보정해 보여 주기만 하고 캐시/세션에는 남기지 않는다
+        if builder.complete:
+            if cache:
+                await asyncio.to_thread(cache.put, rec.cache_key, builder.result)
+            rec.served(builder.result, "ai")
+        yield done
+    except Exception as e:
+        yield sse("done", rec.failed(e, "AI Recommendation Stream Error"))
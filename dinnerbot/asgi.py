@@ -0,0 +1,301 @@
+"""비동기(ASGI) 서빙 모드
+
+    pip install -r requirements-async.txt
+    uvicorn dinnerbot.asgi:app --port 8080
+
+Flask 버전(app.py, api/index.py)과 같은 라우트를 제공하지만, 각 요청이 OCR/LLM
+응답을 기다리는 동안 워커를 점유하지 않으므로 프로세스 하나로 수백 건의
+분석을 동시에 처리할 수 있다.
+"""
+import os
+import asyncio
+import threading
+
+from dotenv import load_dotenv
+from quart import Quart, Request, render_template, request, jsonify, Response
+
+from dinnerbot import aio, metrics
+from dinnerbot.batch import BATCH_MAX_IMAGES
+from dinnerbot.cache import AnalysisCache, RecommendCache
+from dinnerbot.clients import warm_up
+from dinnerbot.jobs import AsyncJobQueue, JobQueueFull, QUEUE_FULL_ERROR, NOT_FOUND_ERROR, wait_async, lookup_analysis, wants_job
+from dinnerbot.schools import NOT_FOUND_ERROR as NO_SCHOOL_MENU_ERROR, BAD_QUERY_ERROR, SchoolMenuStore, normalize_school, parse_month
+from dinnerbot.pipeline import server_config, request_client, meta_headers
+from dinnerbot.sessions import SessionStore, session_key
+from dinnerbot.streaming import sse
+from dinnerbot.uploads import (MAX_CONTENT_LENGTH, MAX_BATCH_CONTENT_LENGTH, TOO_LARGE_ERROR, ImageTooLarge, UploadError, check_body_size, check_size,
+                               decode_data_url, is_binary_body, is_sha256, read_file, verify_sha256, verify_all)
+
+# 환경 변수 로드
+load_dotenv()
+
+# 라우트별 요청 본문 최대 크기 (나머지는 MAX_CONTENT_LENGTH = 이미지 한 장 기준)
+BODY_LIMITS = {"/api/analyze/batch": MAX_BATCH_CONTENT_LENGTH}
+
+
+class UploadRequest(Request):
+    """본문 한도를 요청을 만들 때 경로별로 정함
+
+    Quart 는 라우트 실행과 함께 본문을 받기 시작하므로 뷰에서 request.max_content_length 를
+    바꾸면 늦다. 여기서 정해 두면 Content-Length 가 한도를 넘는 요청은 본문을 읽기 전에 413.
+    """
+
+    def __init__(self, method, scheme, path, *args, max_content_length=None, **kwargs):
+        limit = BODY_LIMITS.get(path, max_content_length)
+        super().__init__(method, scheme, path, *args, max_content_length=limit, **kwargs)
+        # multipart 폼 파싱도 같은 한도
+        self.max_content_length = limit
+
+
+template_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'templates'))
+app = Quart(__name__, template_folder=template_dir)
+app.request_class = UploadRequest
+app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
+
+analysis_cache = AnalysisCache.from_env()
+recommend_cache = RecommendCache.from_env()
+client_registry = aio.AsyncClientRegistry.from_env()
+recommend_sessions = SessionStore.from_env()
+job_queue = AsyncJobQueue.from_env()
+school_menus = SchoolMenuStore.from_env()
+
+
+def get_client(api_key=None):
+    """비동기 API 클라이언트 (OpenAI sk- 또는 Google AIza- 지원)"""
+    return request_client(client_registry, api_key)
+
+
+@app.before_request
+async def start_timing():
+    metrics.begin_request()
+
+
+@app.before_request
+async def answer_preflight():
+    # CORS 사전 요청은 라우트를 실행하지 않고 바로 응답 (헤더는 add_cors_headers 가 붙임)
+    if request.method == 'OPTIONS':
+        return Response("", status=204)
+
+
+@app.after_request
+async def add_server_timing(response):
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    timing = metrics.finish_request(endpoint, response.status_code, response.content_length)
+    if timing:
+        response.headers['Server-Timing'] = timing
+    return response
+
+
+@app.after_request
+async def add_cors_headers(response):
+    # flask-cors(CORS(app))처럼 모든 출처 허용 + 프론트엔드가 보내는 요청 헤더
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    response.headers['Access-Control-Allow-Headers'] = 'Content-Type, X-Api-Key, X-Image-SHA256, Prefer'
+    response.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
+    return response
+
+
+if os.getenv("WARMUP_ON_START") == "1":
+    threading.Thread(target=warm_up, daemon=True).start()
+
+
+@app.route('/api/warmup')
+async def api_warmup():
+    """SDK import / Vision 채널 준비 (import 가 이벤트 루프를 막지 않도록 스레드에서)"""
+    return jsonify(await asyncio.to_thread(warm_up))
+
+
+@app.route('/metrics')
+async def api_metrics():
+    if not metrics.authorized(request.headers.get('Authorization')):
+        return Response("unauthorized\n", status=401, content_type="text/plain")
+    return Response(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
+
+
+@app.route('/')
+async def home():
+    return await render_template('index.html')
+
+
+@app.route('/api/config')
+async def get_config():
+    return jsonify(server_config())
+
+
+async def run_analysis_job(job):
+    """작업 큐에서 실행하는 분석 → (결과, 메타)"""
+    meta = {}
+    ai_client = get_client(job.api_key)
+    if job.kind == "analyze_batch":
+        return await aio.extract_menus_batch(ai_client, job.images, analysis_cache, meta, school_menus), meta
+    return await aio.extract_menu_from_image(ai_client, job.images[0], analysis_cache, meta, school_menus), meta
+
+
+JOB_HANDLERS = {"analyze": run_analysis_job, "analyze_batch": run_analysis_job}
+
+
+@app.before_serving
+async def resume_jobs():
+    # JOB_DB 에 남은 끝나지 않은 작업은 이벤트 루프가 뜬 뒤에 다시 실행
+    job_queue.resume(JOB_HANDLERS)
+
+
+def job_response(kind, contents, api_key):
+    try:
+        job, coalesced = job_queue.submit(kind, contents, api_key, JOB_HANDLERS[kind])
+    except JobQueueFull:
+        return jsonify(QUEUE_FULL_ERROR), 503, {'Retry-After': '5'}
+    data = job.to_dict()
+    data["coalesced"] = coalesced
+    return jsonify(data), 202, {'Location': f"/api/jobs/{job.id}"}
+
+
+@app.errorhandler(413)
+async def upload_too_large(e):
+    return jsonify(TOO_LARGE_ERROR), 413
+
+
+@app.route('/api/analyze', methods=['POST'])
+async def api_analyze():
+    """급식표 분석 (multipart/form-data · application/octet-stream · 기존 JSON base64)"""
+    try:
+        with metrics.stage("decode"):
+            if request.mimetype == "multipart/form-data":
+                files, form = await request.files, await request.form
+                if not files.get("image"):
+                    raise UploadError("분석할 이미지가 없습니다.")
+                content, api_key = verify_sha256(read_file(files["image"]), form.get("sha256")), form.get("apiKey")
+            elif is_binary_body(request.mimetype):
+                check_body_size(request.content_length)
+                content = verify_sha256(check_size(await request.get_data(cache=False)), request.headers.get("X-Image-SHA256"))
+                api_key = request.headers.get("X-Api-Key")
+            else:
+                data = await request.get_json(silent=True) or {}
+                content, api_key = verify_sha256(decode_data_url(data.get("image") or ""), data.get("sha256")), data.get("apiKey")
+    except ImageTooLarge:
+        return jsonify(TOO_LARGE_ERROR), 413
+    except UploadError as e:
+        return jsonify({"error": str(e)})
+    if wants_job(request):
+        return job_response("analyze", [content], api_key)
+    meta = {}
+    result = await aio.extract_menu_from_image(get_client(api_key), content, analysis_cache, meta, school_menus)
+    return jsonify(result), meta_headers(meta)
+
+
+@app.route('/api/analyze/batch', methods=['POST'])
+async def api_analyze_batch():
+    try:
+        with metrics.stage("decode"):
+            if request.mimetype == "multipart/form-data":
+                files, form = await request.files, await request.form
+                contents = verify_all([read_file(f) for f in files.getlist("images") if f], form.getlist("sha256"))
+                api_key = form.get("apiKey")
+            else:
+                data = await request.get_json(silent=True) or {}
+                contents = verify_all([decode_data_url(img) for img in data.get("images", []) if img], data.get("hashes"))
+                api_key = data.get("apiKey")
+    except ImageTooLarge:
+        return jsonify(TOO_LARGE_ERROR), 413
+    except UploadError as e:
+        return jsonify({"error": str(e)})
+    if not contents:
+        return jsonify({"error": "분석할 이미지가 없습니다."})
+    if len(contents) > BATCH_MAX_IMAGES:
+        return jsonify({"error": f"한 번에 최대 {BATCH_MAX_IMAGES}장까지 분석할 수 있습니다."})
+    if wants_job(request):
+        return job_response("analyze_batch", contents, api_key)
+    meta = {}
+    result = await aio.extract_menus_batch(get_client(api_key), contents, analysis_cache, meta, school_menus)
+    return jsonify(result), meta_headers(meta)
+
+
+@app.route('/api/analyze/lookup', methods=['POST'])
+async def api_analyze_lookup():
+    data = await request.get_json(silent=True) or {}
+    hashes = [str(h).lower() for h in data.get("hashes") or []]
+    if not hashes or len(hashes) > BATCH_MAX_IMAGES or not all(is_sha256(h) for h in hashes):
+        return jsonify({"error": "이미지 해시(SHA-256) 형식이 올바르지 않습니다."}), 400
+    # 분석 캐시 디스크(SQLite) 조회가 이벤트 루프를 막지 않도록 스레드에서
+    return jsonify(await asyncio.to_thread(lookup_analysis, analysis_cache, job_queue, hashes, data.get("apiKey")))
+
+
+@app.route('/api/schools')
+async def api_schools():
+    return jsonify({"schools": await asyncio.to_thread(school_menus.schools, request.args.get("q", ""))})
+
+
+@app.route('/api/schools/menu')
+async def api_school_menu():
+    school = normalize_school(request.args.get("school"))
+    month = parse_month(request.args.get("month"))
+    if not school or month is None:
+        return jsonify(BAD_QUERY_ERROR), 400
+    result = await asyncio.to_thread(school_menus.month_menu, school, *month)
+    metrics.CACHE_LOOKUPS.inc(cache="school", result="miss" if result is None else "hit")
+    if result is None:
+        return jsonify(NO_SCHOOL_MENU_ERROR), 404
+    return jsonify(result)
+
+
+@app.route('/api/jobs/<job_id>')
+async def api_job(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify(NOT_FOUND_ERROR), 404
+    return jsonify(job.to_dict())
+
+
+@app.route('/api/jobs/<job_id>/events')
+async def api_job_events(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify(NOT_FOUND_ERROR), 404
+
+    async def generate():
+        version = None
+        while True:
+            if job.version != version:
+                version = job.version
+                yield sse("done" if job.finished else "progress", job.to_dict())
+                if job.finished:
+                    return
+            elif await wait_async(job, version, 15) == version:
+                yield ": keep-alive\n\n"
+
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+def recommend_session(data, ai_client):
+    """sessionId 를 보낸 요청의 추천 세션 (없으면 None)"""
+    provider = ai_client["type"] if ai_client else "offline"
+    return recommend_sessions.get(session_key(data.get('sessionId'), provider, data.get('lunch', ''), data.get('ingredients', '')))
+
+
+@app.route('/api/recommend', methods=['POST'])
+async def api_recommend():
+    data = await request.get_json()
+    ai_client = get_client(data.get('apiKey'))
+    meta = {}
+    result = await aio.recommend(ai_client, data.get('lunch', ''), data.get('ingredients', ''), data.get('clickCount', 0),
+                                 recommend_cache, meta, recommend_session(data, ai_client))
+    return jsonify(result), meta_headers(meta)
+
+
+@app.route('/api/recommend/stream', methods=['POST'])
+async def api_recommend_stream():
+    data = await request.get_json()
+    ai_client = get_client(data.get('apiKey'))
+    events = aio.recommend_events(ai_client, data.get('lunch', ''), data.get('ingredients', ''), data.get('clickCount', 0),
+                                  recommend_cache, recommend_session(data, ai_client))
+    return Response(events, mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@app.route('/api/plan', methods=['POST'])
+async def api_plan():
+    data = await request.get_json() or {}
+    meta = {}
+    result = await aio.plan(get_client(data.get('apiKey')), data.get('menuData'), data.get('ingredients', ''), meta)
+    return jsonify(result), meta_headers(meta)
@@ -0,0 +1,173 @@
+import os
+import re
+import hashlib
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from dinnerbot.layout import LAYOUT_MIN_CONFIDENCE, parse_menu_grid
+from dinnerbot.menu import screen_ocr_text, menu_text
+
+BATCH_MAX_IMAGES = int(os.getenv("BATCH_MAX_IMAGES", "12"))
+BATCH_OCR_WORKERS = int(os.getenv("BATCH_OCR_WORKERS", "4"))
+
+# 여러 요청이 함께 쓰는 OCR 작업 풀 (동시 Vision 호출 수 상한)
+ocr_pool = ThreadPoolExecutor(max_workers=BATCH_OCR_WORKERS, thread_name_prefix="ocr")
+
+
+def batch_image_key(image_keys):
+    """페이지 묶음 전체의 캐시 키 (페이지 SHA-256 목록, 순서 무관)"""
+    if any(k is None for k in image_keys):
+        return None
+    return hashlib.sha256("".join(sorted(image_keys)).encode()).hexdigest()
+
+
+def split_pages(cache, image_keys, images, ocrs):
+    """페이지 분류 → (바로 얻은 결과, AI 로 정리할 텍스트 페이지, 이미지 판독이 필요한 페이지, 마지막 거절 사유, 페이지별 경로)
+
+    캐시에 있거나 표 구조를 로컬에서 충분히 읽을 수 있는 페이지는 AI 호출 없이 결과에 넣는다.
+    """
+    menus, text_pages, image_pages, rejected, paths = [], [], [], None, []
+    for n, (image_key, image, ocr) in enumerate(zip(image_keys, images, ocrs), 1):
+        raw_text = ocr["text"] if ocr else None
+        page_cached = cache.get_menu(image_key)
+        if page_cached is None and raw_text:
+            page_cached = cache.get_menu_by_text(raw_text)
+        if page_cached is not None:
+            menus.append(page_cached)
+            paths.append("cache")
+        elif not raw_text:
+            image_pages.append(image)
+            paths.append("vision-llm")
+        else:
+            page_rejected = screen_ocr_text(raw_text)
+            if page_rejected:
+                rejected = page_rejected  # 급식표가 아닌 페이지는 건너뜀
+                continue
+            menu, confidence = parse_menu_grid(ocr["words"])
+            if confidence >= LAYOUT_MIN_CONFIDENCE:
+                cache.put_menu(image_key, menu, raw_text)
+                menus.append(menu)
+                paths.append("layout")
+            else:
+                text_pages.append((n, raw_text))
+                paths.append("llm")
+    return menus, text_pages, image_pages, rejected, paths
+
+
+NOT_MENU_ERROR = {"error": "급식표로 보기 어려운 이미지입니다. 식단표를 다시 확인해 주세요."}
+
+
+def build_batch_prompt(pages):
+    """[(페이지 번호, OCR 텍스트)] → 한 번의 AI 호출로 정리하는 프롬프트"""
+    texts = "\n\n".join(f"[{n}페이지]\n{text}" for n, text in pages)
+    return ("아래는 한 학교 급식표 여러 페이지의 OCR 텍스트야. 모든 페이지의 날짜별 메뉴를 하나로 합쳐 "
+            "{\"날짜\": \"메뉴내용\"} 형식의 단순한 JSON 객체로 정리해줘. 같은 날짜가 여러 번 나오면 한 번만 써줘. "
+            "급식표가 아니면 {\"error\": \"판독 불가\"} 응답해줘.\n"
+            f"{texts}\n결과는 반드시 순수한 JSON 객체여야 하며, 다른 텍스트는 포함하지 마.")
+
+
+DATE_PATTERNS = [
+    re.compile(r"(?P<y>\d{4})\s*[-./년]\s*(?P<m>\d{1,2})\s*[-./월]\s*(?P<d>\d{1,2})"),
+    re.compile(r"(?P<m>\d{1,2})\s*월\s*(?P<d>\d{1,2})\s*일"),
+    re.compile(r"(?P<m>\d{1,2})\s*[/.-]\s*(?P<d>\d{1,2})"),
+    re.compile(r"(?P<d>\d{1,2})\s*(?:일|\(\s*[월화수목금토일]\s*\))"),
+]
+# 날짜를 못 읽은 표기는 달력 끝에
+UNDATED = (9999, 99, 99)
+
+
+def parse_date(label):
+    """날짜 표기('3월 4일(월)', '3/4', '2025-03-04', '4일', '4(월)') → (연 또는 0, 월 또는 0, 일), 못 읽으면 None"""
+    for pattern in DATE_PATTERNS:
+        m = pattern.search(str(label))
+        if not m:
+            continue
+        g = m.groupdict()
+        year, month, day = int(g.get("y") or 0), int(g.get("m") or 0), int(g["d"])
+        if month <= 12 and 1 <= day <= 31:
+            return year, month, day
+    return None
+
+
+def date_key(label):
+    """날짜 표기 → 비교용 (월, 일) (월이 없으면 0)"""
+    parsed = parse_date(label)
+    return parsed[1:] if parsed else None
+
+
+def nearest_year(month, year, ref_month):
+    """(year, ref_month) 에 가장 가까운 month 의 연도 (12월 기준 1월은 다음 해, 1월 기준 12월은 전해)"""
+    if month - ref_month > 6:
+        return year - 1
+    if ref_month - month > 6:
+        return year + 1
+    return year
+
+
+def resolve_dates(pages, ref=None, today=None):
+    """페이지별 날짜 표기 목록 → 페이지별 {표기: (연, 월, 일)} (날짜를 못 읽은 표기는 빠짐)
+
+    월이 없는 표기('4일', '4(월)')는 같은 페이지의 앞 날짜(없으면 뒤 날짜) 월로 채우고, 페이지에 월이
+    하나도 없으면 묶음 전체에서 가장 많이 나온 월부터 이어 붙인다. 연도가 없으면 기준 달 ref=(연, 월)에 가장
+    가까운 해 — ref 를 주지 않으면 묶음의 대표 월과 오늘로 정한다 (schools.detect_month 와 같은 규칙).
+    """
+    parsed = [[(label, parse_date(label)) for label in labels] for labels in pages]
+    months = Counter(p[1] for page in parsed for _, p in page if p and p[1])
+    common_month = months.most_common(1)[0][0] if months else None
+    if ref is None:
+        today = today or date.today()
+        years = Counter(p[0] for page in parsed for _, p in page if p and p[0])
+        ref_month = common_month or today.month
+        ref_year = years.most_common(1)[0][0] if years else nearest_year(ref_month, today.year, today.month)
+        ref = (ref_year, ref_month)
+    resolved = []
+    for page in parsed:
+        known = [(i, p) for i, (_, p) in enumerate(page) if p and p[1]]
+        dates = {}
+        running, last_day = common_month or ref[1], 0
+        for i, (label, p) in enumerate(page):
+            if not p:
+                continue
+            year, month, day = p
+            if not month:
+                month = _fill_month(i, day, known)
+            if not month:
+                # 페이지에 월이 하나도 없으면 대표 월부터, 일이 줄면 ('31일' → '1일') 다음 달
+                if day < last_day:
+                    running = running % 12 + 1
+                month = running
+            last_day = day
+            dates[label] = (year or nearest_year(month, *ref), month, day)
+        resolved.append(dates)
+    return resolved
+
+
+def _fill_month(i, day, known):
+    """월이 없는 i 번째 날짜의 월: 앞 날짜의 월 (일이 줄면 다음 달), 없으면 뒤 날짜의 월 (일이 늘면 전달)"""
+    before = [p for j, p in known if j < i]
+    if before:
+        _, month, prev_day = before[-1]
+        return month if day >= prev_day else month % 12 + 1
+    after = [p for j, p in known if j > i]
+    if after:
+        _, month, next_day = after[0]
+        return month if day <= next_day else (month - 2) % 12 + 1
+    return None
+
+
+def merge_menus(menus, today=None):
+    """여러 페이지의 {'날짜': '메뉴'} 를 날짜 기준으로 중복 없이 합친 하나의 달력 (연·월·일 순)"""
+    pages = [menu for menu in menus if isinstance(menu, dict) and "error" not in menu]
+    merged = {}  # 비교 키 -> [표시용 날짜, 메뉴 항목 목록]
+    for menu, dates in zip(pages, resolve_dates([list(menu) for menu in pages], today=today)):
+        for label, value in menu.items():
+            key = dates.get(label) or str(label).strip()
+            items = [i.strip() for i in re.split(r"[,\n]", menu_text(value)) if i.strip()]
+            if key not in merged:
+                merged[key] = [label, []]
+            for item in items:
+                if item not in merged[key][1]:
+                    merged[key][1].append(item)
+    ordered = sorted(merged.items(), key=lambda kv: kv[0] if isinstance(kv[0], tuple) else UNDATED)
+    return {label: ", ".join(items) for _, (label, items) in ordered}
@@ -0,0 +1,242 @@
+import os
+import re
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from dinnerbot import metrics
+
+
+class LRUCache:
+    """메모리 LRU 캐시 (항목 수 / 총 바이트 / TTL 기준 만료)"""
+
+    def __init__(self, max_items=256, max_bytes=32 * 1024 * 1024, ttl=24 * 3600):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()  # key -> (expires_at, size, value)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            if item[0] < time.time():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[2]
+
+    def set(self, key, value, size=1):
+        with self._lock:
+            if key in self._items:
+                self._remove(key)
+            self._items[key] = (time.time() + self.ttl, size, value)
+            self._bytes += size
+            while self._items and (len(self._items) > self.max_items or self._bytes > self.max_bytes):
+                self._remove(next(iter(self._items)))
+
+    def _remove(self, key):
+        _, size, _ = self._items.pop(key)
+        self._bytes -= size
+
+    def __len__(self):
+        return len(self._items)
+
+
+class SQLiteStore:
+    """재시작 후에도 유지되는 디스크 캐시 계층
+
+    만료(ttl)된 행과 max_items 를 넘는 오래된 행은 쓰기 때 PURGE_INTERVAL 초마다 한 번 지운다.
+    """
+
+    PURGE_INTERVAL = 300
+
+    def __init__(self, path, ttl=7 * 24 * 3600, max_items=10000):
+        self.ttl = ttl
+        self.max_items = max_items
+        self._purged = 0.0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, ns TEXT, value TEXT, created REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_ns ON cache (ns, created)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_created ON cache (created)")
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM cache WHERE key = ? AND created >= ?",
+                (key, time.time() - self.ttl),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key, ns, value):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, ns, value, created) VALUES (?, ?, ?, ?)",
+                (key, ns, json.dumps(value, ensure_ascii=False), now),
+            )
+            if now - self._purged >= self.PURGE_INTERVAL:
+                self._purged = now
+                self._purge(now)
+
+    def _purge(self, now):
+        self._conn.execute("DELETE FROM cache WHERE created < ?", (now - self.ttl,))
+        self._conn.execute(
+            "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY created DESC LIMIT -1 OFFSET ?)",
+            (self.max_items,),
+        )
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+
+def text_digest(text):
+    """OCR 텍스트 비교 키 (공백 차이 무시)"""
+    return hashlib.sha256(re.sub(r"\s+", "", text or "").encode("utf-8")).hexdigest()
+
+
+class TieredCache:
+    """메모리 LRU + 선택적 SQLite 디스크 계층 (키: 네임스페이스 + digest 문자열)
+
+    크기/유효 시간은 {ENV}_SIZE, {ENV}_MB, {ENV}_TTL, 디스크 계층은 {ENV}_DB, {ENV}_DISK_TTL,
+    {ENV}_DISK_ITEMS 환경 변수로 정한다.
+    """
+
+    ENV = None
+    DEFAULTS = {"SIZE": 256, "MB": 32, "TTL": 24 * 3600, "DISK_TTL": 7 * 24 * 3600, "DISK_ITEMS": 10000}
+
+    def __init__(self, memory, disk=None):
+        self.memory = memory
+        self.disk = disk
+
+    @classmethod
+    def from_env(cls):
+        def setting(name):
+            return int(os.getenv(f"{cls.ENV}_{name}", str(cls.DEFAULTS[name])))
+
+        memory = LRUCache(max_items=setting("SIZE"), max_bytes=setting("MB") * 1024 * 1024, ttl=setting("TTL"))
+        disk = None
+        db_path = os.getenv(f"{cls.ENV}_DB")
+        if db_path:
+            try:
+                disk = SQLiteStore(db_path, ttl=setting("DISK_TTL"), max_items=setting("DISK_ITEMS"))
+            except Exception as e:
+                print(f"Cache DB Error: {e}")
+        return cls(memory, disk)
+
+    def _get(self, ns, key):
+        if key is None:
+            return None
+        value = self._lookup(f"{ns}:{key}")
+        metrics.CACHE_LOOKUPS.inc(cache=ns, result="miss" if value is None else "hit")
+        return value
+
+    def _lookup(self, key):
+        value = self.memory.get(key)
+        if value is not None or not self.disk:
+            return value
+        try:
+            value = self.disk.get(key)
+            if value is not None:
+                self._remember(key, value)
+            return value
+        except Exception as e:
+            print(f"Cache DB Error: {e}")
+        return None
+
+    def _put(self, ns, key, value):
+        if key is None:
+            return
+        self._remember(f"{ns}:{key}", value)
+        if self.disk:
+            try:
+                self.disk.set(f"{ns}:{key}", ns, value)
+            except Exception as e:
+                print(f"Cache DB Error: {e}")
+
+    def _remember(self, key, value):
+        size = len(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+        self.memory.set(key, value, size)
+
+
+class AnalysisCache(TieredCache):
+    """급식표 이미지 분석 결과 캐시 (OCR 텍스트 + 날짜별 메뉴 JSON)
+
+    결과는 이미지 SHA-256 이 정확히 같을 때만 돌려준다. 재인코딩/크롭된 사본은 바이트가 달라
+    OCR 은 다시 하지만, OCR 텍스트가 같으면(공백 무시) 그 텍스트로 만든 메뉴를 AI 호출 없이 쓴다.
+    같은 양식의 다른 달 급식표처럼 비슷해 보이는 이미지의 결과는 절대 대신 쓰지 않는다.
+    """
+
+    ENV = "ANALYSIS_CACHE"
+    OCR = "ocr"      # 이미지 SHA-256 → OCR 결과
+    MENU = "menu"    # 이미지(묶음) SHA-256 → 메뉴
+    TEXT = "text"    # OCR 텍스트 digest → 메뉴
+
+    def fingerprint(self, content):
+        """이미지 캐시 키 (디코딩된 바이트의 SHA-256)"""
+        return hashlib.sha256(content).hexdigest()
+
+    def get_ocr(self, image_key):
+        return self._get(self.OCR, image_key)
+
+    def put_ocr(self, image_key, text):
+        self._put(self.OCR, image_key, text)
+
+    def get_menu(self, image_key):
+        return self._get(self.MENU, image_key)
+
+    def put_menu(self, image_key, menu, text=None):
+        """메뉴 저장 (text: 이 메뉴를 만든 OCR 텍스트 → 같은 텍스트의 다른 사본도 재사용)"""
+        self._put(self.MENU, image_key, menu)
+        if text:
+            self._put(self.TEXT, text_digest(text), menu)
+
+    def get_menu_by_text(self, text):
+        """OCR 텍스트가 같은(공백 무시) 이미지에서 만든 메뉴"""
+        return self._get(self.TEXT, text_digest(text)) if text else None
+
+
+class RecommendCache(TieredCache):
+    """저녁 추천 결과 캐시 (정규화된 요청 키 → 추천 JSON, 메모리 LRU + 선택적 SQLite)"""
+
+    ENV = "RECOMMEND_CACHE"
+    DEFAULTS = dict(TieredCache.DEFAULTS, SIZE=512, MB=16, TTL=6 * 3600, DISK_ITEMS=20000)
+    NS = "recommend"
+
+    def __init__(self, memory, disk=None):
+        super().__init__(memory, disk)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        if key is None:
+            return None
+        value = self._get(self.NS, key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self._put(self.NS, key, value)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "items": len(self.memory)}
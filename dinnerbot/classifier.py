@@ -0,0 +1,79 @@
+"""OCR 텍스트가 급식표인지 가려내는 점수형 분류기
+
+키워드 목록을 하나의 정규식으로 컴파일해 텍스트를 한 번만 훑고, 날짜 표기 밀도,
+음식 어휘, 알레르기 번호, 가격 표기 같은 특징을 가중합해 점수를 낸다.
+점수가 MENU_SCORE_THRESHOLD 보다 낮으면 AI 호출 전에 거절한다.
+"""
+import os
+import re
+
+MENU_SCORE_THRESHOLD = float(os.getenv("MENU_SCORE_THRESHOLD", "0.3"))
+
+FOOD, META, NON_MENU = "food", "meta", "non_menu"
+
+# 단어 -> (종류, 가중치). 하나의 정규식으로 묶어 텍스트를 한 번만 스캔한다.
+LEXICON = {}
+for _word in ("밥", "쌀밥", "백미밥", "잡곡밥", "현미밥", "흑미밥", "보리밥", "볶음밥", "비빔밥", "덮밥", "공기밥",
+              "미역국", "된장국", "콩나물국", "떡국", "육개장", "찌개", "된장찌개", "김치찌개", "순두부", "곰탕",
+              "김치", "배추김치", "깍두기", "총각김치", "열무김치", "백김치", "겉절이", "단무지", "피클",
+              "볶음", "조림", "구이", "무침", "나물", "튀김", "부침", "김치전", "갈비찜", "샐러드", "스테이크",
+              "불고기", "제육", "닭갈비", "돈까스", "돈가스", "탕수육", "떡볶이", "잡채", "만두", "어묵", "계란", "달걀",
+              "두부", "감자", "카레", "짜장", "스파게티", "국수", "우동", "라면", "수제비", "호박죽",
+              "우유", "요구르트", "요플레", "주스", "과일", "사과", "귤", "바나나", "수박", "포도", "딸기", "식혜",
+              "빵", "케이크", "쿠키", "머핀", "떡"):
+    LEXICON[_word] = (FOOD, 1.0)
+for _word in ("식단", "식단표", "급식", "메뉴", "중식", "석식", "조식", "간식", "반찬", "칼로리", "열량", "kcal",
+              "영양", "영양사", "단백질", "원산지", "알레르기", "초등학교", "중학교", "고등학교", "어린이집", "유치원"):
+    LEXICON[_word] = (META, 1.0)
+for _word, _weight in (("구하시오", 1.0), ("정답", 1.0), ("풀이", 1.0), ("수학", 1.0), ("방정식", 1.0),
+                       ("계산하시오", 1.0), ("옳은 것", 1.0), ("다음 중", 0.7), ("채점", 1.0), ("단원평가", 1.0),
+                       ("교시", 0.7), ("문제", 0.5), ("계산", 0.5)):
+    LEXICON[_word] = (NON_MENU, _weight)
+
+# 날짜/알레르기 번호/가격/어휘를 하나의 정규식으로 묶어 finditer 한 번에 센다 (어휘는 긴 단어가 먼저 맞도록 길이 역순)
+SCANNER = re.compile(
+    r"(?P<date>\d{1,2}\s*월\s*\d{1,2}\s*일|\b\d{1,2}\s*/\s*\d{1,2}\b|[(\[]\s*[월화수목금]\s*[)\]])"
+    # 메뉴명 바로 뒤의 알레르기 번호 ('미역국5.6.16.', '우유(2)')
+    r"|(?P<allergen>(?<=[가-힣])\s?\(?\d{1,2}(?:\.\d{1,2})+\.?\)?|(?<=[가-힣])\(\d{1,2}\))"
+    r"|(?P<price>\d{1,3}(?:,\d{3})+\s*원?|\d+\s*원)"
+    r"|(?P<word>" + "|".join(re.escape(w) for w in sorted(LEXICON, key=len, reverse=True)) + ")",
+    re.IGNORECASE,
+)
+
+WEIGHTS = {"food": 0.45, "allergen": 0.25, "date": 0.2, "meta": 0.1, "non_menu": -0.5, "price": -0.3}
+# 특징별 포화점 (이 개수 이상이면 1.0)
+SATURATION = {"food": 6, "allergen": 3, "date": 3, "meta": 2, "non_menu": 2, "price": 3}
+
+
+def features(text):
+    f = {"food": 0.0, "meta": 0.0, "non_menu": 0.0, "date": 0, "allergen": 0, "price": 0}
+    for m in SCANNER.finditer(text):
+        kind = m.lastgroup
+        if kind == "word":
+            kind, weight = LEXICON[m.group(0).lower()]
+            f[kind] += weight
+        else:
+            f[kind] += 1
+    return f
+
+
+def menu_score(text):
+    """(점수, 특징) — 점수가 높을수록 급식표에 가깝다"""
+    f = features(text)
+    score = sum(WEIGHTS[k] * min(1.0, f[k] / SATURATION[k]) for k in WEIGHTS)
+    return round(score, 3), f
+
+
+def classify(text, threshold=None):
+    """급식표로 볼 수 있으면 (True, 점수, 특징)
+
+    20자 이하의 짧은 텍스트는 근거가 적으므로 부정적인 근거(점수 < 0)가 있을 때만 거절하고,
+    긴 텍스트는 음식 어휘나 알레르기 번호가 하나도 없으면 날짜가 많아도 거절한다 (가정통신문 등).
+    """
+    threshold = MENU_SCORE_THRESHOLD if threshold is None else threshold
+    score, f = menu_score(text)
+    if len(text) <= 20:
+        return score >= 0, score, f
+    if not f["food"] and not f["allergen"]:
+        return False, score, f
+    return score >= threshold, score, f
@@ -0,0 +1,177 @@
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+OPENAI_MODEL = "gpt-4o-mini"
+GEMINI_MODEL = "gemini-2.5-flash"
+
+
+def key_fingerprint(key):
+    """API 키 원문 대신 보관하는 식별자"""
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+
+def provider_of(key):
+    if key.startswith("sk-"):
+        return "openai"
+    if key.startswith("AIza"):
+        return "gemini"
+    return None
+
+
+# provider SDK 는 import 에만 수백 ms 가 걸리므로 클라이언트를 처음 만들 때 불러온다
+
+def _build_openai(key):
+    from openai import OpenAI
+
+    return OpenAI(api_key=key)
+
+
+class GeminiModel:
+    """키 하나에 묶인 Gemini 모델 (genai.GenerativeModel 의 generate_content 호출 형태)
+
+    genai.configure()는 프로세스 전역 설정이라 키가 다른 동시 요청끼리 덮어쓰게 된다.
+    키마다 공개 API 인 generativelanguage 서비스 클라이언트를 만들고, 요청/응답 변환만
+    genai 타입 함수를 빌려 쓴다. 같은 키의 다른 모델은 with_model() 로 채널을 공유한다.
+    """
+
+    def __init__(self, model_name, service=None, async_service=None):
+        self.model_name = model_name if model_name.startswith("models/") else f"models/{model_name}"
+        self.service = service              # GenerativeServiceClient (동기)
+        self.async_service = async_service  # GenerativeServiceAsyncClient (비동기)
+
+    def with_model(self, model_name):
+        return GeminiModel(model_name, self.service, self.async_service)
+
+    def _request(self, contents, generation_config):
+        from google.generativeai import protos
+        from google.generativeai.types import content_types, generation_types
+
+        request = protos.GenerateContentRequest(
+            model=self.model_name,
+            contents=content_types.to_contents(contents),
+            generation_config=generation_types.to_generation_config_dict(generation_config),
+        )
+        if request.contents and not request.contents[-1].role:
+            request.contents[-1].role = "user"
+        return request
+
+    def generate_content(self, contents, generation_config=None, stream=False):
+        from google.generativeai.types import generation_types
+
+        request = self._request(contents, generation_config)
+        if stream:
+            return generation_types.GenerateContentResponse.from_iterator(self.service.stream_generate_content(request))
+        return generation_types.GenerateContentResponse.from_response(self.service.generate_content(request))
+
+    async def generate_content_async(self, contents, generation_config=None, stream=False):
+        from google.generativeai.types import generation_types
+
+        request = self._request(contents, generation_config)
+        if stream:
+            iterator = await self.async_service.stream_generate_content(request)
+            return await generation_types.AsyncGenerateContentResponse.from_aiterator(iterator)
+        response = await self.async_service.generate_content(request)
+        return generation_types.AsyncGenerateContentResponse.from_response(response)
+
+
+def _build_gemini(key):
+    from google.ai import generativelanguage as glm
+
+    return GeminiModel(GEMINI_MODEL, service=glm.GenerativeServiceClient(client_options={"api_key": key}))
+
+
+class ClientRegistry:
+    """(provider, 키 지문)별로 keep-alive 클라이언트를 재사용하는 레지스트리"""
+
+    builders = {"openai": _build_openai, "gemini": _build_gemini}
+
+    def __init__(self, max_size=32, idle_ttl=600):
+        self.max_size = max_size
+        self.idle_ttl = idle_ttl
+        self._clients = OrderedDict()  # (provider, fingerprint) -> [last_used, client dict]
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_size=int(os.getenv("CLIENT_POOL_SIZE", "32")),
+            idle_ttl=int(os.getenv("CLIENT_IDLE_TTL", "600")),
+        )
+
+    def get(self, key):
+        provider = provider_of(key)
+        if provider is None:
+            return None
+        pool_key = (provider, key_fingerprint(key))
+        now = time.time()
+        with self._lock:
+            self._evict_idle(now)
+            entry = self._clients.get(pool_key)
+            if entry is not None:
+                entry[0] = now
+                self._clients.move_to_end(pool_key)
+                return entry[1]
+        # 클라이언트 생성(채널 준비)은 잠금 밖에서 수행
+        client = {"type": provider, "client": self.builders[provider](key), "key_id": pool_key[1]}
+        with self._lock:
+            entry = self._clients.setdefault(pool_key, [now, client])
+            self._clients.move_to_end(pool_key)
+            while len(self._clients) > self.max_size:
+                self._evicted(self._clients.popitem(last=False)[1][1])
+            if entry[1] is not client:
+                # 동시에 만든 쪽이 먼저 등록됨
+                self._evicted(client)
+            return entry[1]
+
+    def _evict_idle(self, now):
+        while self._clients:
+            pool_key, (last_used, client) = next(iter(self._clients.items()))
+            if now - last_used <= self.idle_ttl:
+                break
+            del self._clients[pool_key]
+            self._evicted(client)
+
+    def _evicted(self, client):
+        """풀에서 빠진 클라이언트 (동기 클라이언트는 GC 가 연결을 정리)"""
+
+    def __len__(self):
+        return len(self._clients)
+
+
+_vision_client = None
+_vision_lock = threading.Lock()
+
+
+def get_vision_client():
+    """프로세스 전체에서 공유하는 Vision 클라이언트 (gRPC 채널 1개 재사용)"""
+    global _vision_client
+    if _vision_client is None:
+        with _vision_lock:
+            if _vision_client is None:
+                from google.cloud import vision
+
+                _vision_client = vision.ImageAnnotatorClient()
+    return _vision_client
+
+
+def warm_up():
+    """SDK import 와 Vision 채널 준비를 미리 해 두고 단계별 소요 시간(ms)을 돌려준다"""
+    timings = {}
+    steps = [
+        ("openai", lambda: __import__("openai")),
+        ("google.generativeai", lambda: __import__("google.generativeai")),
+        ("google.cloud.vision", lambda: __import__("google.cloud.vision")),
+        ("vision_client", get_vision_client),
+    ]
+    for name, step in steps:
+        started = time.perf_counter()
+        try:
+            step()
+            timings[name] = round((time.perf_counter() - started) * 1000, 1)
+        except Exception as e:
+            print(f"Warm-up Error ({name}): {e}")
+            timings[name] = None
+    return timings
@@ -0,0 +1,50 @@
+import os
+import io
+
+from PIL import Image, ImageOps
+
+# OCR 에 충분한 해상도 (긴 변 기준 픽셀)
+OCR_MAX_SIDE = int(os.getenv("OCR_MAX_SIDE", "2048"))
+OCR_JPEG_QUALITY = int(os.getenv("OCR_JPEG_QUALITY", "85"))
+OCR_GRAYSCALE = os.getenv("OCR_GRAYSCALE", "1") == "1"
+
+
+class NormalizedImage:
+    """OCR/AI 로 보낼 이미지 (정규화 결과 + 원본 크기)"""
+
+    def __init__(self, data, mime, original_size):
+        self.data = data
+        self.mime = mime
+        self.original_size = original_size
+
+    @property
+    def saved(self):
+        return self.original_size - len(self.data)
+
+
+def normalize_image(content):
+    """EXIF 회전 보정 → 축소 → 흑백 → 적당한 크기의 JPEG 재인코딩
+
+    이미지로 열 수 없으면 원본을 그대로 넘기고, 회전/축소가 필요 없는데 재인코딩이
+    오히려 커지면 원본을 실제 형식의 MIME 타입으로 쓴다.
+    """
+    try:
+        img = Image.open(io.BytesIO(content))
+        source_mime = Image.MIME.get(img.format, "image/jpeg")
+        oriented = img.getexif().get(0x0112, 1) not in (1, None)
+        resized = max(img.size) > OCR_MAX_SIDE
+        # JPEG 는 디코딩 단계에서 미리 축소 (12MP 사진도 빠르게)
+        img.draft("L" if OCR_GRAYSCALE else "RGB", (OCR_MAX_SIDE, OCR_MAX_SIDE))
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((OCR_MAX_SIDE, OCR_MAX_SIDE), Image.LANCZOS)
+        img = img.convert("L" if OCR_GRAYSCALE else "RGB")
+        out = io.BytesIO()
+        img.save(out, "JPEG", quality=OCR_JPEG_QUALITY, optimize=True)
+        data = out.getvalue()
+    except Exception as e:
+        print(f"Image Normalize Error: {e}")
+        return NormalizedImage(content, "image/jpeg", len(content))
+
+    if len(data) >= len(content) and not oriented and not resized:
+        return NormalizedImage(content, source_mime, len(content))
+    return NormalizedImage(data, "image/jpeg", len(content))
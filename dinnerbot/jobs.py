@@ -0,0 +1,372 @@
+"""급식표 분석 백그라운드 작업 (POST 는 작업 id 만 바로 돌려주고, 결과는 조회/구독)
+
+OCR + AI 정리가 끝날 때까지 요청(서버리스라면 함수 실행 시간)을 붙잡지 않도록, 작업을
+프로세스 안의 제한된 워커(JOB_WORKERS)에서 실행하고 단계(decode, normalize, ocr, layout,
+llm, parse …)가 바뀔 때마다 상태를 갱신한다. 같은 이미지(SHA-256)를 같은 API 키(provider +
+키 지문)로 진행 중인 작업이 있으면 새로 실행하지 않고 그 작업 id 를 돌려준다. 키가 다르면
+다른 사람의 키로 분석하지 않도록 따로 실행한다.
+JOB_DB 를 설정하면 작업을 SQLite 에 남겨 재시작 후에도 끝나지 않은 작업을 이어서 실행한다.
+사용자가 보낸 API 키는 디스크에 쓰지 않으므로 재시작 후 이어 하는 작업은 서버 키를 쓴다.
+"""
+import os
+import json
+import time
+import uuid
+import base64
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from dinnerbot import metrics
+from dinnerbot.batch import batch_image_key
+from dinnerbot.cache import LRUCache
+from dinnerbot.clients import key_fingerprint, provider_of
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# 대기 + 실행 중인 작업 수 상한 (넘으면 503)
+JOB_MAX_PENDING = int(os.getenv("JOB_MAX_PENDING", "32"))
+# 끝난 작업을 조회할 수 있는 시간(초) / 메모리에 남겨 둘 끝난 작업 수
+JOB_TTL = int(os.getenv("JOB_TTL", "3600"))
+JOB_HISTORY = int(os.getenv("JOB_HISTORY", "1000"))
+JOB_DB = os.getenv("JOB_DB")
+# 응답 뒤에 프로세스가 멈추는 서버리스(Vercel)에서는 기본으로 끔 (?mode=job 요청도 바로 분석)
+JOBS_ENABLED = os.getenv("JOBS_ENABLED", "0" if os.getenv("VERCEL") else "1") == "1"
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "error"
+QUEUE_FULL_ERROR = {"error": "분석 요청이 많아 잠시 후 다시 시도해 주세요."}
+NOT_FOUND_ERROR = {"error": "작업을 찾을 수 없습니다. 만료되었을 수 있어요."}
+JOB_ERROR = {"error": "분석 중 오류가 발생했습니다. 다시 시도해 주세요."}
+
+
+def wants_job(request):
+    """?mode=job 또는 'Prefer: respond-async' 이면 작업 id 만 바로 응답 (JOBS_ENABLED=0 이면 항상 바로 분석)"""
+    return JOBS_ENABLED and (request.args.get('mode') == 'job' or 'respond-async' in request.headers.get('Prefer', ''))
+
+
+class JobQueueFull(Exception):
+    """대기 중인 작업이 JOB_MAX_PENDING 개를 넘었을 때"""
+
+
+def images_key(contents):
+    """작업 병합 키 (이미지 바이트의 SHA-256, 여러 장이면 순서 무관)"""
+    return digests_key([hashlib.sha256(c).hexdigest() for c in contents])
+
+
+def digests_key(digests):
+    """이미 계산한 SHA-256 목록 → 작업 병합 키 (업로드 전 해시 조회용)"""
+    return hashlib.sha256("".join(sorted(digests)).encode()).hexdigest()
+
+
+def job_key(images, api_key):
+    """이미지 키 + 분석에 쓸 API 키 (provider, 지문) → 작업 병합 키 (키를 안 보냈으면 서버 키)"""
+    key = api_key.strip() if api_key and api_key.strip() else None
+    owner = f"{provider_of(key)}:{key_fingerprint(key)}" if key else "server"
+    return hashlib.sha256(f"{images}|{owner}".encode()).hexdigest()
+
+
+def lookup_analysis(cache, queue, hashes, api_key=None):
+    """업로드 전 해시 조회 → {"found": True, "result"} / {"found": False[, "jobId": 같은 이미지·같은 키로 진행 중인 작업]}
+
+    hashes 는 브라우저가 압축한 이미지의 SHA-256 (여러 장이면 /api/analyze/batch 와 같은 묶음 키로 조회).
+    """
+    cached = cache.get_menu(hashes[0] if len(hashes) == 1 else batch_image_key(hashes))
+    metrics.CACHE_LOOKUPS.inc(cache="upload", result="hit" if cached is not None else "miss")
+    if cached is not None:
+        return {"found": True, "result": cached}
+    job = queue.find(job_key(digests_key(hashes), api_key))
+    return {"found": False, "jobId": job.id} if job else {"found": False}
+
+
+class Job:
+    """분석 작업 하나 (상태가 바뀔 때마다 version 이 올라가고 기다리는 쪽을 깨움)"""
+
+    def __init__(self, kind, key, images, api_key=None, job_id=None, created=None):
+        self.id = job_id or uuid.uuid4().hex
+        self.kind = kind            # analyze / analyze_batch
+        self.key = key
+        self.images = images        # 원본 이미지 바이트 목록 (끝나면 비움)
+        self.api_key = api_key      # 메모리에만 보관
+        self.status = QUEUED
+        self.stage = None
+        self.stages = []            # 지나온 단계 이름 (순서대로)
+        self.result = None
+        self.meta = {}
+        self.created = created or time.time()
+        self.updated = self.created
+        self.version = 0
+        self.cond = threading.Condition()
+        self.event = None           # 비동기 모드에서 상태 변화를 알리는 asyncio.Event
+
+    def _changed(self):
+        self.updated = time.time()
+        self.version += 1
+        self.cond.notify_all()
+        if self.event is not None:
+            # 기다리던 구독자를 모두 깨우고, 다음 변화는 새 Event 로 알림
+            self.event.set()
+            self.event = None
+
+    def enter(self, stage):
+        with self.cond:
+            self.stage = stage
+            self.stages.append(stage)
+            self._changed()
+
+    def start(self):
+        with self.cond:
+            self.status = RUNNING
+            self._changed()
+
+    def finish(self, result, meta, status=DONE):
+        with self.cond:
+            self.status = status
+            self.stage = None
+            self.result = result
+            self.meta = meta or {}
+            self.images = None
+            self._changed()
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED)
+
+    def wait(self, version, timeout):
+        """version 이후 상태가 바뀌거나 끝날 때까지 기다림 → 현재 version"""
+        with self.cond:
+            if self.version == version and not self.finished:
+                self.cond.wait(timeout)
+            return self.version
+
+    def to_dict(self):
+        data = {"jobId": self.id, "status": self.status, "stage": self.stage, "stages": list(self.stages),
+                "created": round(self.created, 3), "updated": round(self.updated, 3)}
+        if self.finished:
+            data["result"] = self.result
+            data["meta"] = self.meta
+        return data
+
+
+class JobDB:
+    """작업 기록 SQLite (끝나지 않은 작업은 이미지까지, 끝난 작업은 결과만 보관)"""
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, kind TEXT, key TEXT, status TEXT, stages TEXT, images TEXT, "
+                "result TEXT, meta TEXT, created REAL, updated REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created)")
+
+    def insert(self, job):
+        images = json.dumps([base64.b64encode(c).decode() for c in job.images])
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs (id, kind, key, status, stages, images, result, meta, created, updated) "
+                "VALUES (?, ?, ?, ?, '[]', ?, NULL, '{}', ?, ?)",
+                (job.id, job.kind, job.key, job.status, images, job.created, job.updated),
+            )
+
+    def update(self, job):
+        with self._lock, self._conn:
+            if job.finished:
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, stages = ?, images = NULL, result = ?, meta = ?, updated = ? WHERE id = ?",
+                    (job.status, json.dumps(job.stages), json.dumps(job.result, ensure_ascii=False),
+                     json.dumps(job.meta, ensure_ascii=False), job.updated, job.id),
+                )
+            else:
+                self._conn.execute("UPDATE jobs SET status = ?, updated = ? WHERE id = ?", (job.status, job.updated, job.id))
+
+    def get(self, job_id, ttl):
+        """끝난 작업 (메모리에서 밀려났거나 재시작 전에 끝난 작업 조회용)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT kind, key, status, stages, result, meta, created, updated FROM jobs "
+                "WHERE id = ? AND status IN (?, ?) AND updated >= ?",
+                (job_id, DONE, FAILED, time.time() - ttl),
+            ).fetchone()
+        if not row:
+            return None
+        job = Job(row[0], row[1], None, job_id=job_id, created=row[6])
+        job.status, job.stages, job.result, job.meta, job.updated = row[2], json.loads(row[3]), json.loads(row[4]), json.loads(row[5]), row[7]
+        return job
+
+    def unfinished(self):
+        """재시작 전에 끝나지 못한 작업 (먼저 들어온 순)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, kind, key, images, created FROM jobs WHERE status IN (?, ?) ORDER BY created",
+                (QUEUED, RUNNING),
+            ).fetchall()
+        return [Job(kind, key, [base64.b64decode(c) for c in json.loads(images)], job_id=job_id, created=created)
+                for job_id, kind, key, images, created in rows]
+
+    def purge(self, ttl):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM jobs WHERE status IN (?, ?) AND updated < ?", (DONE, FAILED, time.time() - ttl))
+
+
+class JobQueue:
+    """Flask 용 작업 큐: 스레드 풀에서 handler(job) → (결과, 메타) 실행"""
+
+    def __init__(self, workers=JOB_WORKERS, max_pending=JOB_MAX_PENDING, ttl=JOB_TTL, db=None):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self.db = db
+        self._active = {}      # 작업 id -> 끝나지 않은 작업
+        self._by_key = {}      # 병합 키 -> 끝나지 않은 작업
+        self._finished = LRUCache(max_items=JOB_HISTORY, max_bytes=JOB_HISTORY, ttl=ttl)
+        self._lock = threading.Lock()
+        self._pool = None
+
+    @classmethod
+    def from_env(cls):
+        db = None
+        if JOB_DB:
+            try:
+                db = JobDB(JOB_DB)
+                db.purge(JOB_TTL)
+            except Exception as e:
+                print(f"Job DB Error: {e}")
+        return cls(JOB_WORKERS, JOB_MAX_PENDING, JOB_TTL, db)
+
+    def submit(self, kind, contents, api_key, handler):
+        """작업 등록 → (작업, 병합 여부). 같은 이미지·같은 API 키로 진행 중인 작업이 있으면 그 작업을 돌려줌"""
+        key = job_key(images_key(contents), api_key)
+        with self._lock:
+            running = self._by_key.get(key)
+            if running is not None:
+                metrics.JOBS.inc(kind=kind, result="coalesced")
+                return running, True
+            if len(self._active) >= self.max_pending:
+                metrics.JOBS.inc(kind=kind, result="rejected")
+                raise JobQueueFull()
+            job = Job(kind, key, contents, api_key)
+            self._active[job.id] = job
+            self._by_key[key] = job
+        self._persist(job, insert=True)
+        metrics.JOBS.inc(kind=kind, result="queued")
+        self._start(job, handler)
+        return job, False
+
+    def get(self, job_id):
+        job = self._active.get(job_id) or self._finished.get(job_id)
+        if job is None and self.db:
+            try:
+                job = self.db.get(job_id, self.ttl)
+            except Exception as e:
+                print(f"Job DB Error: {e}")
+        return job
+
+    def find(self, key):
+        """같은 병합 키(이미지 + API 키)로 진행 중인 작업 (없으면 None)"""
+        return self._by_key.get(key)
+
+    def pending(self):
+        return len(self._active)
+
+    def resume(self, handlers):
+        """JOB_DB 에 남은 끝나지 않은 작업을 다시 실행 (handlers: 종류 -> handler)"""
+        if not self.db:
+            return 0
+        try:
+            jobs = self.db.unfinished()
+        except Exception as e:
+            print(f"Job DB Error: {e}")
+            return 0
+        for job in jobs:
+            # API 키는 남기지 않으므로 서버 키로 실행 → 서버 키 작업과 병합
+            job.key = job_key(images_key(job.images), None)
+            with self._lock:
+                self._active[job.id] = job
+                self._by_key.setdefault(job.key, job)
+            metrics.JOBS.inc(kind=job.kind, result="resumed")
+            self._start(job, handlers[job.kind])
+        return len(jobs)
+
+    def _start(self, job, handler):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+        self._pool.submit(self._run, job, handler)
+
+    def _begin(self, job):
+        job.start()
+        self._persist(job)
+        # 이 작업 안에서 metrics.stage() 로 잰 단계를 작업 진행 상황으로 보여 줌
+        metrics.begin_request(on_stage=job.enter)
+
+    def _end(self, job, result, meta, status):
+        job.finish(result, meta, status)
+        metrics.finish_request(f"job:{job.kind}", status)
+        metrics.JOBS.inc(kind=job.kind, result=status)
+        with self._lock:
+            self._active.pop(job.id, None)
+            if self._by_key.get(job.key) is job:
+                del self._by_key[job.key]
+            self._finished.set(job.id, job)
+        self._persist(job)
+
+    def _run(self, job, handler):
+        self._begin(job)
+        try:
+            result, meta = handler(job)
+            self._end(job, result, meta, DONE)
+        except Exception as e:
+            print(f"Job Error: {e}")
+            self._end(job, dict(JOB_ERROR), {}, FAILED)
+
+    def _persist(self, job, insert=False):
+        if not self.db:
+            return
+        try:
+            if insert:
+                self.db.insert(job)
+            else:
+                self.db.update(job)
+        except Exception as e:
+            print(f"Job DB Error: {e}")
+
+
+class AsyncJobQueue(JobQueue):
+    """ASGI 용 작업 큐: 같은 이벤트 루프의 태스크로 await handler(job) 실행 (동시 실행 수는 세마포어로 제한)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._tasks = set()
+        self._slots = None
+
+    def _start(self, job, handler):
+        task = asyncio.ensure_future(self._run_async(job, handler))
+        self._tasks.add(task)  # 태스크가 GC 되지 않도록 참조 유지
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_async(self, job, handler):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers)
+        async with self._slots:
+            self._begin(job)
+            try:
+                result, meta = await handler(job)
+                self._end(job, result, meta, DONE)
+            except Exception as e:
+                print(f"Job Error: {e}")
+                self._end(job, dict(JOB_ERROR), {}, FAILED)
+
+
+async def wait_async(job, version, timeout):
+    """Job.wait 의 비동기 버전"""
+    if job.version == version and not job.finished:
+        if job.event is None:
+            job.event = asyncio.Event()
+        try:
+            await asyncio.wait_for(job.event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+    return job.version
@@ -0,0 +1,242 @@
+"""AI 응답 텍스트에서 JSON 꺼내기 (재호출 없이 로컬에서 보정)
+
+```json 펜스가 있으면 그 안을, 없으면 본문에서 JSON 으로 읽히는 첫 객체/배열을 잘라낸 뒤
+('[참고] …' 처럼 괄호로 시작하는 설명문은 건너뜀), 자주 나오는
+결함(작은따옴표 문자열, 둥근 따옴표, 끝 쉼표, 따옴표 없는 키, True/False/None,
+문자열 속 줄바꿈)을 고쳐서 json.loads 한다. max_tokens 에 걸려 잘린 응답은 마지막으로
+완성된 값까지만 살리고 complete=False 로 알려, 호출한 쪽이 나머지만 이어서 요청할 수 있게 한다.
+"""
+import json
+import re
+
+from dinnerbot import metrics
+
+LITERALS = {"True": "true", "False": "false", "None": "null", "true": "true", "false": "false", "null": "null"}
+OPEN_QUOTES = {'"': '"', "'": "'", "“": "”", "‘": "’"}
+BARE_WORD = re.compile(r"[^\s:,{}\[\]\"']+")
+FENCE = re.compile(r"```(?:json)?[ \t]*\n(.*?)(?:```|\Z)", re.S | re.I)
+# JSON 시작 위치로 시도해 볼 '{' / '[' 개수 상한
+MAX_STARTS = 20
+
+
+class PartialJSONParser:
+    """스트리밍 중인 JSON 조각에서 '완성된 값'까지만 잘라 파싱하는 증분 파서
+
+    문자열/숫자/배열이 닫히는 지점(안전 지점)을 기록해 두고, 그 앞부분에
+    아직 열려 있는 괄호의 짝만 붙여 json.loads 한다.
+    """
+
+    def __init__(self):
+        self.buf = ""
+        self._pos = 0
+        self._started = False
+        self._start = 0
+        self._stack = []        # 열린 컨테이너: ['{', expect_key] 또는 ['[', None]
+        self._in_string = False
+        self._escape = False
+        self._string_is_key = False
+        self._safe = None       # (잘라낼 위치, 닫는 괄호 문자열)
+        self._parsed_safe = None
+        self.value = None
+
+    def feed(self, chunk):
+        """조각을 추가하고, 새로 파싱 가능한 스냅샷이 생기면 반환 (없으면 None)"""
+        self.buf += chunk
+        for i in range(self._pos, len(self.buf)):
+            self._scan(i, self.buf[i])
+        self._pos = len(self.buf)
+        if self._safe is None or self._safe == self._parsed_safe:
+            return None
+        self._parsed_safe = self._safe
+        cut, closers = self._safe
+        try:
+            self.value = json.loads(self.buf[self._start:cut] + closers)
+        except ValueError:
+            return None
+        return self.value
+
+    def _closers(self):
+        return "".join("}" if frame[0] == "{" else "]" for frame in reversed(self._stack))
+
+    def _scan(self, i, ch):
+        if not self._started:
+            if ch == "{":
+                self._started = True
+                self._start = i
+                self._stack.append(["{", True])
+                self._safe = (i + 1, self._closers())
+            return
+        if not self._stack:
+            return
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif ch == "\\":
+                self._escape = True
+            elif ch == '"':
+                self._in_string = False
+                if not self._string_is_key:
+                    self._safe = (i + 1, self._closers())
+            return
+        top = self._stack[-1]
+        if ch == '"':
+            self._in_string = True
+            self._string_is_key = top[0] == "{" and top[1]
+        elif ch == ":":
+            top[1] = False
+        elif ch == ",":
+            self._safe = (i, self._closers())
+            if top[0] == "{":
+                top[1] = True
+        elif ch in "{[":
+            self._stack.append([ch, True if ch == "{" else None])
+            self._safe = (i + 1, self._closers())
+        elif ch in "}]":
+            self._stack.pop()
+            self._safe = (i + 1, self._closers())
+
+
+def extract_json(text):
+    """텍스트 → (값, 완결 여부). 쓸 만한 JSON 이 전혀 없으면 ValueError
+
+    완결 여부가 False 면 응답이 중간에 잘린 것 (값은 잘리기 전까지 완성된 부분).
+    """
+    if not isinstance(text, str):
+        raise ValueError("AI 응답이 문자열이 아닙니다.")
+    try:
+        return json.loads(text.strip()), True
+    except ValueError:
+        pass
+    found = _locate(text)
+    if found is None:
+        raise ValueError("AI 응답에서 JSON을 찾지 못했습니다.")
+    repaired, complete, value = found
+    if complete:
+        metrics.FALLBACKS.inc(kind="json", reason="repaired")
+        return value, True
+    parser = PartialJSONParser()
+    parser.feed(repaired)
+    if parser.value is None:
+        raise ValueError("AI 응답이 JSON 이 완성되기 전에 끊겼습니다.")
+    metrics.FALLBACKS.inc(kind="json", reason="truncated")
+    return parser.value, False
+
+
+def is_truncated(text):
+    """JSON 이 시작됐지만 가장 바깥 괄호가 닫히지 않았는지"""
+    if not isinstance(text, str):
+        return False
+    found = _locate(text)
+    return found is not None and not found[1]
+
+
+def _locate(text):
+    """JSON 부분 찾기 → (표준 JSON 문자열, 괄호가 다 닫혔는지, 닫혔으면 값), 없으면 None
+
+    ```json 펜스가 있으면 그 안을 먼저 본다.
+    """
+    fenced = FENCE.search(text)
+    if fenced:
+        found = _locate_from(fenced.group(1))
+        if found is not None:
+            return found
+    return _locate_from(text)
+
+
+def _locate_from(text):
+    """'{' / '[' 마다 차례로 시작해 보고 JSON 으로 읽히는 첫 구간 (읽히지 않는 괄호 구간은 통째로 건너뜀)
+
+    괄호가 닫히기 전에 끝나면 잘린 응답으로 보고 그 구간을 돌려준다 (안쪽 괄호에서 다시 시작하면
+    잘린 응답의 일부만 '완결된 값'으로 읽게 되므로).
+    """
+    pos = 0
+    for _ in range(MAX_STARTS):
+        starts = [i for i in (text.find("{", pos), text.find("[", pos)) if i >= 0]
+        if not starts:
+            return None
+        repaired, complete, end = _repair(text, min(starts))
+        if not complete:
+            return repaired, False, None
+        try:
+            return repaired, True, json.loads(repaired)
+        except ValueError:
+            pos = end
+    return None
+
+
+def _repair(text, start):
+    """start 의 괄호부터 짝이 맞는 곳까지를 표준 JSON 문자열로 → (문자열, 괄호가 다 닫혔는지, 끝난 위치)"""
+    out = []
+    depth = 0
+    quote = None      # 지금 열려 있는 문자열의 닫는 따옴표
+    escape = False
+    i = start
+    while i < len(text):
+        ch = text[i]
+        if quote:
+            if escape:
+                if ch == "'":
+                    out[-1] = "'"  # 작은따옴표 문자열의 \' 는 JSON 에서 그냥 '
+                else:
+                    out.append(ch)
+                escape = False
+            elif ch == "\\":
+                out.append(ch)
+                escape = True
+            elif ch == quote:
+                out.append('"')
+                quote = None
+            elif ch == '"':
+                out.append('\\"')
+            elif ch == "\n":
+                out.append("\\n")
+            elif ch == "\t":
+                out.append("\\t")
+            elif ch != "\r":
+                out.append(ch)
+            i += 1
+            continue
+        if ch in OPEN_QUOTES:
+            quote = OPEN_QUOTES[ch]
+            out.append('"')
+        elif ch in "{[":
+            depth += 1
+            out.append(ch)
+        elif ch in "}]":
+            _drop_trailing_comma(out)
+            depth -= 1
+            out.append(ch)
+            if depth == 0:
+                return "".join(out), True, i + 1
+        elif ch in ",:" or ch.isspace():
+            out.append(ch)
+        else:
+            word = BARE_WORD.match(text, i).group(0)
+            if word in LITERALS:
+                out.append(LITERALS[word])
+            elif text[i + len(word):].lstrip().startswith(":"):
+                out.append(json.dumps(word, ensure_ascii=False))  # 따옴표 없는 키
+            else:
+                out.append(word)  # 숫자 (그 밖의 값은 json.loads 가 거절)
+            i += len(word)
+            continue
+        i += 1
+    return "".join(out), False, len(text)
+
+
+def _drop_trailing_comma(out):
+    j = len(out) - 1
+    while j >= 0 and out[j].isspace():
+        j -= 1
+    if j >= 0 and out[j] == ",":
+        del out[j]
+
+
+def join_continuation(partial, more):
+    """잘린 응답 + 이어서 받은 나머지 (펜스 제거, 앞부분을 다시 쓴 경우 겹친 만큼 제거)"""
+    more = re.sub(r"```(?:json)?", "", more or "").strip("\n")
+    # 잘린 곳이 문자열 안일 수 있으므로 partial 끝의 공백은 그대로 둔다
+    for size in range(min(len(partial), len(more), 200), 10, -1):
+        if more.startswith(partial[-size:]):
+            return partial + more[size:]
+    return partial + more
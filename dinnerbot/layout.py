@@ -0,0 +1,283 @@
+"""Vision 단어 좌표로 급식표 표(날짜 머리글/열/행)를 다시 구성하는 로컬 파서
+
+OCR 결과를 AI 에 보내지 않고도 {'날짜': '메뉴'} 를 만들 수 있으면 그 결과와
+신뢰도(0~1)를 돌려준다. 신뢰도가 낮으면 호출하는 쪽에서 AI 정리로 넘긴다.
+"""
+import os
+import re
+from statistics import median
+
+LAYOUT_MIN_CONFIDENCE = float(os.getenv("LAYOUT_MIN_CONFIDENCE", "0.75"))
+
+# '3월 4일(월)', '3/4(화)', '2025.03.04', '4일 (수)' 등 (단어 몇 개에 걸쳐 있을 수 있음)
+DATE_TOKEN = re.compile(
+    r"^(?P<y>\d{4}\s*[.년/-]\s*)?(?:(?P<m>\d{1,2})\s*(?P<sep>월|[/.-])\s*)?(?P<d>\d{1,2})\s*(?P<il>일)?\s*\.?\s*"
+    r"(?:[(\[]?\s*(?P<w>[월화수목금토일])\s*(?:요일)?\s*[)\]]?)?$"
+)
+WEEKDAY_TOKEN = re.compile(r"^[(\[]?([월화수목금토일])(?:요일)?[)\]]?$")
+MONTH_TITLE = re.compile(r"(\d{1,2})\s*월(?!\s*\d{1,2}\s*일)")
+# 메뉴명 뒤의 알레르기 번호 ('쇠고기미역국5.6.16.', '우유(2)')
+ALLERGEN = re.compile(r"[\s(]*\d{1,2}(?:\.\d{1,2})*\.?\)?$")
+HAS_LETTER = re.compile(r"[가-힣A-Za-z]")
+# 표 아래 알레르기 범례 ('1.난류 2.우유 ...')
+LEGEND = re.compile(r"^\d{1,2}\.\s*[가-힣]")
+
+
+def ocr_words(annotations):
+    """Vision text_annotations[1:] → [[단어, x0, y0, x1, y1], ...] (캐시에 저장 가능한 형태)"""
+    words = []
+    for a in annotations:
+        xs = [v.x for v in a.bounding_poly.vertices]
+        ys = [v.y for v in a.bounding_poly.vertices]
+        if xs and ys:
+            words.append([a.description, min(xs), min(ys), max(xs), max(ys)])
+    return words
+
+
+class Box:
+    def __init__(self, text, x0, y0, x1, y1):
+        self.text, self.x0, self.y0, self.x1, self.y1 = text, x0, y0, x1, y1
+
+    @property
+    def cx(self):
+        return (self.x0 + self.x1) / 2
+
+    @property
+    def cy(self):
+        return (self.y0 + self.y1) / 2
+
+    @property
+    def height(self):
+        return max(1, self.y1 - self.y0)
+
+
+def _group_lines(boxes, tol):
+    """y 중심이 가까운 단어끼리 한 줄로 (줄 안은 x 순)"""
+    lines = []
+    for box in sorted(boxes, key=lambda b: b.cy):
+        if lines and abs(lines[-1][-1].cy - box.cy) <= tol:
+            lines[-1].append(box)
+        else:
+            lines.append([box])
+    return [sorted(line, key=lambda b: b.x0) for line in lines]
+
+
+def _date_of(text):
+    """날짜 머리글 표기 → (월 또는 0, 일), 아니면 None
+
+    '월'/'일' 표시, 요일, 연도가 있거나 'M/D'(월 12 이하, 끝에 점 없음)일 때만 날짜로 본다.
+    숫자만 있거나 점으로 나뉜 토큰('5.6.', '10.13.')은 알레르기 번호/칼로리와 구분할 수 없다.
+    """
+    text = text.replace(" ", "")
+    m = DATE_TOKEN.match(text)
+    if not m:
+        return None
+    month, day = int(m.group("m") or 0), int(m.group("d"))
+    if month > 12 or not 1 <= day <= 31:
+        return None
+    if m.group("il") or m.group("sep") == "월" or m.group("w") or m.group("y"):
+        return month, day
+    if m.group("sep") in ("/", "-") and month and not text.endswith("."):
+        return month, day
+    return None
+
+
+def _find_dates(lines, h):
+    """줄마다 연속된 단어 1~4개를 이어 붙여 날짜 표기와 완전히 일치하는 구간 찾기
+
+    메뉴 글자가 날짜보다 많은 줄은 머리글이 아니라 내용 줄이므로 건너뛴다.
+    """
+    anchors = []
+    for li, line in enumerate(lines):
+        found_in_line = []
+        i = 0
+        while i < len(line):
+            found = None
+            for j in range(min(len(line), i + 4), i, -1):
+                span = line[i:j]
+                if any(span[k + 1].x0 - span[k].x1 > 1.5 * h for k in range(len(span) - 1)):
+                    continue
+                text = " ".join(b.text for b in span)
+                key = _date_of(text)
+                if key:
+                    found = (j, text, key)
+                    break
+            if found:
+                j, text, key = found
+                span = line[i:j]
+                anchor = Box(text, min(b.x0 for b in span), min(b.y0 for b in span),
+                             max(b.x1 for b in span), max(b.y1 for b in span))
+                anchor.line, anchor.members, anchor.key = li, span, key
+                found_in_line.append(anchor)
+                i = j
+            else:
+                i += 1
+        members = {id(b) for a in found_in_line for b in a.members}
+        content = sum(1 for b in line if id(b) not in members and HAS_LETTER.search(b.text))
+        if content < len(found_in_line):
+            anchors.extend(found_in_line)
+    return anchors
+
+
+def _weekly_cells(anchors):
+    """날짜 머리글이 한 줄에 2개 이상 → 주간 표. 각 날짜 아래, 다음 머리글 줄 위까지가 칸"""
+    rows = {}
+    for a in anchors:
+        rows.setdefault(a.line, []).append(a)
+    rows = [sorted(r, key=lambda a: a.cx) for _, r in sorted(rows.items()) if len(r) >= 2]
+    cells = []
+    for ri, row in enumerate(rows):
+        bottom = min(a.y0 for a in rows[ri + 1]) if ri + 1 < len(rows) else float("inf")
+        for k, a in enumerate(row):
+            spacing = (row[1].cx - row[0].cx) if len(row) > 1 else (a.x1 - a.x0) * 3
+            left = (row[k - 1].cx + a.cx) / 2 if k > 0 else a.cx - spacing / 2
+            right = (row[k + 1].cx + a.cx) / 2 if k + 1 < len(row) else a.cx + spacing / 2
+            cells.append({"label": a.text, "key": a.key, "anchor": a, "box": (left, a.y1, right, bottom), "items": []})
+    return cells
+
+
+def _day_rows(lines, cols, header_bottom):
+    """달력의 주(행)마다 (위치, 날짜 - 열 번호, [(열, 날짜 숫자)])
+
+    줄 맨 앞에 따로 읽힌 알레르기 번호('5', '13')도 열의 첫 단어가 숫자가 되므로, 한 줄에서
+    열마다 하루씩 늘어나는 숫자들만 주로 본다. 날짜가 하나뿐인 주(달의 첫 주/마지막 주)는
+    바로 위나 아래 주와 7일 차이로 이어질 때만 받는다.
+    """
+    weeks, singles = [], []
+    for line in lines:
+        bases = {}
+        for ci, (_, left, right) in enumerate(cols):
+            in_col = [b for b in line if left <= b.cx < right and b.y0 > header_bottom]
+            if in_col and in_col[0].text.isdigit() and 1 <= int(in_col[0].text) <= 31:
+                # 같은 주의 날짜는 '날짜 - 열 번호' 가 모두 같다
+                bases.setdefault(int(in_col[0].text) - ci, []).append((ci, in_col[0]))
+        if bases:
+            base, anchors = max(bases.items(), key=lambda kv: len(kv[1]))
+            week = (min(a.y0 for _, a in anchors), base, anchors)
+            (weeks if len(anchors) >= 2 else singles).append(week)
+    if weeks:
+        # 주가 바뀔 때마다 7일씩 늘어나므로 나머지가 다른 줄은 우연히 이어진 번호
+        residues = [base % 7 for _, base, _ in weeks]
+        residue = max(set(residues), key=residues.count)
+        weeks = [w for w in weeks if w[1] % 7 == residue]
+    found = {base for _, base, _ in weeks}
+    for top, base, anchors in singles:
+        if base in found:
+            continue
+        above = [w for w in weeks if w[0] < top]
+        below = [w for w in weeks if w[0] > top]
+        if (above and max(above, key=lambda w: w[0])[1] + 7 == base) or \
+                (below and min(below, key=lambda w: w[0])[1] - 7 == base):
+            weeks.append((top, base, anchors))
+    return weeks
+
+
+def _calendar_cells(lines, h, month):
+    """요일 머리글(월 화 수 목 금) + 칸마다 맨 위의 날짜 숫자 → 월간 달력"""
+    header = None
+    for line in lines:
+        days = [b for b in line if WEEKDAY_TOKEN.match(b.text)]
+        if len(days) >= 3:
+            header = days
+            break
+    if not header:
+        return []
+    cols = []
+    for k, b in enumerate(header):
+        left = (header[k - 1].cx + b.cx) / 2 if k > 0 else b.cx - (header[1].cx - header[0].cx) / 2
+        right = (header[k + 1].cx + b.cx) / 2 if k + 1 < len(header) else b.cx + (header[-1].cx - header[-2].cx) / 2
+        cols.append((WEEKDAY_TOKEN.match(b.text).group(1), left, right))
+    header_bottom = max(b.y1 for b in header)
+
+    starts = {c: [] for c in range(len(cols))}
+    for _, _, anchors in _day_rows(lines, cols, header_bottom):
+        for ci, a in anchors:
+            starts[ci].append(a)
+    cells = []
+    for ci, anchors in starts.items():
+        weekday, left, right = cols[ci]
+        anchors.sort(key=lambda b: b.y0)
+        for k, a in enumerate(anchors):
+            bottom = anchors[k + 1].y0 if k + 1 < len(anchors) else float("inf")
+            a.members = [a]
+            label = f"{month}월 {a.text}일({weekday})" if month else f"{a.text}일({weekday})"
+            # 날짜 숫자와 같은 줄 오른쪽에 적힌 메뉴도 포함
+            cells.append({"label": label, "key": (month or 0, int(a.text)), "anchor": a,
+                          "box": (left, a.y0 - h / 2, right, bottom), "items": []})
+    return cells
+
+
+def _in_order(keys):
+    """읽는 순서(위→아래, 왼→오른쪽)대로 날짜가 늘어나는지 (12월 → 1월로 넘어가는 주는 허용)"""
+    prev = None
+    for month, day in keys:
+        if prev:
+            month = month or prev[0]
+            if (month, day) <= prev and not (prev[0] == 12 and month == 1):
+                return False
+        prev = (month, day)
+    return True
+
+
+def _clean_item(text):
+    if LEGEND.match(text.strip()):
+        return ""
+    text = ALLERGEN.sub("", text.strip()).strip(" .,-·*")
+    return text if HAS_LETTER.search(text) else ""
+
+
+def parse_menu_grid(words):
+    """[[단어, x0, y0, x1, y1], ...] → ({'날짜': '메뉴, 메뉴'}, 신뢰도)"""
+    boxes = [Box(*w) for w in words or [] if str(w[0]).strip()]
+    if len(boxes) < 6:
+        return {}, 0.0
+    h = median(b.height for b in boxes)
+    lines = _group_lines(boxes, h * 0.6)
+    month = None
+    for line in lines[:5]:
+        m = MONTH_TITLE.search(" ".join(b.text for b in line))
+        if m and 1 <= int(m.group(1)) <= 12:
+            month = int(m.group(1))
+            break
+
+    cells = _weekly_cells(_find_dates(lines, h))
+    if not cells:
+        cells = _calendar_cells(lines, h, month)
+    if len(cells) < 2:
+        return {}, 0.0
+
+    taken = {id(b) for c in cells for b in c["anchor"].members}
+    grid_top = min(c["box"][1] for c in cells)
+    total = assigned = 0
+    for line in lines:
+        for box in line:
+            if id(box) in taken or box.cy < grid_top or not HAS_LETTER.search(box.text):
+                continue
+            total += 1
+            for cell in cells:
+                left, top, right, bottom = cell["box"]
+                if left <= box.cx < right and top <= box.cy < bottom:
+                    cell["items"].append(box)
+                    assigned += 1
+                    break
+
+    menu = {}
+    filled = 0
+    cells.sort(key=lambda c: (c["anchor"].y0, c["anchor"].x0))
+    for cell in cells:
+        items = []
+        for line in _group_lines(cell["items"], h * 0.6):
+            item = _clean_item(" ".join(b.text for b in line))
+            if item and item not in items:
+                items.append(item)
+        if len(items) >= 2:
+            filled += 1
+        if items:
+            menu[cell["label"]] = ", ".join(items)
+
+    # 날짜 칸이 대부분 채워졌고, 표 영역의 글자가 대부분 어느 칸에 들어갔을 때 높게
+    confidence = (filled / len(cells)) * min(1.0, len(cells) / 3) * (0.5 + 0.5 * assigned / max(1, total))
+    # 날짜가 뒤섞여 있으면 머리글을 잘못 찾았을 가능성이 크므로 AI 정리로 넘긴다
+    if not _in_order([c["key"] for c in cells]):
+        confidence *= 0.5
+    return menu, round(confidence, 3)
@@ -0,0 +1,115 @@
+import os
+
+from dinnerbot import metrics
+from dinnerbot.classifier import classify
+from dinnerbot.jsonrepair import extract_json
+
+# 메뉴 정리 응답 최대 토큰 / 잘렸을 때 나머지를 이어서 요청하는 횟수
+MENU_MAX_TOKENS = int(os.getenv("MENU_MAX_TOKENS", "1000"))
+MENU_CONTINUE_ATTEMPTS = int(os.getenv("MENU_CONTINUE_ATTEMPTS", "2"))
+
+NO_KEY_ERROR = {"error": "실제 AI 버전을 사용하려면 유효한 API 키(OpenAI 또는 Google)가 필요합니다."}
+
+
+def screen_ocr_text(raw_text):
+    """공통 텍스트 검증 로직: 급식표가 아니면 오류 dict, 통과하면 None"""
+    if raw_text:
+        is_menu, _, f = classify(raw_text)
+        if not is_menu:
+            if f["non_menu"] >= 1 and f["non_menu"] >= f["food"] / 2:
+                metrics.MENU_REJECTED.inc(reason="non_menu")
+                return {"error": "급식표가 아닌 이미지가 감지되었습니다. (수학 문제 등으로 판독됨)"}
+            metrics.MENU_REJECTED.inc(reason="low_score")
+            return {"error": "급식표로 보기 어려운 이미지입니다. 식단표를 다시 확인해 주세요."}
+    return None
+
+
+def build_menu_prompt(raw_text):
+    """OCR 텍스트가 있으면 텍스트 정리용, 없으면 이미지 판독용 프롬프트"""
+    valid_instruction = "이 이미지가 학교 급식표(식단표)가 맞는지 판단하고, 맞다면 날짜별 메뉴를 {\"날짜\": \"메뉴내용\"} 형식의 단순한 JSON 객체로 정리해줘. 급식표가 아니면 {\"error\": \"판독 불가\"} 응답해줘."
+    return f"{valid_instruction}\n텍스트: {raw_text}\n결과는 반드시 순수한 JSON 객체여야 하며, 다른 텍스트는 포함하지 마." if raw_text else f"{valid_instruction} 결과는 반드시 순수한 JSON 객체여야 해."
+
+
+def continuation_prompt(prompt, partial):
+    """max_tokens 에 걸려 잘린 응답의 나머지만 요청하는 프롬프트 (처음부터 다시 받지 않음)"""
+    return (f"{prompt}\n\n[이전 응답 - 중간에 잘림]\n{partial}\n\n"
+            "위 응답이 중간에 잘렸어. 처음부터 다시 쓰지 말고, 잘린 바로 다음 글자부터 JSON 이 끝날 때까지 나머지만 출력해.")
+
+
+MENU_DATE_FIELDS = ("date", "날짜", "일자", "day")
+MENU_VALUE_FIELDS = ("menu", "메뉴", "lunch", "중식", "items", "dishes")
+
+
+def menu_text(menu):
+    """메뉴 값(문자열/리스트/dict)을 문자열로"""
+    if isinstance(menu, list):
+        return ", ".join(menu_text(m) for m in menu)
+    if isinstance(menu, dict):
+        field = next((f for f in MENU_VALUE_FIELDS if menu.get(f)), None)
+        return menu_text(menu[field]) if field else ", ".join(str(v) for v in menu.values())
+    return str(menu)
+
+
+def _is_menu_value(value):
+    """날짜 하나의 메뉴로 볼 수 있는 값 (문자열, 문자열 목록, 메뉴 필드가 있는 dict)"""
+    if isinstance(value, str):
+        return True
+    if isinstance(value, list):
+        return all(not isinstance(v, (dict, list)) for v in value)
+    return isinstance(value, dict) and any(f in value for f in MENU_VALUE_FIELDS)
+
+
+def _menu_rows(rows):
+    """[{'date': ..., 'menu': ...}, ...] → {'날짜': '메뉴'}"""
+    result = {}
+    for row in rows:
+        if not isinstance(row, dict):
+            continue
+        date = next((row[f] for f in MENU_DATE_FIELDS if row.get(f)), None)
+        menu = next((row[f] for f in MENU_VALUE_FIELDS if row.get(f)), None)
+        if date is not None and menu is not None:
+            result[str(date)] = menu
+    return result
+
+
+def normalize_menu(value, depth=0):
+    """여러 형태의 AI 응답을 {'날짜': '메뉴'} 로 (형식을 알 수 없으면 빈 dict)
+
+    {'school_lunch_menu': [{'date', 'menu'}]}, {'menu': {...}} 같은 한 겹 감싼 형태,
+    [{'날짜', '메뉴'}] 목록, 메뉴가 리스트인 경우를 모두 받는다.
+    """
+    if isinstance(value, list):
+        value = _menu_rows(value)
+    if not isinstance(value, dict) or depth > 2:
+        return {}
+    if "error" in value:
+        return {"error": str(value["error"])}
+    if value and all(_is_menu_value(v) for v in value.values()):
+        result = {}
+        for label, menu in value.items():
+            text = menu_text(menu).strip()
+            if str(label).strip() and text:
+                result[str(label).strip()] = text
+        return result
+    # 감싼 형태: 안쪽 컨테이너를 차례로 시도
+    for inner in value.values():
+        if isinstance(inner, (dict, list)):
+            result = normalize_menu(inner, depth + 1)
+            if result:
+                return result
+    return {}
+
+
+def parse_menu_response(raw):
+    """AI 응답 텍스트 → {'날짜': '메뉴'} dict (잘린 응답이면 완성된 날짜까지만)"""
+    value, _ = extract_json(raw)
+    result = normalize_menu(value)
+    return result or {"error": "판독 불가"}
+
+
+def is_menu_result(result):
+    return isinstance(result, dict) and bool(result) and "error" not in result
+
+
+def ai_error(e):
+    return {"error": f"AI 분석 중 오류가 발생했습니다. 키를 확인해 주세요. ({str(e)})"}
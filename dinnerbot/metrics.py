@@ -0,0 +1,247 @@
+"""요청 단계별 소요 시간 / AI 토큰 사용량 / 캐시·대체 경로 횟수 / 페이로드 크기 계측
+
+prometheus_client 없이 Prometheus 텍스트 형식으로 /metrics 에 내보낸다. 요청 하나에서
+잰 단계별 시간은 Server-Timing 헤더로도 돌려주므로 브라우저 개발자 도구(Network →
+Timing)에서 OCR / LLM / 후처리 중 어디가 느렸는지 바로 볼 수 있다.
+값은 프로세스(인스턴스)마다 따로 쌓인다.
+"""
+import os
+import hmac
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# 설정하면 /metrics 는 'Authorization: Bearer <토큰>' 이 있어야 응답
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+BYTE_BUCKETS = (1024, 16 * 1024, 64 * 1024, 256 * 1024, 1024 * 1024, 4 * 1024 * 1024, 16 * 1024 * 1024)
+INF = 'le="+Inf"'
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_number(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    """레이블별로 누적되는 값"""
+
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(str(labels.get(n, "")) for n in self.labels), 0)
+
+    def total(self, **labels):
+        """주어진 레이블만 맞으면 나머지 레이블 값은 모두 더함"""
+        want = {self.labels.index(n): str(v) for n, v in labels.items()}
+        with self._lock:
+            return sum(v for key, v in self._values.items() if all(key[i] == w for i, w in want.items()))
+
+    def render(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_number(v)}" for key, v in items]
+
+
+class Histogram:
+    """레이블별 누적 버킷 + 합계 + 개수"""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=TIME_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._values = {}  # 레이블 값 -> [버킷별 개수, 합계, 개수]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def count(self, **labels):
+        entry = self._values.get(tuple(str(labels.get(n, "")) for n in self.labels))
+        return entry[2] if entry else 0
+
+    def render(self):
+        with self._lock:
+            items = sorted((key, (list(e[0]), e[1], e[2])) for key, e in self._values.items())
+        lines = []
+        for key, (counts, total, n) in items:
+            for bound, c in zip(self.buckets, counts):
+                le = 'le="%s"' % _format_number(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {c}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, INF)} {n}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_number(round(total, 6))}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {n}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name, help, labels=()):
+        metric = Counter(name, help, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help, labels=(), buckets=TIME_BUCKETS):
+        metric = Histogram(name, help, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Prometheus 텍스트 형식"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUEST_SECONDS = registry.histogram(
+    "dinnerbot_request_seconds", "요청 처리 시간", ("endpoint", "status"))
+STAGE_SECONDS = registry.histogram(
+    "dinnerbot_stage_seconds", "단계별 소요 시간 (decode, client, normalize, ocr, llm, parse 등)", ("stage",))
+PROVIDER_CALL_SECONDS = registry.histogram(
+    "dinnerbot_provider_call_seconds", "외부 API 호출 1회의 소요 시간", ("provider", "model", "outcome"))
+AI_TOKENS = registry.counter(
+    "dinnerbot_ai_tokens_total", "AI 응답의 usage 로 집계한 토큰 수", ("provider", "model", "kind"))
+CACHE_LOOKUPS = registry.counter(
+    "dinnerbot_cache_lookups_total", "캐시 조회 결과", ("cache", "result"))
+FALLBACKS = registry.counter(
+    "dinnerbot_fallbacks_total", "대체 경로 사용 횟수 (다음 모델, 헤지, 로컬 레시피, 이미지 직접 판독)", ("kind", "reason"))
+MENU_REJECTED = registry.counter(
+    "dinnerbot_menu_rejected_total", "급식표가 아닌 것으로 판정한 업로드 (non_menu: 수학 문제 등, low_score)", ("reason",))
+PREFETCH = registry.counter(
+    "dinnerbot_prefetch_total", "'다른 메뉴' 선생성 (hit, wait_hit, miss, generated, incomplete, dropped, throttled, error)", ("result",))
+JOBS = registry.counter(
+    "dinnerbot_jobs_total", "백그라운드 분석 작업 (queued, coalesced, rejected, resumed, done, error)", ("kind", "result"))
+PAYLOAD_BYTES = registry.histogram(
+    "dinnerbot_payload_bytes", "업로드 / 정규화 이미지 / 프롬프트 / 응답 크기", ("kind",), buckets=BYTE_BUCKETS)
+
+
+# 요청 하나의 (단계, 초) 목록 (Server-Timing 헤더용)
+_timings = contextvars.ContextVar("dinnerbot_timings", default=None)
+
+
+def in_request(fn):
+    """스레드 풀에 넘길 함수 → 지금 요청의 contextvars 안에서 실행하는 함수
+
+    풀 스레드에서 잰 단계 시간도 이 요청의 Server-Timing 에 들어가도록, 요청 스레드에서 복사해 둔
+    컨텍스트를 호출마다 한 번 더 복사해 실행한다 (같은 컨텍스트는 두 스레드에서 동시에 못 씀).
+    """
+    context = contextvars.copy_context()
+
+    def run(*args):
+        return context.copy().run(fn, *args)
+    return run
+
+
+def begin_request(on_stage=None):
+    """요청 시작 시 호출 (이후 stage() 로 잰 시간이 이 요청의 Server-Timing 에 들어감)
+
+    on_stage(단계 이름)는 단계가 시작될 때마다 불린다 (백그라운드 작업의 진행 상황 표시용).
+    """
+    _timings.set({"started": time.perf_counter(), "stages": [], "on_stage": on_stage})
+
+
+def record_stage(name, seconds):
+    STAGE_SECONDS.observe(seconds, stage=name)
+    current = _timings.get()
+    if current is not None:
+        current["stages"].append((name, seconds))
+
+
+@contextmanager
+def stage(name):
+    """with stage("ocr"): ... — 소요 시간을 히스토그램과 현재 요청의 Server-Timing 에 기록"""
+    current = _timings.get()
+    if current is not None and current["on_stage"] is not None:
+        current["on_stage"](name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - started)
+
+
+def finish_request(endpoint, status, response_bytes=None):
+    """요청 처리 시간/응답 크기 기록 → Server-Timing 헤더 값 (begin_request 를 안 불렀으면 None)"""
+    current = _timings.get()
+    if current is None:
+        return None
+    _timings.set(None)
+    total = time.perf_counter() - current["started"]
+    REQUEST_SECONDS.observe(total, endpoint=endpoint, status=status)
+    if response_bytes is not None:
+        PAYLOAD_BYTES.observe(response_bytes, kind="response")
+    entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in current["stages"]]
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+
+def observe_call(provider, model, outcome, seconds):
+    PROVIDER_CALL_SECONDS.observe(seconds, provider=provider, model=model, outcome=outcome)
+
+
+def record_usage(provider, model, response):
+    """OpenAI usage(prompt_tokens/completion_tokens) / Gemini usage_metadata(prompt_token_count/candidates_token_count) 누적"""
+    try:
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            prompt, completion = getattr(usage, "prompt_tokens", 0), getattr(usage, "completion_tokens", 0)
+        else:
+            usage = getattr(response, "usage_metadata", None)
+            if usage is None:
+                return
+            prompt, completion = getattr(usage, "prompt_token_count", 0), getattr(usage, "candidates_token_count", 0)
+        if prompt:
+            AI_TOKENS.inc(prompt, provider=provider, model=model, kind="prompt")
+        if completion:
+            AI_TOKENS.inc(completion, provider=provider, model=model, kind="completion")
+    except Exception as e:
+        print(f"Metrics Error: {e}")
+
+
+def authorized(header):
+    """METRICS_TOKEN 이 없으면 누구나, 있으면 같은 Bearer 토큰만"""
+    return not METRICS_TOKEN or hmac.compare_digest((header or "").encode("utf-8"), f"Bearer {METRICS_TOKEN}".encode("utf-8"))
@@ -0,0 +1,366 @@
+"""Flask(server) 와 ASGI(aio) 가 함께 쓰는 분석·추천 단계
+
+두 서빙 모드는 SDK 호출, Vision OCR, 캐시·DB 조회 같은 I/O 를 동기/비동기로 감싸기만 하고
+요청 인자 구성, 응답 해석, 단계 순서와 판정, 오류 기록, 대체 응답, 응답 헤더는 여기서 정한다.
+캐시·저장소를 받는 함수는 메모리/SQLite 조회만 하므로 비동기 모드는 스레드에서 부른다.
+"""
+import os
+import base64
+from urllib.parse import quote
+
+from dinnerbot import metrics
+from dinnerbot.batch import NOT_MENU_ERROR, build_batch_prompt, merge_menus
+from dinnerbot.imaging import OCR_MAX_SIDE, OCR_JPEG_QUALITY, normalize_image
+from dinnerbot.jobs import JOBS_ENABLED
+from dinnerbot.jsonrepair import is_truncated
+from dinnerbot.layout import LAYOUT_MIN_CONFIDENCE, parse_menu_grid
+from dinnerbot.plan import plan_hints, parse_plan, fill_plan, plan_response
+from dinnerbot.menu import screen_ocr_text, build_menu_prompt, continuation_prompt, parse_menu_response, is_menu_result, ai_error
+from dinnerbot.recipes import recipe_hints, offline_recommendation
+from dinnerbot.recommend import build_recommend_prompt, parse_recommendation, recommend_key, no_key_response, error_response
+from dinnerbot.schools import remember_menu
+from dinnerbot.sessions import wants_prefetch
+
+
+def server_config():
+    """/api/config 응답"""
+    api_key = os.getenv("OPENAI_API_KEY")
+    # 키가 존재하면 AI 모드 활성화 (데모 배지 숨김)
+    has_key = api_key is not None and len(str(api_key)) > 5
+    # 브라우저는 업로드 전에 서버 정규화와 같은 크기/품질로 줄여서 보냄
+    return {"hasServerKey": has_key, "demoMode": not has_key, "jobs": JOBS_ENABLED,
+            "uploadMaxSide": OCR_MAX_SIDE, "uploadQuality": OCR_JPEG_QUALITY}
+
+
+def request_client(registry, api_key=None):
+    """API 클라이언트 (OpenAI sk- 또는 Google AIza- 지원, 요청에 키가 없으면 서버 키, 만들 수 없으면 None)"""
+    key = api_key if api_key and api_key.strip() else os.getenv("OPENAI_API_KEY")
+    if not key or len(str(key)) < 5:
+        return None
+    try:
+        # 처음 만드는 클라이언트는 SDK import 시간까지 포함
+        with metrics.stage("client"):
+            return registry.get(str(key).strip())
+    except Exception as e:
+        print(f"Client Init Error: {e}")
+    return None
+
+
+# 응답 부가 정보(meta) → 응답 헤더
+META_HEADERS = {
+    "bytes_saved": "X-Image-Bytes-Saved",
+    "path": "X-Analysis-Path",  # cache / layout / llm / vision-llm (여러 장이면 '+' 로 연결)
+    "layout_confidence": "X-Layout-Confidence",
+    "school": "X-School",
+    "prefetch": "X-Recommend-Prefetch",
+    "cache": "X-Recommend-Cache",
+    "source": "X-Recommend-Source",
+    "chunks": "X-Plan-Chunks",
+}
+
+
+def meta_headers(meta):
+    """meta → 응답 헤더 dict (헤더는 latin-1 만 되므로 학교 이름은 URL 인코딩, 브라우저가 '이 학교 식단 불러오기'에 기억)"""
+    headers = {}
+    for key, header in META_HEADERS.items():
+        value = meta.get(key)
+        if value is None or value == "":
+            continue
+        headers[header] = quote(value) if key == "school" else str(value)
+    return headers
+
+
+# --- provider 호출 인자 / 응답 (SDK 호출은 각 모드가) ---
+
+def chat_request(provider, model, prompt, system=None, image=None, json_mode=True, max_tokens=None, stream=False):
+    """OpenAI chat.completions.create / Gemini generate_content 에 넘길 인자"""
+    if provider == "openai":
+        content = prompt
+        if image:
+            image_b64 = base64.b64encode(image.data).decode()
+            content = [{"type": "text", "text": prompt},
+                       {"type": "image_url", "image_url": {"url": f"data:{image.mime};base64,{image_b64}"}}]
+        messages = [{"role": "system", "content": system}] if system else []
+        messages.append({"role": "user", "content": content})
+        request = {"model": model, "messages": messages}
+        if json_mode:
+            request["response_format"] = {"type": "json_object"}
+        if max_tokens:
+            request["max_tokens"] = max_tokens
+        if stream:
+            request.update(stream=True, stream_options={"include_usage": True})  # 마지막 조각에 토큰 사용량
+        return request
+    # Gemini (시스템 프롬프트 없이 본문만)
+    request = {"contents": [prompt, {"mime_type": image.mime, "data": image.data}] if image else prompt}
+    if json_mode:
+        request["generation_config"] = {"response_mime_type": "application/json"}
+    if stream:
+        request["stream"] = True
+    return request
+
+
+def reply_text(provider, model, response):
+    """SDK 응답 → 텍스트 (토큰 사용량 기록)"""
+    metrics.record_usage(provider, model, response)
+    if provider == "openai":
+        return response.choices[0].message.content
+    return response.text
+
+
+def chunk_text(provider, model, chunk):
+    """스트리밍 조각 → 텍스트 (없으면 None). OpenAI 는 사용량이 붙은 마지막 조각에서 기록"""
+    if provider == "openai":
+        if getattr(chunk, "usage", None):
+            metrics.record_usage("openai", model, chunk)
+        return chunk.choices[0].delta.content if chunk.choices and chunk.choices[0].delta.content else None
+    return chunk.text if chunk.parts else None
+
+
+def stream_finished(provider, model, last):
+    """스트림 끝: Gemini 의 usage_metadata 는 조각마다 누적값이므로 마지막 조각의 값만 기록"""
+    if provider == "gemini" and last is not None:
+        metrics.record_usage("gemini", model, last)
+
+
+def observe_prompt(prompt):
+    metrics.PAYLOAD_BYTES.observe(len(prompt.encode("utf-8")), kind="prompt")
+
+
+# --- 급식표 분석 ---
+
+def fingerprint(cache, content):
+    """캐시 키 (실패 시 None → 캐시 미사용)"""
+    try:
+        with metrics.stage("fingerprint"):
+            return cache.fingerprint(content)
+    except Exception as e:
+        print(f"Cache Key Error: {e}")
+        return None
+
+
+def prepare_image(content):
+    """OCR/AI 로 보내기 전 이미지 정규화 (회전 보정, 축소, 흑백, JPEG)"""
+    with metrics.stage("normalize"):
+        image = normalize_image(content)
+    metrics.PAYLOAD_BYTES.observe(image.original_size, kind="upload")
+    metrics.PAYLOAD_BYTES.observe(len(image.data), kind="normalized")
+    return image
+
+
+def cached_menu(cache, image_key, meta):
+    """같은 이미지(묶음)의 분석 결과 (없으면 None)"""
+    cached = cache.get_menu(image_key)
+    if cached is not None:
+        meta["path"] = "cache"
+    return cached
+
+
+def cached_ocr(cache, image_key):
+    ocr = cache.get_ocr(image_key)
+    if isinstance(ocr, str):  # 이전 형식(텍스트만) 캐시
+        ocr = {"text": ocr, "words": []}
+    return ocr
+
+
+def local_menu(cache, ocr, meta):
+    """OCR 결과만으로 끝나는 단계 (급식표 판별 → OCR 텍스트 캐시 → 표 파서) → (결과, 경로)
+
+    결과가 None 이면 AI 정리가 필요하다 (ai_menu_request). 급식표가 아니면 (오류 dict, None).
+    """
+    raw_text = ocr["text"] if ocr else None
+    if not raw_text:
+        return None, None
+    with metrics.stage("classify"):
+        rejected = screen_ocr_text(raw_text)
+    if rejected:
+        return rejected, None
+    # 재인코딩/크롭된 사본: OCR 텍스트까지 같으면 그 텍스트로 만든 메뉴를 다시 씀
+    cached = cache.get_menu_by_text(raw_text)
+    if cached is not None:
+        return cached, "cache"
+    # 표 구조를 단어 좌표로 직접 읽을 수 있으면 AI 호출 없이 정리
+    with metrics.stage("layout"):
+        menu, confidence = parse_menu_grid(ocr["words"])
+    meta["layout_confidence"] = confidence
+    if confidence >= LAYOUT_MIN_CONFIDENCE:
+        return menu, "layout"
+    return None, None
+
+
+def ai_menu_request(ocr, image, reason="no_ocr_text"):
+    """AI 정리 요청 → (프롬프트, 이미지 직접 판독이면 이미지, 경로). OCR 텍스트가 없으면 이미지 직접 판독 (reason 으로 집계)"""
+    raw_text = ocr["text"] if ocr else None
+    if raw_text:
+        return build_menu_prompt(raw_text), None, "llm"
+    metrics.FALLBACKS.inc(kind="vision-llm", reason=reason)
+    return build_menu_prompt(None), image, "vision-llm"
+
+
+def continuation_for(prompt, raw):
+    """max_tokens 에 걸려 잘린 메뉴 응답이면 나머지만 요청할 프롬프트 (잘리지 않았으면 None)"""
+    if not is_truncated(raw):
+        return None
+    metrics.FALLBACKS.inc(kind="json", reason="continued")
+    return continuation_prompt(prompt, raw)
+
+
+def parsed_menu(raw):
+    with metrics.stage("parse"):
+        return parse_menu_response(raw)
+
+
+def menu_failed(e):
+    print(f"AI API Error: {e}")
+    return ai_error(e)
+
+
+def remember_school(schools, text, menu, key, meta):
+    """OCR 텍스트에 학교 이름이 있으면 분석 결과를 학교 식단 저장소에 남기고 meta["school"] 에 기록"""
+    if schools is None or key is None or not text:
+        return
+    school = remember_menu(schools, text, menu, key)
+    if school:
+        meta["school"] = school
+
+
+def save_menu(cache, schools, image_key, result, ocr, path, meta):
+    """분석 마무리 → result: 경로를 meta 에 남기고, 성공한 결과는 이미지 캐시에 저장
+
+    학교 식단 저장소와 OCR 텍스트 캐시에는 이번에 OCR 텍스트로 새로 만든 결과(layout/llm)만 남긴다.
+    """
+    if path:
+        meta["path"] = path
+    if is_menu_result(result):
+        text = ocr["text"] if ocr and path in ("layout", "llm") else None
+        cache.put_menu(image_key, result, text)
+        remember_school(schools, text, result, image_key, meta)
+    return result
+
+
+def batch_requests(text_pages, image_pages):
+    """여러 장 중 AI 로 정리할 페이지 → [(프롬프트, 이미지 또는 None)] (텍스트 페이지는 한 번의 호출로)"""
+    requests = [(build_batch_prompt(text_pages), None)] if text_pages else []
+    return requests + [(build_menu_prompt(None), image) for image in image_pages]
+
+
+def finish_batch(cache, schools, batch_key, menus, ai_menus, rejected, ocrs, meta):
+    """페이지별 결과 병합 → 하나의 날짜별 달력 (날짜가 하나도 없으면 AI 오류, 거절 사유 순으로)"""
+    merged = merge_menus(menus + ai_menus)
+    if not merged:
+        failed = next((m for m in ai_menus if isinstance(m, dict) and "error" in m), None)
+        return failed or rejected or dict(NOT_MENU_ERROR)
+    cache.put_menu(batch_key, merged)
+    remember_school(schools, "\n".join(ocr["text"] for ocr in ocrs if ocr), merged, batch_key, meta)
+    return merged
+
+
+# --- 저녁 추천 / 식단 짜기 ---
+
+def recommend_prompt(lunch, ingredients, clickCount=0, exclude=()):
+    with metrics.stage("hints"):
+        return build_recommend_prompt(lunch, ingredients, clickCount, recipe_hints(lunch, ingredients, exclude), exclude)
+
+
+def parsed_recommendation(raw):
+    with metrics.stage("parse"):
+        return parse_recommendation(raw)
+
+
+class Recommendation:
+    """저녁 추천 한 건의 공통 단계
+
+    세션에서 뺄 메뉴, 캐시 키, 응답한 추천의 세션 기록과 다음 추천 예약, 로컬 레시피 대체를 맡는다.
+    AI 호출, 캐시 조회/저장, 선생성 실행은 각 모드가 하고, prefetch(rec) 로 선생성을 예약한다.
+    """
+
+    def __init__(self, ai_client, lunch, ingredients, clickCount=0, session=None, meta=None, prefetch=None):
+        self.ai_client = ai_client
+        self.lunch = lunch
+        self.ingredients = ingredients
+        self.clickCount = clickCount
+        self.session = session
+        self.meta = {} if meta is None else meta
+        self.prefetch = prefetch
+
+    @property
+    def exclude(self):
+        """세션에서 이미 추천한 메뉴명 (선생성 결과를 꺼낸 뒤의 이력)"""
+        return self.session.exclude() if self.session is not None else ()
+
+    @property
+    def cache_key(self):
+        # 세션 이력에 따라 달라지는 추천은 캐시하지 않음
+        if not self.ai_client or self.exclude:
+            return None
+        return recommend_key(self.ai_client["type"], self.lunch, self.ingredients, self.clickCount)
+
+    def prompt(self):
+        return recommend_prompt(self.lunch, self.ingredients, self.clickCount, self.exclude)
+
+    def served(self, result, source):
+        """응답할 추천 (source: prefetch / cache / ai) → result. '다른 메뉴' 를 누른 뒤부터는 다음 추천을 예약"""
+        if source == "prefetch":
+            self.meta["prefetch"] = "HIT"
+        else:
+            self.meta["cache"] = "HIT" if source == "cache" else "MISS"
+        if self.session is not None:
+            self.session.remember(result)
+            if self.prefetch is not None and wants_prefetch(self.clickCount):
+                self.prefetch(self)
+        return result
+
+    def generated(self, result, complete):
+        """AI 가 새로 만든 추천 → result. 잘린 응답(complete=False)은 보정한 결과를 응답만 하고
+        세션 이력/다음 추천 예약에는 쓰지 않는다 (캐시 저장도 각 모드가 complete 일 때만)"""
+        if complete:
+            return self.served(result, "ai")
+        self.meta["cache"] = "MISS"
+        return result
+
+    def offline(self, fallback, reason):
+        """AI 를 쓸 수 없을 때 로컬 레시피 카탈로그 추천 (세션이 있으면 이미 추천한 메뉴는 빼고 이력에 남김)"""
+        result, offline = offline_recommendation(self.lunch, self.ingredients, self.clickCount, fallback, reason, self.exclude)
+        if offline:
+            self.meta["source"] = "offline"
+            if self.session is not None:
+                self.session.remember(result)
+        return result
+
+    def no_key(self):
+        return self.offline(no_key_response(), "no_key")
+
+    def failed(self, e, label="AI Recommendation Error"):
+        print(f"{label}: {e}")
+        return self.offline(error_response(e), "error")
+
+
+def planning_hints(days, ingredients):
+    with metrics.stage("hints"):
+        return plan_hints(days, ingredients)
+
+
+def parsed_plan(raw, days):
+    with metrics.stage("parse"):
+        return parse_plan(raw, days)
+
+
+def offline_plan(days, ingredients, meta, skipped=()):
+    """키가 없을 때 카탈로그로만 짠 식단"""
+    meta["source"] = "offline"
+    return plan_response(fill_plan(days, {}, ingredients, "no_key"), ingredients, no_key_response()["message"], skipped)
+
+
+def plan_result(days, results, ingredients, skipped=()):
+    """묶음별 결과 [({날짜: 레시피}, 메시지) 또는 예외] → 식단 응답 (실패한 묶음의 날짜는 카탈로그로 채움)
+
+    skipped: PLAN_MAX_DAYS 를 넘어 빠진 날짜 (응답에 truncated 로 알림)
+    """
+    planned, messages, reason = {}, [], "missing"
+    for result in results:
+        if isinstance(result, Exception):
+            print(f"AI Plan Error: {result}")
+            reason = "error"
+            continue
+        planned.update(result[0])
+        messages.append(result[1])
+    return plan_response(fill_plan(days, planned, ingredients, reason), ingredients, next((m for m in messages if m), ""), skipped)
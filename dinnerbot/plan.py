@@ -0,0 +1,204 @@
+"""한 주(또는 한 달) 저녁 식단을 한 번에 짜기 (/api/plan)
+
+날짜마다 /api/recommend 를 부르면 긴 지침 프롬프트를 날짜 수만큼 다시 보내게 되므로,
+PLAN_CHUNK_DAYS 일씩 묶어 한 번의 AI 호출로 날짜별 저녁 메뉴를 받고 묶음이 여러 개면
+동시에 호출한다. 묶음끼리 같은 메뉴를 고르지 않도록 로컬 레시피 카탈로그에서 날짜마다
+서로 다른 후보를 미리 나눠 주고, 그래도 겹치거나 빠진 날은 카탈로그 레시피로 채운다.
+끝으로 날짜별 'more_ingredients' 를 모아 냉장고에 없는 재료만 장보기 목록으로 합친다.
+"""
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from dinnerbot import metrics
+from dinnerbot.batch import UNDATED, date_key, resolve_dates
+from dinnerbot.jsonrepair import extract_json
+from dinnerbot.menu import menu_text
+from dinnerbot.recipes import get_catalog
+from dinnerbot.recommend import normalize_items, normalize_recipe
+
+PLAN_MAX_DAYS = int(os.getenv("PLAN_MAX_DAYS", "31"))
+# AI 호출 한 번에 넣을 날짜 수 / 동시에 보낼 묶음 수
+PLAN_CHUNK_DAYS = int(os.getenv("PLAN_CHUNK_DAYS", "7"))
+PLAN_WORKERS = int(os.getenv("PLAN_WORKERS", "4"))
+
+# 여러 요청이 함께 쓰는 식단 묶음 호출 풀 (동시 AI 호출 수 상한)
+plan_pool = ThreadPoolExecutor(max_workers=PLAN_WORKERS, thread_name_prefix="plan")
+
+NO_DAYS_ERROR = {"error": "식단을 짤 날짜가 없습니다. 급식표를 먼저 분석해 주세요."}
+
+
+def plan_days(menu_data):
+    """{'날짜': 메뉴} → (날짜순 [(날짜, 점심 메뉴 텍스트)] 최대 PLAN_MAX_DAYS 일, 넘쳐서 뺀 날짜 목록)
+
+    메뉴가 빈 날은 제외한다.
+    """
+    if not isinstance(menu_data, dict):
+        return [], []
+    days = []
+    for label, value in menu_data.items():
+        lunch = menu_text(value).strip()
+        if lunch and label != "error":
+            days.append((str(label), lunch))
+    dates = resolve_dates([[label for label, _ in days]])[0]
+    days.sort(key=lambda d: dates.get(d[0]) or UNDATED)
+    return days[:PLAN_MAX_DAYS], [label for label, _ in days[PLAN_MAX_DAYS:]]
+
+
+def chunk_days(days, size=PLAN_CHUNK_DAYS):
+    size = max(1, size)
+    return [days[i:i + size] for i in range(0, len(days), size)]
+
+
+def plan_hints(days, ingredients):
+    """날짜별 카탈로그 후보 메뉴명 1개 (날짜끼리 겹치지 않게, 카탈로그를 못 읽으면 빈 dict)"""
+    catalog = get_catalog()
+    if not catalog:
+        return {}
+    hints, used = {}, []
+    for date, lunch in days:
+        names = catalog.candidate_names(lunch, ingredients, limit=1, exclude=used)
+        if names:
+            hints[date] = names[0]
+            used.append(names[0])
+    return hints
+
+
+def build_plan_prompt(days, ingredients, hints=None):
+    """[(날짜, 점심)] 묶음 → 날짜별 저녁 메뉴를 한 번에 받는 프롬프트"""
+    hints = hints or {}
+    lines = "\n".join(f"- {date}: {lunch}" + (f" (참고 후보: {hints[date]})" if date in hints else "")
+                      for date, lunch in days)
+    return f"""[상황] 냉장고 재료: {ingredients}. 아래는 날짜별 아이 점심 급식이야.
+{lines}
+[지침]
+1. 날짜마다 그날 점심과 주재료·조리법이 겹치지 않는 저녁 메뉴를 1개씩 추천하고, 같은 메뉴를 두 번 쓰지 마. 참고 후보는 골라도 되고 더 잘 맞는 메뉴가 있으면 바꿔도 돼.
+2. 냉장고 재료를 여러 날에 나눠 쓰고, 더 사야 하는 재료는 여러 날에 함께 쓸 수 있는 것 위주로 골라 'more_ingredients' 에 적어줘.
+3. 'steps' 는 3~4단계로 짧게 써줘.
+4. 응답은 반드시 아래 JSON 형식을 지켜줘 (date 는 위 날짜 표기 그대로):
+{{
+  "plans": [
+    {{
+      "date": "날짜",
+      "name": "메뉴명",
+      "desc": "선정이유",
+      "time": 소요시간(분),
+      "diff": "난이도(쉬움/보통/어려움)",
+      "ingredients": ["사용할 냉장고 재료"],
+      "more_ingredients": ["추가로 필요한 재료"],
+      "steps": ["레시피 단계1", "레시피 단계2", ...],
+      "tip": "전문가의 팁"
+    }}
+  ],
+  "message": "이번 식단에 대한 한두 문장 조언"
+}}"""
+
+
+def _plan_items(value):
+    """AI 응답 → [(날짜 또는 None, 레시피 dict)] ('plans' 목록 / 날짜를 키로 한 dict / 목록만 온 경우)"""
+    if isinstance(value, dict):
+        rows = next((value[k] for k in ("plans", "plan", "dinners", "days", "recipes") if isinstance(value.get(k), (list, dict))),
+                    {k: v for k, v in value.items() if isinstance(v, dict)})
+    else:
+        rows = value
+    if isinstance(rows, dict):
+        return [(date, dict(recipe, date=date)) for date, recipe in rows.items() if isinstance(recipe, dict)]
+    if isinstance(rows, list):
+        return [(r.get("date") or r.get("날짜"), r) for r in rows if isinstance(r, dict)]
+    return []
+
+
+def normalize_plan(value, days):
+    """AI 응답 → {날짜: 레시피} (날짜 표기가 달라도 (월, 일)로 맞추고, 날짜가 없으면 빈 날짜에 순서대로)"""
+    by_key = {}
+    for date, _ in days:
+        by_key.setdefault(date_key(date) or date, date)
+    planned = {}
+    unmatched = []
+    for label, row in _plan_items(value):
+        recipe = normalize_recipe({k: v for k, v in row.items() if k not in ("date", "날짜")})
+        if recipe is None:
+            continue
+        date = by_key.get(date_key(label) or label) if label else None
+        if date and date not in planned:
+            planned[date] = recipe
+        else:
+            unmatched.append(recipe)
+    for date, _ in days:
+        if date not in planned and unmatched:
+            planned[date] = unmatched.pop(0)
+    return planned
+
+
+def parse_plan(raw, days):
+    """AI 식단 응답 텍스트 → ({날짜: 레시피}, 조언 메시지). 잘린 응답이면 완성된 날짜까지만"""
+    value, _ = extract_json(raw)
+    message = value.get("message") if isinstance(value, dict) else None
+    return normalize_plan(value, days), message if isinstance(message, str) else ""
+
+
+def _dish_key(name):
+    return re.sub(r"\s+", "", name)
+
+
+def _catalog_recipe(catalog, lunch, ingredients, used):
+    if not catalog:
+        return None
+    for index, matched in catalog.rank(lunch, ingredients):
+        if _dish_key(catalog.recipes[index]["name"]) not in used:
+            return catalog.to_response_recipe(index, matched)
+    return None
+
+
+def fill_plan(days, planned, ingredients, reason="error"):
+    """날짜순 [{"date", "lunch", "recipe", "source"}]
+
+    AI 가 빠뜨렸거나 앞 날짜와 같은 메뉴를 준 날은 카탈로그에서 아직 안 쓴 레시피로 채운다.
+    reason(no_key / error / missing)은 /metrics 의 대체 경로 집계에 쓴다.
+    """
+    catalog = get_catalog()
+    used, entries = set(), []
+    for date, lunch in days:
+        recipe, source = planned.get(date), "ai"
+        if recipe is None or _dish_key(recipe["name"]) in used:
+            why = reason if recipe is None else "duplicate"
+            recipe, source = _catalog_recipe(catalog, lunch, ingredients, used), "offline"
+            metrics.FALLBACKS.inc(kind="offline" if recipe else "message", reason=why)
+        if recipe is not None:
+            used.add(_dish_key(recipe["name"]))
+        entries.append({"date": date, "lunch": lunch, "recipe": recipe, "source": source if recipe else None})
+    return entries
+
+
+def shopping_list(entries, ingredients):
+    """날짜별 more_ingredients 를 합친 장보기 목록 [{"item", "dates"}] (냉장고에 있는 재료 제외, 많이 쓰는 순)"""
+    fridge = set(normalize_items(ingredients))
+    items = {}  # 정규화한 재료 -> [표시용 이름, 쓰는 날짜들]
+    for entry in entries:
+        recipe = entry["recipe"]
+        for item in (recipe or {}).get("more_ingredients", []):
+            key = normalize_items(item)
+            if not key or fridge.issuperset(key):
+                continue
+            slot = items.setdefault(key, [item, []])
+            if entry["date"] not in slot[1]:
+                slot[1].append(entry["date"])
+    ordered = sorted(items.values(), key=lambda v: -len(v[1]))
+    return [{"item": name, "dates": dates} for name, dates in ordered]
+
+
+def plan_response(entries, ingredients, message="", skipped=()):
+    """skipped: PLAN_MAX_DAYS 를 넘어 식단을 짜지 않은 날짜 (있으면 truncated 와 안내 문구)"""
+    planned = sum(1 for e in entries if e["recipe"])
+    if not message:
+        message = "이번 식단으로 한 주 저녁 걱정 덜어 드릴게요!" if planned else \
+            "지금 재료로 짤 수 있는 저녁 식단을 찾지 못했어요. 재료를 조금 바꿔서 다시 물어봐 주세요."
+    if skipped:
+        message += f" (한 번에 {PLAN_MAX_DAYS}일까지만 짜요. {skipped[0]}부터 {len(skipped)}일은 다시 요청해 주세요.)"
+    return {
+        "plan": entries,
+        "shopping_list": shopping_list(entries, ingredients),
+        "message": message,
+        "truncated": bool(skipped),
+        "skipped": list(skipped),
+    }
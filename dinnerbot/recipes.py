@@ -0,0 +1,183 @@
+"""로컬 레시피 카탈로그 (AI 없이 1ms 안에 저녁 메뉴 추천)
+
+재료 → 레시피 역색인으로 냉장고 재료와 겹치는 레시피만 모아 집합 교집합 크기로
+순위를 매기고, 점심 메뉴의 주재료/조리법과 겹치는 레시피는 제외하거나 뒤로 뺀다.
+AI 키가 없거나 호출이 실패했을 때의 대체 응답, 그리고 AI 프롬프트에 넣는
+후보 목록으로 쓴다.
+"""
+import os
+import re
+import json
+
+from dinnerbot import metrics
+from dinnerbot.recommend import normalize_items
+
+RECIPES_PATH = os.getenv("RECIPES_PATH") or os.path.join(os.path.dirname(__file__), "data", "recipes.json")
+# AI 프롬프트에 넣을 로컬 후보 수 (0 이면 넣지 않음)
+RECIPE_HINTS = int(os.getenv("RECIPE_HINTS", "3"))
+
+# 점심 메뉴명 속 단어 → 주재료 (예: '돼지불고기' → 돼지고기)
+MAIN_KEYWORDS = {
+    "돼지": "돼지고기", "돼지불고기": "돼지고기", "제육": "돼지고기", "돈까스": "돼지고기", "돈가스": "돼지고기", "탕수육": "돼지고기",
+    "수육": "돼지고기", "짜장": "돼지고기", "카레": "돼지고기",
+    "소고기": "소고기", "쇠고기": "소고기", "불고기": "소고기", "장조림": "소고기", "떡갈비": "소고기",
+    "닭": "닭고기", "치킨": "닭고기",
+    "고등어": "생선", "삼치": "생선", "갈치": "생선", "연어": "생선", "동태": "생선", "생선": "생선", "가자미": "생선",
+    "계란": "계란", "달걀": "계란", "오므라이스": "계란",
+    "두부": "두부", "어묵": "어묵", "참치": "참치", "새우": "새우", "소시지": "소시지", "햄": "햄",
+    "감자": "감자", "떡": "떡", "국수": "국수", "스파게티": "파스타", "파스타": "파스타",
+    "김치": "김치", "콩나물": "콩나물", "미역": "미역", "시금치": "시금치", "버섯": "버섯",
+}
+# 점심 메뉴명 속 단어 → 조리법
+METHOD_KEYWORDS = {
+    "볶음": "볶음", "볶이": "볶음", "불고기": "볶음", "짜장": "볶음",
+    "구이": "구이", "조림": "조림", "장조림": "조림", "카레": "조림", "찜": "찜",
+    "튀김": "튀김", "까스": "튀김", "가스": "튀김", "강정": "튀김", "탕수": "튀김",
+    "국": "국물", "탕": "국물", "찌개": "국물",
+    "전": "부침", "부침": "부침", "무침": "무침", "나물": "무침", "샐러드": "무침", "비빔": "비빔",
+}
+_MAIN_PATTERN = re.compile("|".join(sorted(MAIN_KEYWORDS, key=len, reverse=True)))
+_METHOD_PATTERN = re.compile("|".join(sorted(METHOD_KEYWORDS, key=len, reverse=True)))
+
+RESPONSE_FIELDS = ("name", "desc", "time", "diff", "steps", "tip")
+
+
+def lunch_profile(lunch):
+    """점심 메뉴 → (주재료 집합, 조리법 집합)"""
+    mains, methods = set(), set()
+    for item in normalize_items(lunch):
+        for m in _MAIN_PATTERN.findall(item):
+            mains.add(MAIN_KEYWORDS[m])
+        # '국', '전' 같은 한 글자 조리법은 메뉴명 끝에 올 때만 (예: '미역국' O, '국수' X)
+        for m in _METHOD_PATTERN.finditer(item):
+            if len(m.group(0)) > 1 or m.end() == len(item):
+                methods.add(METHOD_KEYWORDS[m.group(0)])
+    return mains, methods
+
+
+class RecipeCatalog:
+    """레시피 목록 + 재료/주재료/조리법 역색인"""
+
+    def __init__(self, recipes):
+        self.recipes = recipes
+        self.by_ingredient = {}
+        self.by_main = {}
+        self.by_method = {}
+        self._ingredients = []
+        for i, recipe in enumerate(recipes):
+            ingredients = set(normalize_items(recipe["ingredients"]))
+            self._ingredients.append(ingredients)
+            for item in ingredients:
+                self.by_ingredient.setdefault(item, set()).add(i)
+            self.by_main.setdefault(recipe.get("main"), set()).add(i)
+            self.by_method.setdefault(recipe.get("method"), set()).add(i)
+
+    @classmethod
+    def load(cls, path=RECIPES_PATH):
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def rank(self, lunch, ingredients, exclude=()):
+        """냉장고 재료와 겹치는 레시피 순위 [(레시피 번호, 겹치는 재료 집합), ...]
+
+        점심과 주재료가 같은 레시피는 빼고, 조리법만 같은 레시피는 뒤로 보낸다.
+        재료 하나도 안 겹치면 후보가 아니다.
+        """
+        fridge = set(normalize_items(ingredients))
+        mains, methods = lunch_profile(lunch)
+        hits = {}
+        for item in fridge:
+            for i in self.by_ingredient.get(item, ()):
+                hits[i] = hits.get(i, 0) + 1
+        excluded = set()
+        for main in mains:
+            excluded |= self.by_main.get(main, set())
+        same_method = set()
+        for method in methods:
+            same_method |= self.by_method.get(method, set())
+        skip = set(exclude)
+
+        ranked = []
+        for i, count in hits.items():
+            recipe = self.recipes[i]
+            if i in excluded or recipe["name"] in skip:
+                continue
+            missing = len(self._ingredients[i]) - count
+            ranked.append(((i in same_method, -count, missing, recipe["time"]), i))
+        ranked.sort()
+        return [(i, self._ingredients[i] & fridge) for _, i in ranked]
+
+    def to_response_recipe(self, index, matched):
+        """API 응답 형식의 레시피 (ingredients: 쓰이는 냉장고 재료, more_ingredients: 더 필요한 재료)"""
+        recipe = self.recipes[index]
+        result = {k: recipe[k] for k in RESPONSE_FIELDS if k in recipe}
+        result["ingredients"] = [item for item in recipe["ingredients"] if matched.intersection(normalize_items(item))]
+        result["more_ingredients"] = [item for item in recipe["ingredients"] if item not in result["ingredients"]]
+        return result
+
+    def recommend(self, lunch, ingredients, clickCount=0, exclude=()):
+        """AI 없이 만든 추천 응답 (/api/recommend 와 같은 형식)
+
+        exclude(세션에서 이미 추천한 메뉴명)가 있으면 그 밖의 첫 후보, 없으면 clickCount 번째 후보 1개.
+        """
+        ranked = self.rank(lunch, ingredients, exclude)
+        try:
+            variant = 0 if exclude else max(0, int(clickCount or 0))
+        except (TypeError, ValueError):
+            variant = 0
+        if variant >= len(ranked):
+            return {
+                "analysis": "기본 레시피 목록에서 냉장고 재료로 만들 수 있는 메뉴를 찾아보았어요.",
+                "recipes": [],
+                "message": "지금 재료로 추천해 드릴 수 있는 메뉴를 모두 보여드렸어요. 재료를 조금 바꿔서 다시 물어봐 주세요!"
+            }
+        index, matched = ranked[variant]
+        return {
+            "analysis": "오늘 점심과 주재료가 겹치지 않는 메뉴를 기본 레시피 목록에서 골랐어요.",
+            "recipes": [self.to_response_recipe(index, matched)],
+            "message": "오늘도 고생 많으셨어요. 맛있는 저녁 되세요!"
+        }
+
+    def candidate_names(self, lunch, ingredients, limit=RECIPE_HINTS, exclude=()):
+        """AI 프롬프트에 넣을 후보 메뉴명"""
+        if limit <= 0:
+            return []
+        return [self.recipes[i]["name"] for i, _ in self.rank(lunch, ingredients, exclude)[:limit]]
+
+
+_catalog = None
+
+
+def get_catalog():
+    """프로세스 전역 레시피 카탈로그 (처음 쓸 때 한 번 로드, 실패하면 None)"""
+    global _catalog
+    if _catalog is None:
+        try:
+            _catalog = RecipeCatalog.load()
+        except Exception as e:
+            print(f"Recipe Catalog Error: {e}")
+            return None
+    return _catalog
+
+
+def recipe_hints(lunch, ingredients, exclude=()):
+    """AI 프롬프트용 로컬 후보 (카탈로그를 못 읽으면 빈 목록)"""
+    catalog = get_catalog()
+    return catalog.candidate_names(lunch, ingredients, exclude=exclude) if catalog else []
+
+
+def offline_recommendation(lunch, ingredients, clickCount, fallback, reason="error", exclude=()):
+    """AI 를 쓸 수 없을 때의 추천: 로컬 레시피가 있으면 그것을, 없으면 fallback 응답
+
+    키가 없거나 API 오류가 난 이유는 fallback 의 message 로 알려준다.
+    reason(no_key / error)은 /metrics 의 대체 경로 집계에 쓴다.
+    """
+    catalog = get_catalog()
+    with metrics.stage("recipes"):
+        result = catalog.recommend(lunch, ingredients, clickCount, exclude) if catalog else None
+    if not result or not result["recipes"]:
+        metrics.FALLBACKS.inc(kind="message", reason=reason)
+        return fallback, False
+    metrics.FALLBACKS.inc(kind="offline", reason=reason)
+    result["message"] = fallback["message"]
+    return result, True
@@ -0,0 +1,181 @@
+import re
+import json
+import hashlib
+
+from dinnerbot.jsonrepair import extract_json
+
+SYSTEM_PROMPT = "공감 능력이 뛰어난 요리 전문가입니다."
+
+
+def build_recommend_prompt(lunch, ingredients, clickCount=0, candidates=None, exclude=None):
+    """저녁 메뉴 추천 프롬프트 (name → ingredients → steps 순으로 출력되도록 스키마 순서 유지)
+
+    candidates: 로컬 레시피 카탈로그가 고른 후보 메뉴명 (참고용으로만 제시)
+    exclude: 이 세션에서 이미 추천한 메뉴명 (다시 추천하지 않도록 명시)
+    """
+    if exclude:
+        diff_instruction = f"이미 추천한 메뉴({', '.join(exclude)})와 그 변형은 빼고 새로운 메뉴로 추천해줘."
+    else:
+        diff_instruction = "이전 추천과는 다른 새로운 메뉴로 추천해줘." if clickCount > 0 else ""
+    hint_instruction = f"\n   참고 후보: {', '.join(candidates)} (이 중에서 골라도 되고, 더 잘 맞는 메뉴가 있으면 그걸 추천해도 돼)" if candidates else ""
+    return f"""[상황] 오늘 아이 점심: {lunch}, 냉장고 재료: {ingredients}.
+[지침]
+1. 입력된 냉장고 재료 중 하나라도 활용하여 점심 메뉴와 겹치지 않는 맛있는 저녁 메뉴 1개를 추천해줘. {diff_instruction}{hint_instruction}
+2. 냉장고 재료 외에 만약 더 필요한 재료가 있다면 'more_ingredients' 항목에 따로 나열해줘.
+3. 만약 더 이상 추천할 만한 적절한 메뉴가 없다면(너무 많이 추천했거나 조건이 안 맞을 때), 'recipes' 배열을 비워두고(empty list), 'message' 항목에 사용자에게 정중하고 상냥하게 사과하며 양해를 구하는 멘트를 작성해줘.
+4. 응답은 반드시 아래 JSON 형식을 지켜줘:
+{{
+  "analysis": "오늘의 식단 분석 및 조언",
+  "recipes": [
+    {{
+      "name": "메뉴명",
+      "desc": "선정이유 및 설명",
+      "time": 소요시간(분),
+      "diff": "난이도(쉬움/보통/어려움)",
+      "ingredients": ["사용된 냉장고 재료"],
+      "more_ingredients": ["추가로 필요한 재료"],
+      "steps": ["레시피 단계1", "레시피 단계2", ...],
+      "tip": "전문가의 팁"
+    }}
+  ],
+  "message": "부모님을 위한 따뜻한 응원 멘트(또는 더 이상 추천할 메뉴가 없을 때의 정중한 거절 메시지)"
+}}"""
+
+
+# 같은 재료의 다른 표기 → 대표 표기 (캐시 키 정규화용)
+SYNONYMS = {
+    "달걀": "계란", "에그": "계란",
+    "쇠고기": "소고기", "우육": "소고기",
+    "돈육": "돼지고기", "돼지": "돼지고기",
+    "닭": "닭고기", "계육": "닭고기",
+    "파": "대파",
+    "참치캔": "참치",
+}
+ITEM_SEPARATORS = re.compile(r"[\s,/·、|]+")
+# 급식 메뉴명 뒤의 알레르기 번호 ('미역국5.6.', '우유(2)')
+ALLERGEN_SUFFIX = re.compile(r"\(?\d{1,2}(?:\.\d{1,2})*\.?\)?$")
+
+
+def normalize_items(value):
+    """'달걀, 두부  양파,계란' → ('계란', '두부', '양파') (공백/쉼표/순서/중복/동의어 무시)"""
+    if isinstance(value, (list, tuple)):
+        value = " ".join(str(v) for v in value)
+    items = set()
+    for token in ITEM_SEPARATORS.split(str(value or "").lower()):
+        token = ALLERGEN_SUFFIX.sub("", token).strip("()[].-*")
+        if token:
+            items.add(SYNONYMS.get(token, token))
+    return tuple(sorted(items))
+
+
+def recommend_key(provider, lunch, ingredients, clickCount=0):
+    """추천 캐시 키: (provider, 점심 메뉴, 재료 집합, 몇 번째 추천인지)"""
+    try:
+        variant = int(clickCount or 0)
+    except (TypeError, ValueError):
+        variant = 0
+    raw = json.dumps([provider, normalize_items(lunch), normalize_items(ingredients), variant], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+# 추천 응답에서 가끔 쓰이는 다른 필드명 → 스키마 필드명
+RECIPE_ALIASES = {
+    "title": "name", "menu": "name", "menu_name": "name", "메뉴명": "name", "이름": "name",
+    "description": "desc", "reason": "desc", "설명": "desc",
+    "cooking_time": "time", "minutes": "time", "소요시간": "time",
+    "difficulty": "diff", "level": "diff", "난이도": "diff",
+    "instructions": "steps", "recipe": "steps", "조리법": "steps", "레시피": "steps",
+    "extra_ingredients": "more_ingredients", "추가재료": "more_ingredients", "재료": "ingredients",
+    "tips": "tip", "팁": "tip",
+}
+LIST_FIELDS = ("ingredients", "more_ingredients", "steps")
+# '1. 썬다 2. 조린다' 처럼 한 줄에 이어 쓴 단계 번호
+STEP_NUMBER = re.compile(r"(?:^|\s)\d+[.)]\s*")
+
+
+def _as_list(value, field):
+    if isinstance(value, list):
+        return [str(v).strip() for v in value if str(v).strip()]
+    if not isinstance(value, str):
+        return []
+    if field != "steps":
+        parts = re.split(r"[,\n]", value)
+    elif "\n" in value:
+        parts = [STEP_NUMBER.sub("", line, count=1) for line in value.split("\n")]
+    else:
+        parts = STEP_NUMBER.split(value)
+    return [p.strip() for p in parts if p and p.strip()]
+
+
+def normalize_recipe(recipe):
+    """레시피 하나를 스키마에 맞춤 (메뉴명이 없으면 None)"""
+    if not isinstance(recipe, dict):
+        return None
+    fixed = {}
+    for key, value in recipe.items():
+        fixed.setdefault(RECIPE_ALIASES.get(key, key), value)
+    name = fixed.get("name")
+    if not isinstance(name, str) or not name.strip():
+        return None
+    fixed["name"] = name.strip()
+    for field in LIST_FIELDS:
+        fixed[field] = _as_list(fixed.get(field), field)
+    if not isinstance(fixed.get("time"), (int, float)):
+        # '약 20분' → 20 (숫자가 없으면 화면에 '분' 만 나오지 않도록 뺀다)
+        m = re.search(r"\d+", str(fixed.pop("time", None) or ""))
+        if m:
+            fixed["time"] = int(m.group(0))
+    for field in ("desc", "diff", "tip"):
+        fixed[field] = str(fixed.get(field) or "")
+    return fixed
+
+
+def normalize_recommendation(value):
+    """AI 추천 응답 → {"analysis", "recipes": [...], "message"} (쓸 수 없는 형식이면 ValueError)
+
+    레시피 하나만 온 경우, 'recipe'/'dinner'/'menus' 로 감싼 경우, 목록만 온 경우를 받는다.
+    """
+    if isinstance(value, list):
+        value = {"recipes": value}
+    if not isinstance(value, dict):
+        raise ValueError("추천 응답 형식이 올바르지 않습니다.")
+    recipes = value.get("recipes")
+    if recipes is None:
+        recipes = next((value[k] for k in ("recipe", "dinner", "menus", "menu", "result") if isinstance(value.get(k), (dict, list))),
+                       [value] if "name" in value or "메뉴명" in value else [])
+    if isinstance(recipes, dict):
+        recipes = [recipes]
+    recipes = [r for r in (normalize_recipe(r) for r in (recipes if isinstance(recipes, list) else [])) if r]
+    message = value.get("message")
+    if not recipes and not isinstance(message, str):
+        raise ValueError("추천 응답에 레시피도 안내 메시지도 없습니다.")
+    return {
+        "analysis": str(value.get("analysis") or ""),
+        "recipes": recipes,
+        "message": str(message or ""),
+    }
+
+
+def parse_recommendation(raw):
+    """AI 추천 응답 텍스트 → (스키마에 맞춘 dict, 응답 JSON 이 잘리지 않고 끝났는지)
+
+    잘린 응답도 완성된 부분까지 보정해 돌려주지만, 캐시나 선생성 대기열에는 넣지 않는다.
+    """
+    value, complete = extract_json(raw)
+    return normalize_recommendation(value), complete
+
+
+def no_key_response():
+    return {
+        "analysis": "실제 AI 버전을 위해 올바른 API 키가 필요합니다.",
+        "recipes": [],
+        "message": "설정에서 유효한 OpenAI(sk-) 또는 Google(AIza) 키를 입력해 주세요."
+    }
+
+
+def error_response(e):
+    return {
+        "analysis": "AI 추천 중 오류가 발생했습니다.",
+        "recipes": [],
+        "message": f"API 오류: {str(e)}"
+    }
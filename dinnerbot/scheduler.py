@@ -0,0 +1,344 @@
+"""AI 호출 스케줄러 (429 재시도, 모델 대체, 헤지 요청, 선택적 키·모델별 토큰 버킷)
+
+429(할당량 초과)가 나면 그 키·모델을 retry-after 동안 막고 지터를 준 백오프로 다시 시도하며,
+기다릴 시간이 길면 MODEL_CHAIN 의 다음 모델로 넘어간다. 키마다 요금 등급이 달라 로컬에서
+분당 요청 수를 미리 제한하지는 않는다 (MODEL_RPM / MODEL_RPM_DEFAULT 를 설정했을 때만). 체인은 키의 provider 가
+호출할 수 있는 모델만 쓴다 (Gemini 키 → gemini-*, OpenAI 키 → gpt-*).
+HEDGE_AFTER 초가 지나도 응답이 없으면 다음 모델로 같은 요청을 하나 더 보내
+먼저 끝난 쪽을 쓴다 (기본 꺼짐).
+재시도와 대체는 연결·시간 초과, 429, 5xx 에만 하고 그 밖의 오류(요청 오류, 응답 처리 중 난
+예외)는 같은 요청을 다른 모델로 보내도 소용없으므로 바로 올린다.
+background=True 호출(선생성)은 첫 모델로 한 번만, 기다리지 않고 보낸다. 막혀 있거나
+토큰 버킷이 BACKGROUND_HEADROOM 비율 아래로 비어 있으면 바로 QuotaError 로 포기해
+사용자 요청 몫의 한도를 쓰지 않는다.
+"""
+import os
+import re
+import time
+import random
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from dinnerbot import metrics
+from dinnerbot.clients import OPENAI_MODEL, GEMINI_MODEL
+
+MODEL_CHAIN = [m.strip() for m in os.getenv(
+    "MODEL_CHAIN", "gemini-2.5-flash,gemini-2.0-flash,gemini-2.0-flash-lite,gpt-4o-mini").split(",") if m.strip()]
+# 로컬에서 미리 제한할 모델별 분당 요청 수 (기본 없음: provider 의 429 만 따름).
+# 목록에 없는 모델은 MODEL_RPM_DEFAULT (0 이면 제한 없음)
+MODEL_RPM = {
+    name.strip(): float(rpm)
+    for name, rpm in (item.split("=") for item in os.getenv("MODEL_RPM", "").split(",") if "=" in item)
+}
+MODEL_RPM_DEFAULT = float(os.getenv("MODEL_RPM_DEFAULT", "0"))
+# 한 모델에서 429 후 다시 시도하는 횟수 / 백오프 한도(초) / 토큰을 기다리는 최대 시간(초)
+RETRY_ATTEMPTS = int(os.getenv("RETRY_ATTEMPTS", "2"))
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "0.5"))
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "8"))
+RATE_MAX_WAIT = float(os.getenv("RATE_MAX_WAIT", "2"))
+# 이 시간(초) 안에 응답이 없으면 헤지 요청 (0 이면 끔)
+HEDGE_AFTER = float(os.getenv("HEDGE_AFTER", "0"))
+# 백그라운드 호출이 남겨 둘 토큰 버킷 비율 (MODEL_RPM 을 설정했을 때)
+BACKGROUND_HEADROOM = float(os.getenv("BACKGROUND_HEADROOM", "0.5"))
+
+# gRPC 상태 → HTTP 상태 (google-api-core 예외의 grpc_status_code)
+GRPC_STATUS = {"RESOURCE_EXHAUSTED": 429, "NOT_FOUND": 404, "INVALID_ARGUMENT": 400, "UNAUTHENTICATED": 401,
+               "PERMISSION_DENIED": 403, "UNAVAILABLE": 503, "DEADLINE_EXCEEDED": 504}
+
+# 상태 코드 없이 나는 연결/시간 초과 예외 (SDK 를 import 하지 않도록 클래스 이름으로 판별)
+# openai.APIConnectionError / APITimeoutError, httpx.TransportError / TimeoutException,
+# google.auth TransportError, requests ConnectionError / Timeout
+TRANSPORT_ERRORS = {"APIConnectionError", "APITimeoutError", "TransportError", "TimeoutException", "ConnectionError", "Timeout"}
+
+RETRY_IN = re.compile(r"retry in ([\d.]+)\s*s|retry_delay\s*\{\s*seconds:\s*(\d+)", re.IGNORECASE)
+
+
+class TokenBucket:
+    """분당 rpm 개의 요청을 허용하는 토큰 버킷 (rpm 이 0 이면 제한 없이 429 의 retry-after 만 지킴)"""
+
+    def __init__(self, rpm):
+        self.rate = rpm / 60.0
+        self.capacity = max(1.0, rpm)
+        self.limited = rpm > 0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait, headroom=0.0):
+        """토큰 하나를 예약하고 기다려야 할 시간(초)을 돌려준다. max_wait 보다 길면 예약하지 않고 None
+
+        headroom: 예약 뒤에도 남아 있어야 할 토큰 비율 (모자라면 None)
+        """
+        with self._lock:
+            now = time.monotonic()
+            delay = max(0.0, self.blocked_until - now)
+            if not self.limited:
+                return delay if delay <= max_wait else None
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if headroom and self.tokens - 1 < headroom * self.capacity:
+                return None
+            if self.tokens < 1:
+                delay = max(delay, (1 - self.tokens) / self.rate)
+            if delay > max_wait:
+                return None
+            self.tokens -= 1
+            return delay
+
+    def block(self, seconds):
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+class QuotaError(Exception):
+    """체인의 모든 모델이 할당량 초과/대기 한도 초과일 때"""
+
+
+def status_of(e):
+    """SDK 예외의 HTTP 상태 (OpenAI status_code, google-api-core code/grpc_status_code).
+
+    메시지에 '429' 같은 숫자가 들어 있어도 상태로 보지 않도록 예외 문자열은 읽지 않는다.
+    """
+    response = getattr(e, "response", None)
+    for code in (getattr(e, "status_code", None), getattr(e, "code", None),
+                 getattr(response, "status_code", None), getattr(e, "grpc_status_code", None)):
+        if callable(code) and not isinstance(code, type):  # grpc.RpcError.code()
+            try:
+                code = code()
+            except Exception:
+                continue
+        if isinstance(code, int) and not isinstance(code, bool):
+            return code
+        name = getattr(code, "name", None)  # grpc.StatusCode
+        if name in GRPC_STATUS:
+            return GRPC_STATUS[name]
+    return None
+
+
+def is_transient(e):
+    """재시도/다음 모델로 넘길 만한 실패인지 (연결·시간 초과, 408, 429, 5xx)
+
+    요청 자체의 문제(그 밖의 4xx)나 응답 처리 중 난 코드 오류는 다른 모델로 보내도 같으므로 False.
+    """
+    status = status_of(e)
+    if status is not None:
+        return status in (408, 429) or status >= 500
+    if isinstance(e, (TimeoutError, ConnectionError)):
+        return True
+    return any(cls.__name__ in TRANSPORT_ERRORS for cls in type(e).__mro__)
+
+
+def retry_after(e):
+    """429 응답이 알려준 재시도 대기 시간(초) (없으면 None)"""
+    response = getattr(e, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers:
+        try:
+            return float(headers.get("retry-after"))
+        except (TypeError, ValueError):
+            pass
+    m = RETRY_IN.search(str(e))
+    if m:
+        return float(m.group(1) or m.group(2))
+    return None
+
+
+def backoff(attempt, hint=None):
+    """지터를 준 지수 백오프 (retry-after 가 있으면 그보다 짧게 기다리지 않음)"""
+    delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * (2 ** attempt)) * random.uniform(0.5, 1.5)
+    return max(delay, hint or 0)
+
+
+def provider_of_model(model):
+    return "openai" if model.startswith(("gpt-", "o1", "o3", "o4")) else "gemini"
+
+
+class Scheduler:
+    def __init__(self, chain=None, attempts=RETRY_ATTEMPTS, max_wait=RATE_MAX_WAIT, hedge_after=HEDGE_AFTER):
+        self.chain = chain or MODEL_CHAIN
+        self.attempts = attempts
+        self.max_wait = max_wait
+        self.hedge_after = hedge_after
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._hedge_pool = None
+
+    def models_for(self, ai_client):
+        models = [m for m in self.chain if provider_of_model(m) == ai_client["type"]]
+        return models or [OPENAI_MODEL if ai_client["type"] == "openai" else GEMINI_MODEL]
+
+    def bucket(self, ai_client, model):
+        key = (ai_client.get("key_id"), model)
+        with self._lock:
+            if key not in self._buckets:
+                self._buckets[key] = TokenBucket(MODEL_RPM.get(model, MODEL_RPM_DEFAULT))
+            return self._buckets[key]
+
+    def client_for(self, ai_client, model):
+        """모델별 SDK 객체 (OpenAI 는 클라이언트 그대로, Gemini 는 같은 키 채널을 쓰는 모델 객체)
+
+        ai_client 는 클라이언트 풀이 여러 요청에 함께 내주는 dict 이므로 모델 객체 표는 잠그고 고친다.
+        """
+        if ai_client["type"] == "openai" or getattr(ai_client["client"], "model_name", None) in (model, f"models/{model}"):
+            return ai_client["client"]
+        with self._lock:
+            models = ai_client.setdefault("models", {})
+            if model not in models:
+                models[model] = ai_client["client"].with_model(model)
+            return models[model]
+
+    def _plan(self, ai_client, attempt, model, e, attempts):
+        """실패 원인별 다음 행동: ('retry', 대기), ('next', None), ('raise', None)
+
+        재시도와 다음 모델 대체는 연결·시간 초과, 429, 5xx (그리고 모델이 없는 404) 에만 한다.
+        """
+        status = status_of(e)
+        if status == 404:
+            print(f"Scheduler: {model} not available, trying next model")
+            return "next", None
+        if not is_transient(e):
+            return "raise", None
+        hint = retry_after(e)
+        if status == 429:
+            self.bucket(ai_client, model).block(hint or backoff(attempt))
+            if hint and hint > RETRY_MAX_DELAY:
+                print(f"Scheduler: {model} quota exhausted (retry after {hint:g}s), trying next model")
+                return "next", None
+        if attempt < attempts:
+            return "retry", backoff(attempt, hint)
+        return "next", None
+
+    def _observe(self, ai_client, model, started, e=None):
+        """호출 1회의 소요 시간을 provider/모델/결과(ok, 429, error …)별로 기록"""
+        outcome = "ok" if e is None else str(status_of(e) or "error")
+        metrics.observe_call(ai_client["type"], model, outcome, time.perf_counter() - started)
+
+    # 동기 (Flask)
+
+    def _limits(self, models, background):
+        """(모델, 재시도 횟수, 최대 대기, 남길 토큰 비율)"""
+        if background:
+            return models[:1], 0, 0.0, BACKGROUND_HEADROOM
+        return models, self.attempts, self.max_wait, 0.0
+
+    def call(self, ai_client, fn, background=False):
+        """fn(SDK 객체, 모델명) 을 체인 순서로 실행 (background: 선생성처럼 미뤄도 되는 호출)"""
+        models = self.models_for(ai_client)
+        if background:
+            return self._run_chain(ai_client, fn, models, True)
+        if self.hedge_after <= 0:
+            return self._run_chain(ai_client, fn, models)
+        with self._lock:
+            if self._hedge_pool is None:
+                self._hedge_pool = ThreadPoolExecutor(max_workers=int(os.getenv("HEDGE_WORKERS", "8")))
+        primary = self._hedge_pool.submit(self._run_chain, ai_client, fn, models)
+        done, _ = wait([primary], timeout=self.hedge_after)
+        if done:
+            return primary.result()
+        hedge_models = models[1:] or models
+        print(f"Scheduler: no response after {self.hedge_after:g}s, hedging on {hedge_models[0]}")
+        metrics.FALLBACKS.inc(kind="hedge", reason="slow")
+        pending = {primary, self._hedge_pool.submit(self._run_chain, ai_client, fn, hedge_models)}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def _run_chain(self, ai_client, fn, models, background=False):
+        models, attempts, max_wait, headroom = self._limits(models, background)
+        error = None
+        for model in models:
+            bucket = self.bucket(ai_client, model)
+            for attempt in range(attempts + 1):
+                delay = bucket.reserve(max_wait, headroom)
+                if delay is None:
+                    error = error or QuotaError(f"{model} 요청 한도 초과")
+                    metrics.FALLBACKS.inc(kind="model", reason="rate_limit")
+                    break
+                if delay:
+                    time.sleep(delay)
+                started = time.perf_counter()
+                try:
+                    result = fn(self.client_for(ai_client, model), model)
+                    self._observe(ai_client, model, started)
+                    return result
+                except Exception as e:
+                    self._observe(ai_client, model, started, e)
+                    error = e
+                    action, delay = self._plan(ai_client, attempt, model, e, attempts)
+                    if action == "raise":
+                        raise
+                    if action == "next":
+                        metrics.FALLBACKS.inc(kind="model", reason=str(status_of(e) or "error"))
+                        break
+                    time.sleep(delay)
+        raise error
+
+    # 비동기 (Quart)
+
+    async def call_async(self, ai_client, fn, background=False):
+        """await fn(SDK 객체, 모델명) 을 체인 순서로 실행"""
+        models = self.models_for(ai_client)
+        if background:
+            return await self._run_chain_async(ai_client, fn, models, True)
+        if self.hedge_after <= 0:
+            return await self._run_chain_async(ai_client, fn, models)
+        primary = asyncio.ensure_future(self._run_chain_async(ai_client, fn, models))
+        done, _ = await asyncio.wait({primary}, timeout=self.hedge_after)
+        if done:
+            return primary.result()
+        hedge_models = models[1:] or models
+        print(f"Scheduler: no response after {self.hedge_after:g}s, hedging on {hedge_models[0]}")
+        metrics.FALLBACKS.inc(kind="hedge", reason="slow")
+        pending = {primary, asyncio.ensure_future(self._run_chain_async(ai_client, fn, hedge_models))}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _run_chain_async(self, ai_client, fn, models, background=False):
+        models, attempts, max_wait, headroom = self._limits(models, background)
+        error = None
+        for model in models:
+            bucket = self.bucket(ai_client, model)
+            for attempt in range(attempts + 1):
+                delay = bucket.reserve(max_wait, headroom)
+                if delay is None:
+                    error = error or QuotaError(f"{model} 요청 한도 초과")
+                    metrics.FALLBACKS.inc(kind="model", reason="rate_limit")
+                    break
+                if delay:
+                    await asyncio.sleep(delay)
+                started = time.perf_counter()
+                try:
+                    result = await fn(self.client_for(ai_client, model), model)
+                    self._observe(ai_client, model, started)
+                    return result
+                except Exception as e:
+                    self._observe(ai_client, model, started, e)
+                    error = e
+                    action, delay = self._plan(ai_client, attempt, model, e, attempts)
+                    if action == "raise":
+                        raise
+                    if action == "next":
+                        metrics.FALLBACKS.inc(kind="model", reason=str(status_of(e) or "error"))
+                        break
+                    await asyncio.sleep(delay)
+        raise error
+
+
+scheduler = Scheduler()
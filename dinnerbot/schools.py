@@ -0,0 +1,188 @@
+"""학교별 월간 급식 식단 공유 저장소 (/api/schools)
+
+같은 학교 부모들이 같은 달 식단표를 저마다 올려 OCR + AI 정리 비용을 다시 치르지 않도록,
+분석에 성공한 날짜별 메뉴를 OCR 텍스트에서 찾은 학교 이름(…초등학교/중학교/고등학교)과
+연·월 기준으로 SQLite 에 남긴다. 이후 "이 학교 이번 달 식단 불러오기"는 이미지 없이 이
+저장소만 조회한다.
+같은 날짜에 서로 다른 메뉴가 올라오면 (OCR 오류, 식단 변경 공지 등) 가장 많은 업로드가
+동의한 메뉴를, 표가 같으면 가장 최근 메뉴를 고른다. 같은 이미지를 다시 올리면 표를 더하지
+않고 그 업로드의 기록만 새로 고친다.
+SCHOOL_MENU_DB 를 설정하지 않으면 프로세스 메모리(SQLite :memory:)에만 보관한다.
+"""
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+from collections import Counter
+from datetime import date
+
+from dinnerbot.batch import nearest_year, resolve_dates
+from dinnerbot.menu import menu_text
+from dinnerbot.recommend import normalize_items
+
+SCHOOL_MENU_DB = os.getenv("SCHOOL_MENU_DB", ":memory:")
+# 이보다 오래된 업로드 기록은 지움 (일)
+SCHOOL_MENU_TTL_DAYS = int(os.getenv("SCHOOL_MENU_TTL_DAYS", "400"))
+
+# OCR 이 이름과 학교급 사이를 띄어 읽은 경우('한빛 초등학교')까지
+SCHOOL_PATTERN = re.compile(r"([가-힣]{1,20})[ \t]?(초등학교|중학교|고등학교)")
+YEAR_PATTERN = re.compile(r"(20\d{2})\s*(?:년|[-./])")
+SCHOOL_YEAR_PATTERN = re.compile(r"(20\d{2})\s*학년도")
+MONTH_PATTERN = re.compile(r"(\d{1,2})\s*월")
+MONTH_PARAM = re.compile(r"^(\d{4})-(\d{1,2})$")
+
+NOT_FOUND_ERROR = {"error": "이 학교의 이번 달 식단이 아직 없습니다. 급식표 사진을 한 번 분석해 주세요."}
+BAD_QUERY_ERROR = {"error": "학교 이름과 달(YYYY-MM)을 확인해 주세요."}
+
+
+def normalize_school(name):
+    """'서울 한빛 초등학교' → '서울한빛초등학교' (공백 무시)"""
+    return re.sub(r"\s+", "", str(name or ""))
+
+
+def detect_school(text):
+    """OCR 텍스트에서 학교 이름 (여러 번 나오면 가장 많이 나온 이름, 없으면 None)"""
+    names = Counter(name + level for name, level in SCHOOL_PATTERN.findall(text or ""))
+    return names.most_common(1)[0][0] if names else None
+
+
+def detect_month(text, today=None):
+    """식단표의 (연, 월): 본문에 가장 많이 나온 'N월' 과 'YYYY년'/'YYYY학년도' (연도가 없으면 올해, 연말·연초는 가까운 해)"""
+    today = today or date.today()
+    months = Counter(int(m) for m in MONTH_PATTERN.findall(text or "") if 1 <= int(m) <= 12)
+    month = months.most_common(1)[0][0] if months else today.month
+    years = Counter(int(y) for y in YEAR_PATTERN.findall(text or ""))
+    if years:
+        return years.most_common(1)[0][0], month
+    school_years = Counter(int(y) for y in SCHOOL_YEAR_PATTERN.findall(text or ""))
+    if school_years:
+        # 학년도는 3월에 시작 ('2025학년도 2월' = 2026년 2월)
+        return school_years.most_common(1)[0][0] + (month <= 2), month
+    return nearest_year(month, today.year, today.month), month
+
+
+def parse_month(value, today=None):
+    """'2025-03' → (2025, 3), 비었으면 이번 달, 형식이 틀리면 None"""
+    if not value:
+        today = today or date.today()
+        return today.year, today.month
+    m = MONTH_PARAM.match(str(value).strip())
+    if not m or not 1 <= int(m.group(2)) <= 12:
+        return None
+    return int(m.group(1)), int(m.group(2))
+
+
+def menu_entries(menu, year, month):
+    """{'날짜': 메뉴} → [(연, 월, 일, 표시용 날짜, 메뉴, 비교 키)] (날짜를 못 읽거나 메뉴가 빈 날 제외)
+
+    월이 없는 날짜는 앞뒤 날짜에서 채우고, 달력 앞뒤로 걸친 지난달/다음 달 날짜는 표의 (연, 월)에
+    가장 가까운 해로 본다 (12월 표에 1월 초가 있으면 다음 해).
+    """
+    dates = resolve_dates([list(menu)], ref=(year, month))[0]
+    entries = []
+    for label, value in menu.items():
+        key = dates.get(label)
+        items = normalize_items(menu_text(value))
+        if not key or not items or label == "error":
+            continue
+        entry_year, entry_month, day = key
+        entries.append((entry_year, entry_month, day, str(label), value, json.dumps(items, ensure_ascii=False)))
+    return entries
+
+
+class SchoolMenuStore:
+    """학교 + 날짜별 업로드 기록 (한 업로드 = 이미지 SHA-256 하나, 날짜마다 한 표)"""
+
+    def __init__(self, path=":memory:", ttl_days=SCHOOL_MENU_TTL_DAYS):
+        self.ttl = ttl_days * 24 * 3600
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            # 기본 키가 (학교, 날짜) 조회 인덱스를 겸함
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS school_menus ("
+                "school TEXT, year INTEGER, month INTEGER, day INTEGER, source TEXT, "
+                "label TEXT, menu TEXT, menu_key TEXT, created REAL, "
+                "PRIMARY KEY (school, year, month, day, source))"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_school_menus_date ON school_menus (year, month, day)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_school_menus_created ON school_menus (created)")
+
+    @classmethod
+    def from_env(cls):
+        try:
+            return cls(SCHOOL_MENU_DB)
+        except Exception as e:
+            print(f"School Menu DB Error: {e}")
+            return cls()
+
+    def add(self, school, year, month, menu, source):
+        """분석 결과 하나를 저장 → 저장한 날짜 수"""
+        entries = menu_entries(menu, year, month)
+        if not entries:
+            return 0
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO school_menus (school, year, month, day, source, label, menu, menu_key, created) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(school, y, m, d, source, label, json.dumps(value, ensure_ascii=False), key, now)
+                 for y, m, d, label, value, key in entries],
+            )
+            self._conn.execute("DELETE FROM school_menus WHERE created < ?", (now - self.ttl,))
+        return len(entries)
+
+    def month_menu(self, school, year, month):
+        """학교의 한 달 식단 → {"school", "month", "menu": {날짜: 메뉴}, "days": [...], "updated"} (없으면 None)
+
+        날짜마다 같은 메뉴(정규화한 항목 집합)를 올린 업로드 수가 가장 많은 메뉴, 같으면 최근 메뉴.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT day, label, menu, COUNT(*) AS votes, MAX(created) AS latest FROM school_menus "
+                "WHERE school = ? AND year = ? AND month = ? GROUP BY day, menu_key "
+                "ORDER BY day, votes DESC, latest DESC",
+                (school, year, month),
+            ).fetchall()
+        if not rows:
+            return None
+        menu, days, totals = {}, [], Counter()
+        for day, _, _, votes, _ in rows:
+            totals[day] += votes
+        for day, label, value, votes, latest in rows:
+            if days and days[-1]["day"] == day:
+                continue
+            menu[label] = json.loads(value)
+            days.append({"day": day, "date": label, "votes": votes, "uploads": totals[day], "updated": latest})
+        return {
+            "school": school,
+            "month": f"{year:04d}-{month:02d}",
+            "menu": menu,
+            "days": days,
+            "updated": max(d["updated"] for d in days),
+        }
+
+    def schools(self, prefix="", limit=20):
+        """저장된 학교 이름 (prefix 로 시작, 이름순) — 기본 키 인덱스 범위 조회"""
+        prefix = normalize_school(prefix)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT school FROM school_menus WHERE school >= ? AND school < ? ORDER BY school LIMIT ?",
+                (prefix, prefix + "\uffff", limit),
+            ).fetchall()
+        return [r[0] for r in rows]
+
+
+def remember_menu(store, text, menu, source, today=None):
+    """분석에 성공한 급식표를 학교 식단 저장소에 기록 → 학교 이름 (학교를 못 찾았거나 실패하면 None)"""
+    school = detect_school(text)
+    if not school or not source or not isinstance(menu, dict):
+        return None
+    try:
+        year, month = detect_month(text, today)
+        return school if store.add(school, year, month, menu, source) else None
+    except Exception as e:
+        print(f"School Menu DB Error: {e}")
+        return None
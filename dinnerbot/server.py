@@ -0,0 +1,449 @@
+"""Flask 서버 (로컬 app.py 와 Vercel api/index.py 가 함께 쓰는 본체)
+
+OpenAI / Gemini / Vision SDK 는 무거우므로 처음 쓸 때 불러온다. 그래서 '/' 와
+'/api/config' 만 받는 새 인스턴스는 SDK 를 import 하지 않고 바로 응답한다.
+WARMUP_ON_START=1 이면 시작하자마자 백그라운드에서 SDK 를 미리 불러 둔다.
+"""
+import os
+import time
+import threading
+
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context
+from flask_cors import CORS
+from dotenv import load_dotenv
+
+from dinnerbot import STARTED_AT, metrics
+from dinnerbot.cache import AnalysisCache, RecommendCache
+from dinnerbot.clients import ClientRegistry, get_vision_client, warm_up
+from dinnerbot.layout import ocr_words
+from dinnerbot.menu import NO_KEY_ERROR, MENU_MAX_TOKENS, MENU_CONTINUE_ATTEMPTS
+from dinnerbot.jsonrepair import join_continuation
+from dinnerbot.batch import BATCH_MAX_IMAGES, ocr_pool, batch_image_key, split_pages
+from dinnerbot.uploads import MAX_CONTENT_LENGTH, MAX_BATCH_CONTENT_LENGTH, TOO_LARGE_ERROR, ImageTooLarge, UploadError, is_sha256, read_image, read_images
+from dinnerbot.recommend import SYSTEM_PROMPT
+from dinnerbot.scheduler import scheduler
+from dinnerbot.sessions import SessionStore, Prefetcher, session_key
+from dinnerbot.jobs import JobQueue, JobQueueFull, QUEUE_FULL_ERROR, NOT_FOUND_ERROR, lookup_analysis, wants_job
+from dinnerbot.plan import NO_DAYS_ERROR, plan_pool, plan_days, chunk_days, build_plan_prompt
+from dinnerbot.schools import NOT_FOUND_ERROR as NO_SCHOOL_MENU_ERROR, BAD_QUERY_ERROR, SchoolMenuStore, normalize_school, parse_month
+from dinnerbot.streaming import stream_text, recommend_events, sse
+from dinnerbot.pipeline import (Recommendation, server_config, request_client, meta_headers, chat_request, reply_text, observe_prompt,
+                                fingerprint, prepare_image, cached_menu, cached_ocr, local_menu, ai_menu_request, continuation_for,
+                                parsed_menu, menu_failed, save_menu, batch_requests, finish_batch, recommend_prompt, parsed_recommendation,
+                                planning_hints, parsed_plan, offline_plan, plan_result)
+
+# 환경 변수 로드
+load_dotenv()
+
+template_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'templates'))
+app = Flask(__name__, template_folder=template_dir)
+CORS(app)
+# 요청 본문 최대 크기 (이미지 한 장 기준): 본문을 버퍼링하기 전에 413 으로 거절
+app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
+
+# 급식표 분석 결과 캐시 (메모리 LRU + 선택적 SQLite)
+analysis_cache = AnalysisCache.from_env()
+# 같은 점심/재료 조합의 저녁 추천 결과 캐시
+recommend_cache = RecommendCache.from_env()
+# (provider, 키)별로 재사용하는 AI 클라이언트 풀
+client_registry = ClientRegistry.from_env()
+# '다른 메뉴' 추천 세션 (이미 추천한 메뉴 + 미리 만든 다음 추천)
+recommend_sessions = SessionStore.from_env()
+prefetcher = Prefetcher()
+# ?mode=job 분석 요청을 실행하는 백그라운드 작업 큐
+job_queue = JobQueue.from_env()
+# 학교별 월간 식단 (같은 학교 식단표는 이미지 없이 불러오기)
+school_menus = SchoolMenuStore.from_env()
+
+# 요청 구성, 응답 해석, 단계 판정은 ASGI 모드(dinnerbot.aio)와 함께 dinnerbot.pipeline 에 있고
+# 여기서는 동기 SDK 호출, OCR, 캐시 조회와 Flask 응답만 감싼다.
+
+def get_client(api_key=None):
+    """API 클라이언트 생성 (OpenAI sk- 또는 Google AIza- 지원)"""
+    return request_client(client_registry, api_key)
+
+def complete(ai_client, prompt, background=False, **options):
+    """AI 응답 텍스트 한 번 (options: pipeline.chat_request 인자, background: 선생성)"""
+    observe_prompt(prompt)
+
+    def call(client, model):
+        request = chat_request(ai_client["type"], model, prompt, **options)
+        if ai_client["type"] == "openai":
+            return reply_text("openai", model, client.chat.completions.create(**request))
+        return reply_text("gemini", model, client.generate_content(**request))
+
+    # 429 면 재시도 / 다음 모델로 대체 (dinnerbot.scheduler)
+    return scheduler.call(ai_client, call, background)
+
+def extract_menu_google_vision(content):
+    """Google Cloud Vision OCR (구글 프로젝트 ID 기반) → {"text": 전체 텍스트, "words": 단어별 좌표}"""
+    started = time.perf_counter()
+    try:
+        with metrics.stage("ocr"):
+            from google.cloud import vision  # 무거운 SDK 는 OCR 을 처음 할 때 불러온다
+
+            image = vision.Image(content=content)
+            client = get_vision_client()
+            response = client.text_detection(image=image)
+            texts = response.text_annotations
+            result = {"text": texts[0].description if texts else "", "words": ocr_words(texts[1:])}
+        metrics.observe_call("vision", "text_detection", "ok", time.perf_counter() - started)
+        return result
+    except Exception as e:
+        metrics.observe_call("vision", "text_detection", "error", time.perf_counter() - started)
+        print(f"Google Vision Error: {e}")
+        return None
+
+def ocr_image(image_key, image):
+    """OCR 결과 (캐시 우선)"""
+    ocr = cached_ocr(analysis_cache, image_key)
+    if ocr is None:
+        ocr = extract_menu_google_vision(image.data)
+        if ocr is not None:
+            analysis_cache.put_ocr(image_key, ocr)
+    return ocr
+
+def structure_menu(ai_client, prompt, image=None):
+    """AI 로 날짜별 메뉴 정리 (image 가 있으면 이미지 직접 판독, 실패하면 오류 dict)
+
+    max_tokens 에 걸려 JSON 이 잘리면 처음부터 다시 받지 않고 나머지만 이어서 요청한다.
+    """
+    try:
+        with metrics.stage("llm"):
+            raw = complete(ai_client, prompt, image=image, max_tokens=MENU_MAX_TOKENS)
+            for _ in range(MENU_CONTINUE_ATTEMPTS):
+                more = continuation_for(prompt, raw)
+                if more is None:
+                    break
+                # 이어 쓰기 요청의 답은 JSON 조각이므로 JSON 모드를 끈다
+                raw = join_continuation(raw, complete(ai_client, more, image=image, json_mode=False, max_tokens=MENU_MAX_TOKENS))
+        return parsed_menu(raw)
+    except Exception as e:
+        return menu_failed(e)
+
+def extract_menu_from_image(ai_client, content, meta=None):
+    """이미지 분석 (Google OCR + AI 정리)
+
+    meta 에는 응답 헤더로 알려줄 부가 정보(bytes_saved 등)를 채운다.
+    """
+    meta = {} if meta is None else meta
+    # 0. 같은 이미지(SHA-256 일치)는 캐시에서 바로 응답
+    image_key = fingerprint(analysis_cache, content)
+    cached = cached_menu(analysis_cache, image_key, meta)
+    if cached is not None:
+        return cached
+
+    image = prepare_image(content)
+    meta["bytes_saved"] = image.saved
+    ocr = ocr_image(image_key, image)
+
+    # 1. 급식표 판별 → OCR 텍스트 캐시 → 표 파서 (AI 호출 없음)
+    result, path = local_menu(analysis_cache, ocr, meta)
+    # 2. AI 정리 (OCR 텍스트가 없으면 이미지 직접 판독)
+    if result is None:
+        prompt, vision_image, path = ai_menu_request(ocr, image)
+        result = structure_menu(ai_client, prompt, vision_image) if ai_client else dict(NO_KEY_ERROR)
+    return save_menu(analysis_cache, school_menus, image_key, result, ocr, path, meta)
+
+def extract_menus_batch(ai_client, contents, meta=None):
+    """여러 장(여러 페이지/여러 달) 분석: OCR 병렬 → 텍스트는 한 번의 AI 호출로 정리 → 날짜별 병합"""
+    meta = {} if meta is None else meta
+    image_keys = list(ocr_pool.map(metrics.in_request(lambda content: fingerprint(analysis_cache, content)), contents))
+    batch_key = batch_image_key(image_keys)
+    cached = cached_menu(analysis_cache, batch_key, meta)
+    if cached is not None:
+        return cached
+
+    images = list(ocr_pool.map(metrics.in_request(prepare_image), contents))
+    meta["bytes_saved"] = sum(image.saved for image in images)
+    ocrs = list(ocr_pool.map(metrics.in_request(ocr_image), image_keys, images))
+    menus, text_pages, image_pages, rejected, paths = split_pages(analysis_cache, image_keys, images, ocrs)
+    meta["path"] = "+".join(sorted(set(paths)))
+
+    if (text_pages or image_pages) and not ai_client:
+        return dict(NO_KEY_ERROR)
+    ai_menus = list(ocr_pool.map(metrics.in_request(lambda call: structure_menu(ai_client, *call)), batch_requests(text_pages, image_pages)))
+    return finish_batch(analysis_cache, school_menus, batch_key, menus, ai_menus, rejected, ocrs, meta)
+
+def run_analysis_job(job):
+    """작업 큐에서 실행하는 분석 → (결과, 메타). 재시작 후 이어 하는 작업은 API 키가 없어 서버 키를 씀"""
+    meta = {}
+    ai_client = get_client(job.api_key)
+    if job.kind == "analyze_batch":
+        return extract_menus_batch(ai_client, job.images, meta), meta
+    return extract_menu_from_image(ai_client, job.images[0], meta), meta
+
+JOB_HANDLERS = {"analyze": run_analysis_job, "analyze_batch": run_analysis_job}
+job_queue.resume(JOB_HANDLERS)
+
+def job_response(kind, contents, api_key):
+    """작업 등록 → 202 + 작업 상태 (같은 이미지로 진행 중인 작업이 있으면 그 작업)"""
+    try:
+        job, coalesced = job_queue.submit(kind, contents, api_key, JOB_HANDLERS[kind])
+    except JobQueueFull:
+        return jsonify(QUEUE_FULL_ERROR), 503, {'Retry-After': '5'}
+    data = job.to_dict()
+    data["coalesced"] = coalesced
+    return jsonify(data), 202, {'Location': f"/api/jobs/{job.id}"}
+
+# 패키지 import 부터 첫 응답까지 걸린 시간 (콜드 스타트 측정용, 첫 응답 헤더로만 보냄)
+IMPORT_MS = round((time.perf_counter() - STARTED_AT) * 1000, 1)
+_first_response = True
+
+@app.after_request
+def add_cold_start_header(response):
+    global _first_response
+    if _first_response:
+        _first_response = False
+        response.headers['X-Cold-Start-Ms'] = str(round((time.perf_counter() - STARTED_AT) * 1000, 1))
+    return response
+
+@app.before_request
+def start_timing():
+    metrics.begin_request()
+
+@app.after_request
+def add_server_timing(response):
+    """단계별 소요 시간 → Server-Timing 헤더 (스트리밍 응답은 본문 전 단계까지만)"""
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    timing = metrics.finish_request(endpoint, response.status_code, response.content_length)
+    if timing:
+        response.headers['Server-Timing'] = timing
+    return response
+
+if os.getenv("WARMUP_ON_START") == "1":
+    threading.Thread(target=warm_up, daemon=True).start()
+
+@app.route('/api/warmup')
+def api_warmup():
+    """SDK import / Vision 채널 준비 (배포 직후나 주기적인 ping 으로 호출)"""
+    return jsonify(warm_up())
+
+@app.route('/metrics')
+def api_metrics():
+    """Prometheus 형식 지표 (METRICS_TOKEN 을 설정하면 Bearer 토큰 필요)"""
+    if not metrics.authorized(request.headers.get('Authorization')):
+        return Response("unauthorized\n", status=401, content_type="text/plain")
+    return Response(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
+
+@app.route('/')
+def home():
+    return render_template('index.html')
+
+@app.route('/api/config')
+def get_config():
+    return jsonify(server_config())
+
+@app.errorhandler(413)
+def upload_too_large(e):
+    return jsonify(TOO_LARGE_ERROR), 413
+
+@app.route('/api/analyze', methods=['POST'])
+def api_analyze():
+    """급식표 분석 (multipart/form-data · application/octet-stream · 기존 JSON base64)"""
+    try:
+        with metrics.stage("decode"):
+            content, api_key = read_image(request)
+    except ImageTooLarge:
+        return jsonify(TOO_LARGE_ERROR), 413
+    except UploadError as e:
+        return jsonify({"error": str(e)})
+    if wants_job(request):
+        return job_response("analyze", [content], api_key)
+    ai_client = get_client(api_key)
+    meta = {}
+    return jsonify(extract_menu_from_image(ai_client, content, meta)), meta_headers(meta)
+
+@app.route('/api/analyze/batch', methods=['POST'])
+def api_analyze_batch():
+    """여러 장의 급식표를 한 번에 분석해 하나의 날짜별 달력으로 합침"""
+    # 이 라우트만 여러 장 크기까지 받음 (본문을 읽기 전에 정해야 함)
+    request.max_content_length = MAX_BATCH_CONTENT_LENGTH
+    try:
+        with metrics.stage("decode"):
+            contents, api_key = read_images(request)
+    except ImageTooLarge:
+        return jsonify(TOO_LARGE_ERROR), 413
+    except UploadError as e:
+        return jsonify({"error": str(e)})
+    if not contents:
+        return jsonify({"error": "분석할 이미지가 없습니다."})
+    if len(contents) > BATCH_MAX_IMAGES:
+        return jsonify({"error": f"한 번에 최대 {BATCH_MAX_IMAGES}장까지 분석할 수 있습니다."})
+    if wants_job(request):
+        return job_response("analyze_batch", contents, api_key)
+    meta = {}
+    return jsonify(extract_menus_batch(get_client(api_key), contents, meta)), meta_headers(meta)
+
+@app.route('/api/analyze/lookup', methods=['POST'])
+def api_analyze_lookup():
+    """업로드 전 해시 조회: 같은 이미지의 분석 결과가 이미 있으면 이미지를 올리지 않고 바로 받음"""
+    data = request.get_json(silent=True) or {}
+    hashes = [str(h).lower() for h in data.get("hashes") or []]
+    if not hashes or len(hashes) > BATCH_MAX_IMAGES or not all(is_sha256(h) for h in hashes):
+        return jsonify({"error": "이미지 해시(SHA-256) 형식이 올바르지 않습니다."}), 400
+    return jsonify(lookup_analysis(analysis_cache, job_queue, hashes, data.get("apiKey")))
+
+@app.route('/api/schools')
+def api_schools():
+    """식단이 저장된 학교 이름 검색 (?q=앞부분)"""
+    return jsonify({"schools": school_menus.schools(request.args.get("q", ""))})
+
+@app.route('/api/schools/menu')
+def api_school_menu():
+    """학교의 한 달 식단 (?school=…&month=YYYY-MM, month 생략 시 이번 달) — 이미지/OCR/AI 호출 없음"""
+    school = normalize_school(request.args.get("school"))
+    month = parse_month(request.args.get("month"))
+    if not school or month is None:
+        return jsonify(BAD_QUERY_ERROR), 400
+    result = school_menus.month_menu(school, *month)
+    metrics.CACHE_LOOKUPS.inc(cache="school", result="miss" if result is None else "hit")
+    if result is None:
+        return jsonify(NO_SCHOOL_MENU_ERROR), 404
+    return jsonify(result)
+
+@app.route('/api/jobs/<job_id>')
+def api_job(job_id):
+    """작업 상태 (status: queued / running / done / error, stage: 지금 실행 중인 단계, 끝나면 result)"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify(NOT_FOUND_ERROR), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/jobs/<job_id>/events')
+def api_job_events(job_id):
+    """작업 상태 구독 (SSE: 단계가 바뀔 때마다 progress, 끝나면 done)"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify(NOT_FOUND_ERROR), 404
+
+    def generate():
+        version = None
+        while True:
+            if job.version != version:
+                version = job.version
+                yield sse("done" if job.finished else "progress", job.to_dict())
+                if job.finished:
+                    return
+            elif job.wait(version, 15) == version:
+                yield ": keep-alive\n\n"
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def generate_recommendation(ai_client, lunch, ingredients, clickCount=0, exclude=(), background=False):
+    """AI 저녁 추천 한 번 → (추천, 잘리지 않았는지) (실패하면 예외). exclude: 세션에서 이미 추천한 메뉴명"""
+    prompt = recommend_prompt(lunch, ingredients, clickCount, exclude)
+    with metrics.stage("llm"):
+        raw = complete(ai_client, prompt, background, system=SYSTEM_PROMPT)
+    return parsed_recommendation(raw)
+
+def recommend_session(data, ai_client, lunch, ingredients):
+    """sessionId 를 보낸 요청의 추천 세션 (없으면 None → clickCount 로만 동작)"""
+    provider = ai_client["type"] if ai_client else "offline"
+    return recommend_sessions.get(session_key(data.get('sessionId'), provider, lunch, ingredients))
+
+def schedule_prefetch(rec):
+    """다음 '다른 메뉴' 추천을 백그라운드에서 미리 생성 (잘린 응답은 대기열에 넣지 않음)"""
+    def generate(exclude):
+        result, complete = generate_recommendation(rec.ai_client, rec.lunch, rec.ingredients, rec.clickCount, exclude, True)
+        return result if complete else None
+
+    prefetcher.schedule(rec.session, generate)
+
+def ready_recommendation(rec):
+    """AI 호출 없이 응답할 수 있는 추천 (미리 만든 추천 → 캐시, 없으면 None)"""
+    if rec.session is not None:
+        prefetched = prefetcher.next_ready(rec.session)
+        if prefetched is not None:
+            return rec.served(prefetched, "prefetch")
+    cached = recommend_cache.get(rec.cache_key)
+    if cached is not None:
+        return rec.served(cached, "cache")
+    return None
+
+def request_recommendation(data, meta=None):
+    """요청 본문 → 추천 한 건 (세션이 있으면 이미 추천한 메뉴는 빼고 미리 만든 추천부터 씀)"""
+    lunch = data.get('lunch', '')
+    ingredients = data.get('ingredients', '')
+    ai_client = get_client(data.get('apiKey'))
+    session = recommend_session(data, ai_client, lunch, ingredients)
+    return Recommendation(ai_client, lunch, ingredients, data.get('clickCount', 0), session, meta, schedule_prefetch)
+
+@app.route('/api/recommend', methods=['POST'])
+def api_recommend():
+    meta = {}
+    rec = request_recommendation(request.json, meta)
+    if not rec.ai_client:
+        return jsonify(rec.no_key()), meta_headers(meta)
+    # 두 번째 이후 클릭: 미리 만들어 둔 추천으로 바로 응답하고 그다음 것을 다시 준비
+    result = ready_recommendation(rec)
+    if result is None:
+        try:
+            result, complete = generate_recommendation(rec.ai_client, rec.lunch, rec.ingredients, rec.clickCount, rec.exclude)
+            if complete:
+                recommend_cache.put(rec.cache_key, result)
+            result = rec.generated(result, complete)
+        except Exception as e:
+            result = rec.failed(e)
+    return jsonify(result), meta_headers(meta)
+
+@app.route('/api/recommend/stream', methods=['POST'])
+def api_recommend_stream():
+    """저녁 메뉴 추천 (SSE: 메뉴명 → 재료 → 단계 순으로 완성되는 대로 전송)"""
+    rec = request_recommendation(request.json)
+
+    def on_result(result):
+        recommend_cache.put(rec.cache_key, result)
+        rec.served(result, "ai")
+
+    def generate():
+        if not rec.ai_client:
+            yield sse("done", rec.no_key())
+            return
+        ready = ready_recommendation(rec)
+        if ready is not None:
+            yield sse("done", ready)
+            return
+        try:
+            yield from recommend_events(stream_text(rec.ai_client, rec.prompt()), on_result=on_result)
+        except Exception as e:
+            yield sse("done", rec.failed(e, "AI Recommendation Stream Error"))
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def generate_plan_chunk(ai_client, days, ingredients, hints):
+    """식단 묶음 하나를 AI 한 번으로 → ({날짜: 레시피}, 조언 메시지) (실패하면 예외 객체)"""
+    try:
+        with metrics.stage("llm"):
+            raw = complete(ai_client, build_plan_prompt(days, ingredients, hints), system=SYSTEM_PROMPT)
+        return parsed_plan(raw, days)
+    except Exception as e:
+        return e
+
+@app.route('/api/plan', methods=['POST'])
+def api_plan():
+    """급식표 전체(menuData)에 맞춘 날짜별 저녁 식단 + 장보기 목록
+
+    PLAN_CHUNK_DAYS 일씩 묶어 AI 를 한 번씩만 부르고, 묶음이 여러 개면 동시에 부른다.
+    """
+    data = request.json or {}
+    ingredients = data.get('ingredients', '')
+    days, skipped = plan_days(data.get('menuData'))
+    if not days:
+        return jsonify(NO_DAYS_ERROR)
+    ai_client = get_client(data.get('apiKey'))
+    meta = {}
+    if not ai_client:
+        return jsonify(offline_plan(days, ingredients, meta, skipped)), meta_headers(meta)
+
+    hints = planning_hints(days, ingredients)
+    chunks = chunk_days(days)
+    meta["chunks"] = len(chunks)
+    with metrics.stage("plan"):
+        if len(chunks) == 1:
+            results = [generate_plan_chunk(ai_client, chunks[0], ingredients, hints)]
+        else:
+            results = list(plan_pool.map(metrics.in_request(lambda chunk: generate_plan_chunk(ai_client, chunk, ingredients, hints)), chunks))
+    return jsonify(plan_result(days, results, ingredients, skipped)), meta_headers(meta)
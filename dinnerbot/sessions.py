@@ -0,0 +1,265 @@
+"""저녁 추천 세션 ('다른 메뉴' 를 누를 때 이미 보여 준 메뉴는 빼고, 다음 추천은 미리 만들어 둠)
+
+세션은 (브라우저가 보낸 sessionId, provider, 정규화한 점심 메뉴, 냉장고 재료)마다 하나이고,
+이미 보여 준 메뉴명과 응답 뒤에 백그라운드에서 미리 만든 다음 추천을 PREFETCH_DEPTH 개까지
+보관한다 (미리 만든 추천의 메뉴명은 실제로 응답할 때 이력에 남김). 첫 추천만 보고 떠나는
+사용자에게 AI 호출을 쓰지 않도록 '다른 메뉴' 를 PREFETCH_AFTER_CLICKS 번 누른 뒤부터 미리
+만들고, 선생성 호출은 스케줄러의 백그라운드 우선순위로 보낸다 (기다리거나 재시도하지 않고
+사용자 요청 몫의 한도를 남김).
+세션 수(LRU)·유효 시간·동시에 도는 선생성 작업 수에 모두 상한이 있어서, 상한을 넘으면
+선생성을 건너뛰고 다음 클릭 때 바로 생성한다.
+"""
+import os
+import json
+import time
+import asyncio
+import hashlib
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from dinnerbot import metrics
+from dinnerbot.cache import LRUCache
+from dinnerbot.recommend import normalize_items
+from dinnerbot.scheduler import QuotaError
+
+RECOMMEND_SESSIONS = int(os.getenv("RECOMMEND_SESSIONS", "1000"))
+RECOMMEND_SESSION_TTL = int(os.getenv("RECOMMEND_SESSION_TTL", "3600"))
+# 세션마다 미리 만들어 둘 추천 수 (0 이면 선생성 안 함) / 프로세스 전체 동시 선생성 작업 수
+PREFETCH_DEPTH = int(os.getenv("PREFETCH_DEPTH", "1"))
+PREFETCH_WORKERS = int(os.getenv("PREFETCH_WORKERS", "4"))
+PREFETCH_MAX_PENDING = int(os.getenv("PREFETCH_MAX_PENDING", "16"))
+# 선생성이 진행 중이면 새로 만들지 않고 이 시간(초)까지 그 결과를 기다림
+PREFETCH_WAIT = float(os.getenv("PREFETCH_WAIT", "20"))
+# Flask 모드는 기다리는 동안 워커 스레드를 잡고 있으므로 짧게 기다리고 바로 생성으로 넘어감
+PREFETCH_SYNC_WAIT = float(os.getenv("PREFETCH_SYNC_WAIT", "1"))
+# '다른 메뉴' 를 이 횟수 이상 누른 요청 뒤에만 선생성 (0 이면 첫 추천 뒤부터)
+PREFETCH_AFTER_CLICKS = int(os.getenv("PREFETCH_AFTER_CLICKS", "1"))
+# 세션마다 기억하는 메뉴명 수 (프롬프트가 한없이 길어지지 않도록)
+MAX_SEEN = 30
+
+
+def session_key(session_id, provider, lunch, ingredients):
+    """세션 키 (sessionId 가 없으면 None → 세션 없이 clickCount 로만 동작)"""
+    if not session_id:
+        return None
+    raw = json.dumps([str(session_id)[:64], provider, normalize_items(lunch), normalize_items(ingredients)],
+                     ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def recipe_names(result):
+    recipes = result.get("recipes") if isinstance(result, dict) else None
+    return [r["name"] for r in recipes or [] if isinstance(r, dict) and r.get("name")]
+
+
+class RecommendSession:
+    """세션 하나의 추천 이력 + 미리 만든 추천 대기열"""
+
+    def __init__(self):
+        self.seen = []          # 이미 응답한 메뉴명
+        self.ready = deque()    # 미리 만든 추천 (먼저 만든 것부터)
+        self.filling = False    # 선생성 작업이 도는 중인지
+        self.exhausted = False  # AI 가 더 추천할 메뉴가 없다고 답했는지
+        self.cond = threading.Condition()
+        self.event = None       # 비동기 모드에서 대기열 변화를 알리는 asyncio.Event
+
+    def exclude(self):
+        """다음 추천에서 뺄 메뉴명 (이미 응답한 것 + 대기열에 있는 것)"""
+        with self.cond:
+            names = list(self.seen)
+            for result in self.ready:
+                names += [name for name in recipe_names(result) if name not in names]
+            return tuple(names)
+
+    def remember(self, result):
+        """응답한 추천의 메뉴명 기록. 레시피가 비어 있으면 더 만들지 않음"""
+        names = recipe_names(result)
+        with self.cond:
+            for name in names:
+                if name not in self.seen:
+                    self.seen.append(name)
+            del self.seen[:-MAX_SEEN]
+            if not names:
+                self.exhausted = True
+
+    def needs_more(self):
+        return not self.exhausted and len(self.ready) < PREFETCH_DEPTH
+
+    def take(self):
+        with self.cond:
+            return self.ready.popleft() if self.ready else None
+
+    def push(self, result):
+        """미리 만든 추천을 대기열에 (메뉴명은 응답할 때 remember 로 기록)"""
+        with self.cond:
+            self.ready.append(result)
+            if not recipe_names(result):
+                self.exhausted = True
+            self.cond.notify_all()
+        if self.event is not None:
+            self.event.set()
+
+
+class SessionStore:
+    """세션 LRU (개수 / 마지막 사용 후 유효 시간 상한)"""
+
+    def __init__(self, max_sessions=RECOMMEND_SESSIONS, ttl=RECOMMEND_SESSION_TTL):
+        self._sessions = LRUCache(max_items=max_sessions, max_bytes=max_sessions, ttl=ttl)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(RECOMMEND_SESSIONS, RECOMMEND_SESSION_TTL)
+
+    def get(self, key):
+        """키의 세션 (없으면 새로 만듦, 키가 None 이면 None)"""
+        if key is None:
+            return None
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = RecommendSession()
+            self._sessions.set(key, session)  # 쓸 때마다 유효 시간 연장
+            return session
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+def wants_prefetch(clickCount):
+    """이번 요청 뒤에 다음 추천을 미리 만들지 ('다른 메뉴' 를 PREFETCH_AFTER_CLICKS 번 이상 눌렀을 때)"""
+    try:
+        return int(clickCount or 0) >= PREFETCH_AFTER_CLICKS
+    except (TypeError, ValueError):
+        return False
+
+
+class Prefetcher:
+    """Flask 용 선생성기: 응답을 보낸 뒤 스레드 풀에서 다음 추천을 만들어 세션 대기열에 넣는다"""
+
+    def __init__(self, workers=PREFETCH_WORKERS, max_pending=PREFETCH_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def schedule(self, session, generate):
+        """generate(exclude) → 추천 dict (잘린 응답이면 None, 실패 시 예외). 대기열이 PREFETCH_DEPTH 만큼 찰 때까지 하나씩 생성"""
+        with session.cond:
+            if session.filling or not session.needs_more():
+                return
+            session.filling = True
+        with self._lock:
+            if self.pending >= self.max_pending:
+                metrics.PREFETCH.inc(result="dropped")
+                with session.cond:
+                    session.filling = False
+                return
+            self.pending += 1
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="prefetch")
+        self._pool.submit(self._fill, session, generate)
+
+    def _fill(self, session, generate):
+        try:
+            while session.needs_more():
+                result = generate(session.exclude())
+                if result is None:
+                    # 잘린 응답은 보여 주지 않고 다음 클릭 때 새로 받음
+                    metrics.PREFETCH.inc(result="incomplete")
+                    break
+                session.push(result)
+                metrics.PREFETCH.inc(result="generated")
+        except QuotaError:
+            # 사용자 요청에 쓸 한도를 남기려고 스케줄러가 미룬 경우 (다음 클릭 때 바로 생성)
+            metrics.PREFETCH.inc(result="throttled")
+        except Exception as e:
+            metrics.PREFETCH.inc(result="error")
+            print(f"Prefetch Error: {e}")
+        finally:
+            with session.cond:
+                session.filling = False
+                session.cond.notify_all()
+            with self._lock:
+                self.pending -= 1
+
+    def next_ready(self, session, timeout=PREFETCH_SYNC_WAIT):
+        """미리 만든 추천 (진행 중이면 timeout 까지 기다림, 없으면 None)"""
+        deadline = time.monotonic() + timeout
+        with session.cond:
+            waited = False
+            while not session.ready and session.filling:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                waited = True
+                session.cond.wait(remaining)
+            if session.ready:
+                metrics.PREFETCH.inc(result="wait_hit" if waited else "hit")
+                return session.ready.popleft()
+        metrics.PREFETCH.inc(result="miss")
+        return None
+
+
+class AsyncPrefetcher:
+    """ASGI 용 선생성기: 같은 이벤트 루프의 태스크로 다음 추천을 만든다"""
+
+    def __init__(self, max_pending=PREFETCH_MAX_PENDING):
+        self.max_pending = max_pending
+        self.pending = 0
+        self._tasks = set()
+
+    def schedule(self, session, generate):
+        """await generate(exclude) → 추천 dict (잘린 응답이면 None)"""
+        if session.filling or not session.needs_more():
+            return
+        if self.pending >= self.max_pending:
+            metrics.PREFETCH.inc(result="dropped")
+            return
+        session.filling = True
+        self.pending += 1
+        task = asyncio.ensure_future(self._fill(session, generate))
+        self._tasks.add(task)  # 태스크가 GC 되지 않도록 참조 유지
+        task.add_done_callback(self._tasks.discard)
+
+    async def _fill(self, session, generate):
+        try:
+            while session.needs_more():
+                result = await generate(session.exclude())
+                if result is None:
+                    metrics.PREFETCH.inc(result="incomplete")
+                    break
+                session.push(result)
+                metrics.PREFETCH.inc(result="generated")
+        except QuotaError:
+            # 사용자 요청에 쓸 한도를 남기려고 스케줄러가 미룬 경우 (다음 클릭 때 바로 생성)
+            metrics.PREFETCH.inc(result="throttled")
+        except Exception as e:
+            metrics.PREFETCH.inc(result="error")
+            print(f"Prefetch Error: {e}")
+        finally:
+            session.filling = False
+            self.pending -= 1
+            if session.event is not None:
+                session.event.set()
+
+    async def next_ready(self, session, timeout=PREFETCH_WAIT):
+        deadline = time.monotonic() + timeout
+        waited = False
+        while not session.ready and session.filling:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if session.event is None:
+                session.event = asyncio.Event()
+            session.event.clear()
+            waited = True
+            try:
+                await asyncio.wait_for(session.event.wait(), remaining)
+            except asyncio.TimeoutError:
+                break
+        result = session.take()
+        metrics.PREFETCH.inc(result=("wait_hit" if waited else "hit") if result is not None else "miss")
+        return result
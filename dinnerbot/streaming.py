@@ -0,0 +1,110 @@
+import json
+
+from dinnerbot.jsonrepair import PartialJSONParser, extract_json
+from dinnerbot.scheduler import scheduler
+from dinnerbot.recommend import SYSTEM_PROMPT, normalize_recommendation
+from dinnerbot.pipeline import chat_request, chunk_text, stream_finished
+
+
+def sse(event, data):
+    """Server-Sent Events 한 건"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _chunks(provider, model, stream):
+    last = None
+    for chunk in stream:
+        last = chunk
+        text = chunk_text(provider, model, chunk)
+        if text:
+            yield text
+    stream_finished(provider, model, last)
+
+
+def stream_text(ai_client, prompt):
+    """OpenAI / Gemini 스트리밍 API로 응답 텍스트 조각을 차례로 내보냄"""
+    provider = ai_client["type"]
+
+    def open_stream(client, model):
+        request = chat_request(provider, model, prompt, system=SYSTEM_PROMPT, stream=True)
+        if provider == "openai":
+            stream = client.chat.completions.create(**request)
+        else:  # Gemini
+            stream = client.generate_content(**request)
+        chunks = _chunks(provider, model, stream)
+        # 429 가 첫 조각을 받을 때 나는 경우도 있으므로 첫 조각까지 스케줄러 안에서 받는다
+        return next(chunks, None), chunks
+
+    first, chunks = scheduler.call(ai_client, open_stream)
+    if first is not None:
+        yield first
+    yield from chunks
+
+
+RECIPE_FIELDS = ["name", "desc", "time", "diff", "ingredients", "more_ingredients", "steps", "tip"]
+
+
+class RecommendEventBuilder:
+    """응답 텍스트 조각 → 완성된 필드 단위 SSE 이벤트
+
+    analysis, recipe(index/field/value), message 순으로 파싱되는 즉시 보내고
+    마지막에 전체 결과를 done 으로 보낸다. steps 는 단계가 하나 완성될 때마다 보낸다.
+    """
+
+    def __init__(self):
+        self.parser = PartialJSONParser()
+        self.result = None
+        self.complete = False  # 응답 JSON 이 잘리지 않고 끝났는지 (잘렸으면 캐시하지 않음)
+        self._sent = {}
+
+    def feed(self, chunk):
+        snapshot = self.parser.feed(chunk)
+        if not isinstance(snapshot, dict):
+            return []
+        events = []
+        for event, index, field, value in _completed_fields(snapshot):
+            if self._sent.get((index, field)) != value:
+                self._sent[(index, field)] = value
+                if event == "recipe":
+                    events.append(sse("recipe", {"index": index, "field": field, "value": value}))
+                else:
+                    events.append(sse(event, value))
+        return events
+
+    def finish(self):
+        """전체 응답을 보정/스키마 정규화해 done 이벤트로 (self.result 에도 보관)"""
+        try:
+            value, self.complete = extract_json(self.parser.buf)
+        except ValueError:
+            value, self.complete = self.parser.value, False
+        self.result = normalize_recommendation(value)
+        return sse("done", self.result)
+
+
+def recommend_events(chunks, on_result=None):
+    """on_result: 스트림이 끝나 완성된 추천 dict 를 받을 콜백 (캐시 저장용)
+
+    응답이 잘렸으면 보정한 결과를 done 으로 보내기만 하고 on_result 는 부르지 않는다.
+    """
+    builder = RecommendEventBuilder()
+    for chunk in chunks:
+        yield from builder.feed(chunk)
+    done = builder.finish()
+    if on_result and builder.complete:
+        on_result(builder.result)
+    yield done
+
+
+def _completed_fields(snapshot):
+    if isinstance(snapshot.get("analysis"), str):
+        yield "analysis", None, "analysis", snapshot["analysis"]
+    recipes = snapshot.get("recipes")
+    if isinstance(recipes, list):
+        for index, recipe in enumerate(recipes):
+            if not isinstance(recipe, dict):
+                continue
+            for field in RECIPE_FIELDS:
+                if field in recipe:
+                    yield "recipe", index, field, recipe[field]
+    if isinstance(snapshot.get("message"), str):
+        yield "message", None, "message", snapshot["message"]
@@ -0,0 +1,124 @@
+import os
+import re
+import base64
+import hashlib
+
+from dinnerbot.batch import BATCH_MAX_IMAGES
+
+# 이미지 한 장의 최대 크기
+MAX_UPLOAD_MB = float(os.getenv("MAX_UPLOAD_MB", "16"))
+MAX_IMAGE_BYTES = int(MAX_UPLOAD_MB * 1024 * 1024)
+# 요청 본문 최대 크기 (Flask/Quart 가 본문을 읽기 전에 Content-Length 로 거절):
+# 이미지 한 장을 base64(4/3 배)로 보내는 경우까지 + 폼/JSON 여유분
+MAX_CONTENT_LENGTH = int(MAX_IMAGE_BYTES * 4 / 3) + 1024 * 1024
+# 여러 장 분석(/api/analyze/batch) 요청만 BATCH_MAX_IMAGES 장까지
+MAX_BATCH_CONTENT_LENGTH = int(BATCH_MAX_IMAGES * MAX_IMAGE_BYTES * 4 / 3) + 1024 * 1024
+
+TOO_LARGE_ERROR = {"error": f"이미지가 너무 큽니다. 한 장에 {MAX_UPLOAD_MB:g}MB 이하로 올려 주세요."}
+
+
+class UploadError(ValueError):
+    """업로드된 이미지를 읽을 수 없을 때"""
+
+
+class ImageTooLarge(UploadError):
+    """이미지 한 장이 MAX_UPLOAD_MB 를 넘을 때 (413)"""
+
+    def __init__(self):
+        super().__init__(TOO_LARGE_ERROR["error"])
+
+
+SHA256_HEX = re.compile(r"^[0-9a-f]{64}$")
+
+
+def is_sha256(value):
+    return isinstance(value, str) and bool(SHA256_HEX.match(value))
+
+
+def verify_sha256(content, expected):
+    """브라우저가 압축 후 계산해 보낸 SHA-256 과 받은 바이트가 같은지 확인 (안 보냈으면 통과)"""
+    if not expected:
+        return content
+    if hashlib.sha256(content).hexdigest() != str(expected).strip().lower():
+        raise UploadError("업로드 중 이미지가 손상되었습니다. 다시 올려 주세요.")
+    return content
+
+
+def check_size(content):
+    """이미지 한 장 크기 확인 (넘으면 ImageTooLarge)"""
+    if len(content) > MAX_IMAGE_BYTES:
+        raise ImageTooLarge()
+    return content
+
+
+def read_file(file):
+    """업로드 파일 → 바이트 (한도 + 1 바이트까지만 읽어 큰 파일을 메모리에 올리지 않음)"""
+    return check_size(file.read(MAX_IMAGE_BYTES + 1))
+
+
+def check_body_size(content_length):
+    """본문 하나가 이미지 한 장인 요청의 Content-Length 확인 (읽기 전에)"""
+    if content_length and content_length > MAX_IMAGE_BYTES:
+        raise ImageTooLarge()
+
+
+def decode_data_url(value):
+    """'data:image/...;base64,XXXX' 또는 순수 base64 → 바이트 (기존 JSON 방식 호환)"""
+    image_b64 = value.split(',')[-1] if ',' in value else value
+    # 디코딩 전에 길이로 먼저 거름 (base64 4글자 = 3바이트)
+    if len(image_b64) // 4 * 3 > MAX_IMAGE_BYTES + 2:
+        raise ImageTooLarge()
+    try:
+        content = base64.b64decode(image_b64)
+    except Exception:
+        content = b""
+    if not content:
+        raise UploadError("이미지를 읽을 수 없습니다. 다시 올려 주세요.")
+    return check_size(content)
+
+
+def is_binary_body(mimetype):
+    return mimetype == "application/octet-stream" or mimetype.startswith("image/")
+
+
+def read_image(request):
+    """Flask 요청 → (이미지 바이트, API 키)
+
+    multipart/form-data(image 필드), 본문 그대로(application/octet-stream, image/*),
+    기존 JSON({"image": data URL}) 순으로 지원한다. SHA-256(sha256 필드 / X-Image-SHA256 헤더)을
+    함께 보냈으면 받은 바이트와 맞는지 확인한다.
+    """
+    if request.mimetype == "multipart/form-data":
+        file = request.files.get("image")
+        if not file:
+            raise UploadError("분석할 이미지가 없습니다.")
+        return verify_sha256(read_file(file), request.form.get("sha256")), request.form.get("apiKey")
+    if is_binary_body(request.mimetype):
+        check_body_size(request.content_length)
+        content = check_size(request.get_data(cache=False))
+        if not content:
+            raise UploadError("분석할 이미지가 없습니다.")
+        return verify_sha256(content, request.headers.get("X-Image-SHA256")), request.headers.get("X-Api-Key")
+    data = request.get_json(silent=True) or {}
+    return verify_sha256(decode_data_url(data.get("image") or ""), data.get("sha256")), data.get("apiKey")
+
+
+def read_images(request):
+    """Flask 요청 → ([이미지 바이트], API 키) (multipart images 필드 여러 개 또는 JSON images 배열)"""
+    if request.mimetype == "multipart/form-data":
+        files = [f for f in request.files.getlist("images") if f]
+        return verify_all([read_file(f) for f in files], request.form.getlist("sha256")), request.form.get("apiKey")
+    data = request.get_json(silent=True) or {}
+    return verify_all([decode_data_url(img) for img in data.get("images", []) if img], data.get("hashes")), data.get("apiKey")
+
+
+def verify_all(contents, hashes):
+    """이미지마다 크기 확인 + 순서대로 보낸 SHA-256 목록 확인 (안 보냈으면 통과)"""
+    for content in contents:
+        check_size(content)
+    if hashes:
+        if len(hashes) != len(contents):
+            raise UploadError("이미지 수와 해시 수가 다릅니다. 다시 올려 주세요.")
+        for content, expected in zip(contents, hashes):
+            verify_sha256(content, expected)
+    return contents